@@ -0,0 +1,4 @@
+# تحميل تطبيق Celery مع Django حتى تستخدمه المهام المعرفة بـ shared_task
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -0,0 +1,14 @@
+# cyberlabs/celery.py
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cyberlabs.settings')
+
+app = Celery('cyberlabs')
+
+# قراءة الإعدادات التي تبدأ بـ CELERY_ من settings.py
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# اكتشاف المهام في ملفات tasks.py داخل التطبيقات
+app.autodiscover_tasks()
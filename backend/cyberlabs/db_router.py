@@ -0,0 +1,121 @@
+# cyberlabs/db_router.py
+"""
+توجيه الاستعلامات بين قاعدة البيانات الرئيسية والنسخ المقروءة (replicas)
+
+الافتراضي أن كل شيء يذهب إلى الرئيسية. القراءة من النسخ اختيارية ويفعّلها
+الـ ViewSet لإجراءات القراءة فقط (ReplicaReadMixin) عبر متغير سياقي
+(contextvar) خاص بالطلب الحالي. الرئيسية تبقى مستخدمة في الحالات التالية:
+- كل الكتابات، وكل القراءات داخل معاملة مفتوحة على الرئيسية.
+- الطلبات غير الآمنة (POST/PUT/PATCH/DELETE).
+- طلبات العميل لبضع ثوانٍ بعد أي كتابة (ReadYourWritesMiddleware)، حتى لا
+  يرى بيانات قديمة بسبب تأخر النسخ.
+- بناء ما يُخزن مؤقتاً تحت إصدار الكتالوج (primary_only في
+  labs/response_cache.py والـ facets)، حتى لا تُثبّت قراءة متأخرة بعد الإبطال.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+@contextmanager
+def replica_reads():
+    """قراءات الكتلة من النسخ المقروءة (ما لم يكن الطلب مثبتاً على الرئيسية)"""
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+@contextmanager
+def primary_only():
+    """إجبار كل قراءات الكتلة على الرئيسية"""
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """الكتابة على الرئيسية دائماً، والقراءة من نسخة عشوائية عند السماح بذلك"""
+
+    def db_for_read(self, model, **hints):
+        if not _read_from_replica.get() or _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = replica_aliases()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # جميع قواعد البيانات نسخ من نفس البيانات
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReadYourWritesMiddleware:
+    """
+    تثبيت الطلبات غير الآمنة على الرئيسية، ووضع ملف تعريف ارتباط قصير يثبّت
+    طلبات نفس العميل التالية عليها حتى تلحق النسخ بالكتابة.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        write = request.method not in SAFE_METHODS
+        pinned = write or PIN_COOKIE in request.COOKIES
+        token = _pinned_to_primary.set(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+
+        if write:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    ViewSet يقرأ من النسخ في الإجراءات المذكورة في replica_actions (لطلبات
+    القراءة فقط). الكتابات داخل هذه الإجراءات تذهب إلى الرئيسية كالمعتاد.
+    """
+
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS and self.action in self.replica_actions:
+            self._replica_token = _read_from_replica.set(True)
+        super().initial(request, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                _read_from_replica.reset(self._replica_token)
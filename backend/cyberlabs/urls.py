@@ -5,7 +5,8 @@ from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from labs.views import (
     LabViewSet, ChallengeViewSet, SubmissionViewSet, 
-    NotificationViewSet, UserProfileViewSet
+    NotificationViewSet, UserProfileViewSet, LeaderboardViewSet,
+    LabReviewViewSet, UserLabProgressViewSet, ExportViewSet, UploadSessionViewSet
 )
 
 router = DefaultRouter()
@@ -14,6 +15,11 @@ router.register(r'challenges', ChallengeViewSet, basename='challenge')
 router.register(r'submissions', SubmissionViewSet, basename='submission')
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'profile', UserProfileViewSet, basename='profile')
+router.register(r'leaderboard', LeaderboardViewSet, basename='leaderboard')
+router.register(r'reviews', LabReviewViewSet, basename='review')
+router.register(r'progress', UserLabProgressViewSet, basename='progress')
+router.register(r'exports', ExportViewSet, basename='export')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('admin/', admin.admin_site.urls if hasattr(admin, 'admin_site') else admin.site.urls),
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class LabsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'labs'
+    verbose_name = 'المعامل'
+
+    def ready(self):
+        # ربط الإشارات (signals)
+        from . import checks, signals  # noqa: F401
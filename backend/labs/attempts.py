@@ -0,0 +1,70 @@
+# labs/attempts.py
+"""
+محاولات التسليم
+
+كل محاولة تُضاف كصف جديد في SubmissionAttempt (سجل إلحاقي مفهرس على
+(challenge, submitted_at) و (user, challenge, submitted_at))، بينما يبقى صف
+واحد في Submission لكل مستخدم وتحدٍ يحمل أفضل نتيجة. هذا الصف يُقفل
+ويُحدّث داخل معاملة المحاولة والتقييم، فتبقى قراءات مثل "هل حل المستخدم
+التحدي؟" استعلاماً واحداً بالمفتاح مهما تراكمت المحاولات.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import events
+from .grading import enqueue_grading
+from .models import Submission, SubmissionAttempt, UserLabProgress
+
+
+def submit_attempt(user, challenge, answer='', code='', file=None):
+    """تسجيل محاولة جديدة وجدولة تقييمها، وإرجاع المحاولة"""
+    with transaction.atomic():
+        submission, _ = Submission.objects.select_for_update().get_or_create(
+            user=user, challenge=challenge,
+            defaults={'lab_id': challenge.lab_id, 'answer': answer, 'code': code},
+        )
+        attempt = SubmissionAttempt.objects.create(
+            submission=submission, user=user, lab_id=challenge.lab_id, challenge=challenge,
+            answer=answer, code=code, file=file,
+        )
+        Submission.objects.filter(pk=submission.pk).update(
+            attempt_count=F('attempt_count') + 1, last_attempt_at=attempt.submitted_at,
+        )
+        enqueue_grading(attempt)
+
+    submission.refresh_from_db(fields=['attempt_count', 'last_attempt_at'])
+    attempt.submission = submission
+    return attempt
+
+
+def record_result(attempt, result):
+    """
+    كتابة نتيجة المحاولة ثم تحديث صف أفضل نتيجة إذا تحسّنت، في معاملة واحدة.
+    تُرجع False إذا كانت المحاولة مقيّمة مسبقاً.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        updated = SubmissionAttempt.objects.filter(pk=attempt.pk, status='pending').update(
+            graded_at=now, **result.as_update()
+        )
+        if not updated:
+            return False
+
+        submission = Submission.objects.select_for_update().only(
+            'pk', 'status', 'score'
+        ).get(pk=attempt.submission_id)
+        newly_solved = result.is_correct and submission.status != 'correct'
+        if submission.is_improved_by(result.status, result.score):
+            Submission.objects.filter(pk=submission.pk).update(
+                answer=attempt.answer, code=attempt.code, file=attempt.file.name or None,
+                **result.as_update()
+            )
+
+        attempt.status, attempt.score = result.status, result.score
+        events.emit_attempt_graded(attempt, newly_solved)
+        if newly_solved:
+            UserLabProgress.record_solved(
+                attempt.user_id, attempt.lab_id, attempt.challenge_id, result.score
+            )
+    return True
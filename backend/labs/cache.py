@@ -0,0 +1,113 @@
+# labs/cache.py
+"""
+أدوات التخزين المؤقت بمفاتيح ذات إصدار
+
+بدلاً من حذف كل مفتاح على حدة عند تغير البيانات، يحمل كل نطاق (namespace)
+رقم إصدار يدخل في المفاتيح؛ زيادة الإصدار تُبطل جميع المفاتيح القديمة دفعة
+واحدة، وتنتهي صلاحيتها لاحقاً تلقائياً.
+
+رقم الإصدار في نفس الذاكرة التي قد تحذفه عند امتلائها (LocMem و MAX_ENTRIES)،
+لذا يبدأ النطاق المفقود من الوقت الحالي بالنانوثانية لا من قيمة ثابتة: لو بدأ
+من 1 لعادت المفاتيح القديمة التي أُبطلت صالحة بعد حذف رقم الإصدار.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+SAFE_KEY_RE = re.compile(r'^[\w:=.,-]*$', re.ASCII)
+
+# مدة صلاحية رقم الإصدار (أطول بكثير من أي بيانات مخزنة)
+VERSION_TTL = 60 * 60 * 24 * 30
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def _initial_version():
+    """قيمة لم تُستخدم من قبل لهذا النطاق (أكبر من أي إصدار سابق)"""
+    return time.time_ns()
+
+
+def get_version(namespace):
+    """رقم الإصدار الحالي للنطاق"""
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        initial = _initial_version()
+        cache.add(_version_key(namespace), initial, VERSION_TTL)
+        version = cache.get(_version_key(namespace), initial)
+    return version
+
+
+def bump_version(namespace):
+    """إبطال جميع المفاتيح المخزنة في النطاق"""
+    try:
+        return cache.incr(_version_key(namespace))
+    except ValueError:
+        version = _initial_version()
+        cache.set(_version_key(namespace), version, VERSION_TTL)
+        return version
+
+
+def versioned_key(namespace, *parts):
+    """مفتاح تخزين مرتبط بالإصدار الحالي للنطاق"""
+    suffix = ':'.join(str(part) for part in parts)
+    if len(suffix) > 150 or not SAFE_KEY_RE.match(suffix):
+        # نص بحث أو رابط طويل: استخدام بصمته بدلاً منه
+        suffix = hashlib.sha1(suffix.encode('utf-8')).hexdigest()
+    return f'{namespace}:v{get_version(namespace)}:{suffix}'
+
+
+# ========================
+# بيانات المعامل العامة
+# ========================
+
+LABS_NAMESPACE = 'labs'
+
+
+def labs_cache_key(*parts):
+    """مفتاح لبيانات مشتقة من كتالوج المعامل (التصنيفات، الاستجابات...)"""
+    return versioned_key(LABS_NAMESPACE, *parts)
+
+
+def invalidate_labs():
+    """إبطال كل ما هو مخزن من كتالوج المعامل عند إنشاء أو تعديل أو حذف معمل"""
+    bump_version(LABS_NAMESPACE)
+
+
+def user_tier(user):
+    """فئة المستخدم التي تحدد المعامل الظاهرة له (get_queryset يفلتر المميز حسبها)"""
+    if not user or not user.is_authenticated:
+        return 'anonymous'
+    if user.is_staff or user.is_superuser:
+        return 'staff'
+    return 'regular'
+
+
+def labs_cache_ttl():
+    return getattr(settings, 'LABS_CACHE_TTL', 600)
+
+
+# ========================
+# بيانات المستخدم
+# ========================
+
+def user_namespace(user_id):
+    return f'user:{user_id}'
+
+
+def user_cache_key(user_id, *parts):
+    """مفتاح لبيانات خاصة بمستخدم (الملف الشخصي، لوحة التحكم...)"""
+    return versioned_key(user_namespace(user_id), *parts)
+
+
+def invalidate_user(user_id):
+    """إبطال جميع البيانات المخزنة للمستخدم عند تغير تسليماته أو تقدمه"""
+    bump_version(user_namespace(user_id))
+
+
+def user_cache_ttl():
+    return getattr(settings, 'USER_CACHE_TTL', 300)
@@ -0,0 +1,29 @@
+# labs/checks.py
+"""فحوص الإعدادات عند التشغيل (manage.py check)"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# ذاكرات مؤقتة لا تُرى من العمليات الأخرى
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_upload_lock_cache(app_configs, **kwargs):
+    """
+    قفل جلسات الرفع في ذاكرة محلية لا يمنع عاملاً آخر من نسخ جزء بنفس الإزاحة؛
+    التحديث المشروط يرفض الطلب الثاني بعد نسخه، فتضيع كتابته فقط.
+    """
+    if settings.DEBUG:
+        return []
+    alias = getattr(settings, 'UPLOAD_LOCK_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in LOCAL_CACHE_BACKENDS:
+        return [Warning(
+            f'ذاكرة أقفال الرفع "{alias}" محلية لكل عملية ({backend})',
+            hint='عيّن REDIS_URL أو UPLOAD_LOCK_CACHE إلى ذاكرة مشتركة بين العاملين',
+            id='labs.W001',
+        )]
+    return []
@@ -0,0 +1,96 @@
+# labs/conditional.py
+"""
+الطلبات الشرطية (ETag / Last-Modified) لموارد المعامل والتحديات
+
+قبل تنفيذ الاستعلام الكامل يُحسب MAX(updated_at) و COUNT(*) للمجموعة (أو
+updated_at للعنصر) في استعلام خفيف واحد، ومنهما ومن بصمة الطلب تُبنى
+البصمة. إذا طابقت If-None-Match (أو لم يتغير شيء منذ If-Modified-Since) تُعاد
+304 مباشرة دون تحويل أو ترميز.
+
+Last-Modified يُرسل للعنصر الواحد فقط: في المجموعات يُحسب من الصفوف الموجودة،
+فحذف صف أو إخفاؤه لا يقدّمه وتعود 304 قديمة لمن يرسل If-Modified-Since وحده.
+البصمة تتضمن عدد الصفوف فتتغير في الحالتين.
+
+العدادات التي تُحدّث بـ F() (المشاهدات، الإكمالات...) لا تغير updated_at، لذا
+قد تتأخر في الاستجابات الشرطية كما في الذاكرة المؤقتة.
+
+إذا تضمنت الاستجابة بيانات من صفوف مرتبطة (مثل عنوان المعمل في التحدي) تُضاف
+أعمدة updated_at الخاصة بها في conditional_related_fields لتدخل في البصمة.
+"""
+import hashlib
+from calendar import timegm
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from .response_cache import request_fingerprint
+
+
+class ConditionalMixin:
+    """
+    يستدعي الـ ViewSet conditional_response(request, build) للإجراءات في
+    conditional_actions؛ get_conditional_queryset تحدد الصفوف التي تمثل المورد.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    # الإجراءات التي تمثل صفاً واحداً؛ باقي الإجراءات ترسل ETag فقط
+    last_modified_actions = ('retrieve',)
+    # أعمدة updated_at لصفوف مرتبطة تظهر بياناتها في الاستجابة، مثل 'lab__updated_at'
+    conditional_related_fields = ()
+
+    def get_conditional_related_fields(self):
+        return self.conditional_related_fields
+
+    def get_conditional_queryset(self):
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(self.get_queryset())
+
+    def get_validators(self):
+        """(etag, last_modified) أو None إذا لم يكن المورد موجوداً"""
+        related = {
+            f'related_{index}': Max(field)
+            for index, field in enumerate(self.get_conditional_related_fields())
+        }
+        try:
+            state = self.get_conditional_queryset().order_by().aggregate(
+                last_modified=Max('updated_at'), count=Count('pk'), **related
+            )
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if not state['count']:
+            return None
+
+        changed = [state['last_modified'], *(state[name] for name in related)]
+        last_modified = timegm(max(value for value in changed if value).utctimetuple())
+        raw = '|'.join([
+            *request_fingerprint(self.request),
+            *(value.isoformat() if value else '' for value in changed),
+            str(state['count']),
+        ])
+        return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest()), last_modified
+
+    def conditional_response(self, request, build):
+        if request.method != 'GET' or self.action not in self.conditional_actions:
+            return build()
+
+        validators = self.get_validators()
+        if validators is None:
+            return build()
+        etag, last_modified = validators
+        if self.action not in self.last_modified_actions:
+            last_modified = None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,181 @@
+# labs/counters.py
+"""
+عدّاد مشاهدات المعامل
+
+بدلاً من تحديث صف المعمل مع كل طلب عرض (read-modify-write) يتم تجميع
+الزيادات في ذاكرة محلية أو في Redis، ثم تُكتب دورياً دفعة واحدة باستخدام
+تعبيرات F() في Lab.views و LabStatistics.total_views.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# مفتاح Redis الذي تُجمع فيه الزيادات المعلقة (lab_id -> عدد)
+REDIS_PENDING_KEY = 'labs:views:pending'
+
+
+# ========================
+# المخزن المحلي (داخل العملية)
+# ========================
+
+class LocalViewBuffer:
+    """تجميع المشاهدات في ذاكرة العملية الحالية"""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # عدم فقدان المشاهدات المعلقة عند إيقاف العامل
+        atexit.register(self._flush_at_exit)
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('تعذر تفريغ المشاهدات المعلقة عند الإيقاف')
+
+    def increment(self, lab_id, amount=1):
+        """إضافة مشاهدة، مع تفريغ المخزن إذا انتهت المهلة"""
+        with self._lock:
+            self._pending[lab_id] += amount
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def pending(self, lab_id):
+        """عدد المشاهدات غير المكتوبة بعد لمعمل معين"""
+        with self._lock:
+            return self._pending.get(lab_id, 0)
+
+    def drain(self):
+        """سحب جميع الزيادات المعلقة وتصفير المخزن"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        return dict(pending)
+
+    def restore(self, pending):
+        """إعادة الزيادات إلى المخزن عند فشل الكتابة"""
+        with self._lock:
+            self._pending.update(pending)
+
+    def flush(self):
+        return flush_pending(self)
+
+
+# ========================
+# مخزن Redis (مشترك بين العمليات)
+# ========================
+
+class RedisViewBuffer:
+    """تجميع المشاهدات في Hash داخل Redis مشترك بين جميع العمال"""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self._response_error = redis.ResponseError
+
+    def increment(self, lab_id, amount=1):
+        self.client.hincrby(REDIS_PENDING_KEY, lab_id, amount)
+
+    def pending(self, lab_id):
+        return int(self.client.hget(REDIS_PENDING_KEY, lab_id) or 0)
+
+    def drain(self):
+        """نقل الـ Hash ذرياً إلى مفتاح مؤقت ثم قراءته وحذفه"""
+        processing_key = f'{REDIS_PENDING_KEY}:{time.time_ns()}'
+        try:
+            self.client.rename(REDIS_PENDING_KEY, processing_key)
+        except self._response_error:
+            # لا توجد زيادات معلقة
+            return {}
+        pipe = self.client.pipeline()
+        pipe.hgetall(processing_key)
+        pipe.delete(processing_key)
+        raw, _ = pipe.execute()
+        return {int(lab_id): int(count) for lab_id, count in raw.items()}
+
+    def restore(self, pending):
+        pipe = self.client.pipeline()
+        for lab_id, count in pending.items():
+            pipe.hincrby(REDIS_PENDING_KEY, lab_id, count)
+        pipe.execute()
+
+    def flush(self):
+        return flush_pending(self)
+
+
+# ========================
+# الكتابة المجمعة في قاعدة البيانات
+# ========================
+
+def flush_pending(buffer):
+    """كتابة الزيادات المعلقة في قاعدة البيانات، وإرجاع عدد المعامل المحدثة"""
+    from .models import Lab, LabStatistics
+
+    pending = buffer.drain()
+    if not pending:
+        return 0
+
+    # تجميع المعامل حسب مقدار الزيادة: استعلام UPDATE واحد لكل قيمة مختلفة
+    by_amount = defaultdict(list)
+    for lab_id, amount in pending.items():
+        if amount:
+            by_amount[amount].append(lab_id)
+
+    try:
+        with transaction.atomic():
+            for amount, lab_ids in by_amount.items():
+                Lab.objects.filter(pk__in=lab_ids).update(views=F('views') + amount)
+                LabStatistics.objects.filter(lab_id__in=lab_ids).update(
+                    total_views=F('total_views') + amount
+                )
+    except Exception:
+        buffer.restore(pending)
+        raise
+
+    return len(pending)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_view_buffer():
+    """المخزن المستخدم حسب الإعدادات (Redis إن وُجد، وإلا الذاكرة المحلية)"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                redis_url = getattr(settings, 'REDIS_URL', None)
+                if redis_url:
+                    _buffer = RedisViewBuffer(redis_url)
+                else:
+                    _buffer = LocalViewBuffer(
+                        getattr(settings, 'LAB_VIEWS_FLUSH_INTERVAL', 10)
+                    )
+    return _buffer
+
+
+def record_view(lab_id):
+    """تسجيل مشاهدة لمعمل دون لمس قاعدة البيانات"""
+    get_view_buffer().increment(lab_id)
+
+
+def pending_views(lab_id):
+    """المشاهدات المسجلة التي لم تُكتب بعد"""
+    return get_view_buffer().pending(lab_id)
+
+
+def flush_views():
+    """تفريغ المخزن في قاعدة البيانات"""
+    return get_view_buffer().flush()
@@ -0,0 +1,166 @@
+# labs/dashboard.py
+"""
+بيانات لوحة تحكم المستخدم
+
+كل جزء يُحسب بتجميع شرطي (Count/Sum مع filter) بدلاً من count() منفصل لكل
+رقم: تفصيل التصنيفات (ومنه المجاميع)، ملخص التسليمات، آخر المعامل، وآخر
+التسليمات؛ أي أربعة استعلامات للوحة كاملة. النتيجة تُخزن لكل مستخدم وتُبطل
+مع كل تسليم أو تغيّر في التقدم (invalidate_user).
+"""
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+
+from .cache import user_cache_key, user_cache_ttl
+from .models import Lab, Submission, UserLabProgress
+
+RECENT_LIMIT = 5
+
+
+def _rate(part, whole):
+    return round(part * 100.0 / whole, 2) if whole else 0
+
+
+def progress_totals(user_id):
+    """ملخص تقدم المستخدم في استعلام تجميعي واحد"""
+    totals = UserLabProgress.objects.filter(user_id=user_id).aggregate(
+        total=Count('pk'),
+        started=Count('pk', filter=Q(is_started=True)),
+        completed=Count('pk', filter=Q(is_completed=True)),
+        points=Sum('total_score'),
+        time_spent=Sum('total_time_spent'),
+    )
+    totals['points'] = totals['points'] or 0
+    totals['time_spent'] = totals['time_spent'] or 0
+    return totals
+
+
+def submission_totals(user_id):
+    """ملخص تسليمات المستخدم في استعلام تجميعي واحد"""
+    totals = Submission.objects.filter(user_id=user_id).aggregate(
+        total=Count('pk'),
+        pending=Count('pk', filter=Q(status='pending')),
+        correct=Count('pk', filter=Q(is_correct=True)),
+        score=Sum('score'),
+        attempts=Sum('attempt_count'),
+    )
+    totals['score'] = totals['score'] or 0
+    totals['attempts'] = totals['attempts'] or 0
+    totals['graded'] = totals['total'] - totals['pending']
+    totals['accuracy_rate'] = _rate(totals['correct'], totals['graded'])
+    return totals
+
+
+def _categories(user_id):
+    """التقدم لكل تصنيف، مع جميع التصنيفات حتى الفارغة"""
+    rows = {
+        row['lab__category']: row
+        for row in UserLabProgress.objects.filter(user_id=user_id).order_by().values(
+            'lab__category'
+        ).annotate(
+            started=Count('pk', filter=Q(is_started=True)),
+            completed=Count('pk', filter=Q(is_completed=True)),
+            points=Sum('total_score'),
+            time_spent=Sum('total_time_spent'),
+        )
+    }
+    empty = {'started': 0, 'completed': 0, 'points': 0, 'time_spent': 0}
+    categories = []
+    for value, label in Lab.CATEGORY_CHOICES:
+        row = rows.get(value, empty)
+        categories.append({
+            'category': value,
+            'label': label,
+            'started': row['started'],
+            'completed': row['completed'],
+            'points': row['points'] or 0,
+            'time_spent': row['time_spent'] or 0,
+            'completion_rate': _rate(row['completed'], row['started']),
+        })
+    return categories
+
+
+def _recent_labs(user_id):
+    difficulty_labels = dict(Lab.DIFFICULTY_CHOICES)
+    category_labels = dict(Lab.CATEGORY_CHOICES)
+    rows = UserLabProgress.objects.filter(user_id=user_id).order_by('-updated_at').values(
+        'lab_id', 'lab__title', 'lab__category', 'lab__difficulty',
+        'completion_percentage', 'is_completed', 'updated_at',
+    )[:RECENT_LIMIT]
+    return [
+        {
+            'lab_id': row['lab_id'],
+            'title': row['lab__title'],
+            'category': row['lab__category'],
+            'category_display': category_labels.get(row['lab__category']),
+            'difficulty': row['lab__difficulty'],
+            'difficulty_display': difficulty_labels.get(row['lab__difficulty']),
+            'progress': round(row['completion_percentage']),
+            'is_completed': row['is_completed'],
+            'updated_at': row['updated_at'],
+        }
+        for row in rows
+    ]
+
+
+def _recent_submissions(user_id):
+    # صف واحد لكل تحدٍ، مرتب بآخر محاولة (الصفوف بلا محاولات في النهاية على كل القواعد)
+    rows = Submission.objects.filter(user_id=user_id).order_by(
+        F('last_attempt_at').desc(nulls_last=True), '-id'
+    ).values(
+        'id', 'lab_id', 'lab__title', 'challenge_id', 'challenge__title',
+        'status', 'score', 'attempt_count', 'submitted_at', 'last_attempt_at',
+    )[:RECENT_LIMIT]
+    return [
+        {
+            'id': row['id'],
+            'lab_id': row['lab_id'],
+            'lab_title': row['lab__title'],
+            'challenge_id': row['challenge_id'],
+            'challenge_title': row['challenge__title'],
+            'status': row['status'],
+            'score': row['score'],
+            'attempt_count': row['attempt_count'],
+            'submitted_at': row['submitted_at'],
+            'last_attempt_at': row['last_attempt_at'],
+        }
+        for row in rows
+    ]
+
+
+def build_dashboard(user_id):
+    """جميع بيانات لوحة التحكم (أربعة استعلامات)"""
+    categories = _categories(user_id)
+    started = sum(item['started'] for item in categories)
+    completed = sum(item['completed'] for item in categories)
+    submissions = submission_totals(user_id)
+
+    return {
+        'progress': {
+            'started_labs': started,
+            'completed_labs': completed,
+            'completion_rate': _rate(completed, started),
+            'total_points': sum(item['points'] for item in categories),
+            'time_spent': sum(item['time_spent'] for item in categories),
+        },
+        'submissions': {
+            'total': submissions['total'],
+            'attempts': submissions['attempts'],
+            'pending': submissions['pending'],
+            'correct': submissions['correct'],
+            'accuracy_rate': submissions['accuracy_rate'],
+            'total_score': submissions['score'],
+        },
+        'categories': categories,
+        'recent_labs': _recent_labs(user_id),
+        'recent_submissions': _recent_submissions(user_id),
+    }
+
+
+def get_dashboard(user_id):
+    """لوحة التحكم من الذاكرة المؤقتة الخاصة بالمستخدم"""
+    key = user_cache_key(user_id, 'dashboard')
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(user_id)
+        cache.set(key, data, user_cache_ttl())
+    return data
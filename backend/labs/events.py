@@ -0,0 +1,270 @@
+# labs/events.py
+"""
+طبقة الأحداث وصندوق الصادر (transactional outbox)
+
+تُكتب الأحداث في جدول DomainEvent داخل نفس معاملة التغيير الأصلي، فإما أن
+يُحفظ الاثنان أو لا شيء. يقرأ المستهلك الأحداث غير المعالجة على دفعات، ويجمع
+الأحداث المتشابهة (مثلاً عدة تسليمات لنفس التحدي) في تحديث واحد، ثم يعلّمها
+كمعالجة في نفس المعاملة؛ إذا توقف العامل في المنتصف تُعاد الدفعة كاملة.
+الأحداث المعالجة تُحذف بعد DOMAIN_EVENTS_RETENTION (prune_processed).
+"""
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_CREATED = 'submission.created'
+SUBMISSION_GRADED = 'submission.graded'
+PROGRESS_STARTED = 'progress.started'
+PROGRESS_COMPLETED = 'progress.completed'
+REVIEW_CHANGED = 'review.changed'
+
+HANDLERS = {}
+
+
+def handler(event_type):
+    """تسجيل دالة تستقبل قائمة payloads لنوع حدث في الدفعة"""
+    def decorator(func):
+        HANDLERS[event_type] = func
+        return func
+    return decorator
+
+
+# ========================
+# إصدار الأحداث
+# ========================
+
+def emit(event_type, **payload):
+    """كتابة حدث في صندوق الصادر ضمن المعاملة الحالية"""
+    from .models import DomainEvent
+
+    event = DomainEvent.objects.create(event_type=event_type, payload=payload)
+    transaction.on_commit(schedule_processing)
+    return event
+
+
+def emit_attempt_graded(attempt, newly_solved):
+    """
+    حدث تقييم محاولة. newly_solved: أول حل صحيح للمستخدم في هذا التحدي (النقاط
+    وعدد الحلول تُحتسب مرة واحدة فقط)، و first_in_lab: أول تحدٍ يحله في المعمل.
+    """
+    from .models import Submission
+
+    first_in_lab = newly_solved and not Submission.objects.filter(
+        user_id=attempt.user_id, lab_id=attempt.lab_id, status='correct'
+    ).exclude(pk=attempt.submission_id).exists()
+
+    return emit(
+        SUBMISSION_GRADED,
+        attempt_id=attempt.pk,
+        submission_id=attempt.submission_id,
+        lab_id=attempt.lab_id,
+        category=attempt.lab.category,
+        challenge_id=attempt.challenge_id,
+        user_id=attempt.user_id,
+        status=attempt.status,
+        score=attempt.score,
+        newly_solved=newly_solved,
+        first_in_lab=first_in_lab,
+    )
+
+
+# ========================
+# معالجة الأحداث
+# ========================
+
+def process_batch(batch_size=None):
+    """معالجة دفعة واحدة من الأحداث، وإرجاع عددها"""
+    from .models import DomainEvent
+
+    batch_size = batch_size or getattr(settings, 'DOMAIN_EVENTS_BATCH_SIZE', 500)
+    with transaction.atomic():
+        events = list(
+            DomainEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        by_type = defaultdict(list)
+        for event in events:
+            by_type[event.event_type].append(event.payload)
+
+        for event_type, payloads in by_type.items():
+            func = HANDLERS.get(event_type)
+            if func is None:
+                logger.warning('لا يوجد معالج لنوع الحدث %s', event_type)
+                continue
+            func(payloads)
+
+        DomainEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            processed_at=timezone.now()
+        )
+    return len(events)
+
+
+def process_pending(batch_size=None, max_batches=None):
+    """معالجة جميع الأحداث المعلقة (أو عدد محدد من الدفعات)"""
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        processed = process_batch(batch_size)
+        if not processed:
+            break
+        total += processed
+        batches += 1
+    return total
+
+
+def prune_processed(retention=None, batch_size=5000):
+    """
+    حذف الأحداث المعالجة الأقدم من مدة الاحتفاظ على دفعات، وإرجاع عددها.
+    الأحداث الأقدم في بداية الجدول، فكل دفعة تُقرأ من أول فهرس المعرف.
+    """
+    from .models import DomainEvent
+
+    if retention is None:
+        retention = getattr(settings, 'DOMAIN_EVENTS_RETENTION', 60 * 60 * 24 * 7)
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    total = 0
+    while True:
+        ids = list(
+            DomainEvent.objects.filter(processed_at__lt=cutoff)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += DomainEvent.objects.filter(pk__in=ids).delete()[0]
+
+
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _run_worker():
+    while True:
+        _wakeup.wait()
+        _wakeup.clear()
+        close_old_connections()
+        try:
+            process_pending()
+        except Exception:
+            logger.exception('فشل معالجة صندوق الأحداث')
+        finally:
+            close_old_connections()
+
+
+def schedule_processing():
+    """
+    تنبيه المستهلك بوجود أحداث جديدة. مع Celery يتولى beat المعالجة الدورية،
+    وإلا يعمل خيط واحد في الخلفية داخل العملية.
+    """
+    if getattr(settings, 'DOMAIN_EVENTS_BACKEND', 'thread') == 'celery':
+        return
+
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run_worker, name='domain-events', daemon=True)
+                _worker.start()
+    _wakeup.set()
+
+
+# ========================
+# المعالجات
+# ========================
+
+@handler(SUBMISSION_CREATED)
+def apply_submissions_created(payloads):
+    from .lab_statistics import record_submissions
+    from .models import Challenge
+
+    for challenge_id, count in Counter(p['challenge_id'] for p in payloads).items():
+        Challenge.record_attempt(challenge_id, count)
+    for lab_id, count in Counter(p['lab_id'] for p in payloads).items():
+        record_submissions(lab_id, count)
+
+
+@handler(SUBMISSION_GRADED)
+def apply_submissions_graded(payloads):
+    from .cache import invalidate_user
+    from .lab_statistics import record_graded
+    from .leaderboard import record_points
+    from .models import Challenge, Lab, LabStatistics
+
+    per_lab = defaultdict(lambda: {'graded': 0, 'correct': 0, 'score': 0})
+    solved = Counter()
+    points = defaultdict(lambda: {'points': 0, 'completed_labs': 0})
+
+    for p in payloads:
+        correct = p['status'] == 'correct'
+        lab = per_lab[p['lab_id']]
+        lab['graded'] += 1
+        lab['correct'] += int(correct)
+        lab['score'] += p['score']
+        # الأحداث المكتوبة قبل سجل المحاولات لا تحمل newly_solved
+        if p.get('newly_solved', correct):
+            solved[p['challenge_id']] += 1
+            user = points[(p['user_id'], p['lab_id'], p['category'])]
+            user['points'] += p['score']
+            user['completed_labs'] += int(p['first_in_lab'])
+
+    for lab_id, totals in per_lab.items():
+        record_graded(lab_id, **totals)
+    for challenge_id, count in solved.items():
+        Challenge.record_success(challenge_id, count)
+    for (user_id, lab_id, category), totals in points.items():
+        record_points(user_id, lab_id, category, totals['points'], totals['completed_labs'])
+
+    # متوسط درجات المعمل منسوخ من إحصائياته
+    Lab.objects.filter(pk__in=list(per_lab)).update(
+        average_score=Subquery(
+            LabStatistics.objects.filter(lab_id=OuterRef('pk')).values('average_score')[:1]
+        )
+    )
+
+    for user_id in {p['user_id'] for p in payloads}:
+        invalidate_user(user_id)
+
+
+@handler(PROGRESS_STARTED)
+def apply_progress_started(payloads):
+    from .lab_statistics import record_starts
+
+    for lab_id, count in Counter(p['lab_id'] for p in payloads).items():
+        record_starts(lab_id, count)
+
+
+@handler(PROGRESS_COMPLETED)
+def apply_progress_completed(payloads):
+    from .lab_statistics import record_completions
+
+    per_lab = defaultdict(lambda: {'count': 0, 'time_spent': 0})
+    for p in payloads:
+        per_lab[p['lab_id']]['count'] += 1
+        per_lab[p['lab_id']]['time_spent'] += p.get('time_spent') or 0
+    for lab_id, totals in per_lab.items():
+        record_completions(lab_id, **totals)
+
+
+@handler(REVIEW_CHANGED)
+def apply_reviews_changed(payloads):
+    from .lab_statistics import record_reviews
+
+    per_lab = defaultdict(lambda: {'rating_delta': 0, 'count_delta': 0})
+    for p in payloads:
+        per_lab[p['lab_id']]['rating_delta'] += p['rating_delta']
+        per_lab[p['lab_id']]['count_delta'] += p['count_delta']
+    for lab_id, totals in per_lab.items():
+        if totals['rating_delta'] or totals['count_delta']:
+            record_reviews(lab_id, **totals)
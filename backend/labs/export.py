@@ -0,0 +1,178 @@
+# labs/export.py
+"""
+تصدير التسليمات والمحاولات والتقدم بكميات كبيرة
+
+تُقرأ الصفوف عبر values().iterator(chunk_size) (مؤشر من جهة الخادم في
+PostgreSQL)، وتُكتب كسطور CSV أو NDJSON تُجمع في كتل صغيرة ثم تُرسل تدريجياً
+(مع ضغط gzip اختياري)، فتبقى الذاكرة ثابتة مهما بلغ عدد الصفوف. نفس
+المولّدات تُستخدم في الـ API (StreamingHttpResponse) وفي الأمر export_data.
+
+الاستجابة المتدفقة تشغل عامل ويب طوال التصدير (تحت WSGI المتزامن)، لذا
+يرفض الـ API ما يتجاوز EXPORT_API_MAX_ROWS صفاً؛ التصديرات الكبيرة تُنفذ
+بالأمر export_data خارج عمليات الويب.
+"""
+import csv
+import datetime
+import json
+import zlib
+from dataclasses import dataclass
+
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+
+from .models import Submission, SubmissionAttempt, UserLabProgress
+
+CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class ExportError(ValueError):
+    """معاملات تصدير غير صالحة"""
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    model: type
+    columns: tuple
+    date_field: str
+
+
+EXPORTS = {
+    'submissions': ExportSpec(
+        model=Submission,
+        columns=(
+            'id', 'user_id', 'user__username', 'lab_id', 'lab__slug', 'challenge_id',
+            'challenge__title', 'status', 'score', 'is_correct', 'attempt_count',
+            'execution_time', 'review_score', 'submitted_at', 'last_attempt_at', 'reviewed_at',
+        ),
+        date_field='submitted_at',
+    ),
+    'attempts': ExportSpec(
+        model=SubmissionAttempt,
+        columns=(
+            'id', 'submission_id', 'user_id', 'lab_id', 'challenge_id', 'status', 'score',
+            'is_correct', 'execution_time', 'submitted_at', 'graded_at',
+        ),
+        date_field='submitted_at',
+    ),
+    'progress': ExportSpec(
+        model=UserLabProgress,
+        columns=(
+            'id', 'user_id', 'user__username', 'lab_id', 'lab__slug', 'is_started',
+            'is_completed', 'completion_percentage', 'completed_challenges_count',
+            'total_score', 'total_time_spent', 'started_at', 'completed_at', 'updated_at',
+        ),
+        date_field='updated_at',
+    ),
+}
+
+
+def parse_moment(value, end_of_day=False):
+    """تاريخ أو تاريخ ووقت بصيغة ISO؛ التاريخ وحده يعني بداية اليوم (أو نهايته)"""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'تاريخ غير صالح: {value}')
+        moment = datetime.datetime.combine(day, datetime.time.max if end_of_day else datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def export_queryset(kind, lab_id=None, since=None, until=None, using=None, limit=None):
+    """صفوف التصدير (قواميس) مرتبة بالمعرّف، وأول limit صف فقط إن حُدد"""
+    spec = EXPORTS.get(kind)
+    if spec is None:
+        raise ExportError(f'نوع تصدير غير معروف: {kind}')
+
+    queryset = spec.model.objects.all()
+    if using:
+        queryset = queryset.using(using)
+    if lab_id:
+        queryset = queryset.filter(lab_id=lab_id)
+    if since:
+        queryset = queryset.filter(**{f'{spec.date_field}__gte': since})
+    if until:
+        queryset = queryset.filter(**{f'{spec.date_field}__lte': until})
+    queryset = queryset.order_by('pk').values(*spec.columns)
+    return queryset[:limit] if limit else queryset
+
+
+def exceeds(kind, max_rows, **filters):
+    """هل يتجاوز التصدير max_rows صفاً؟ (عدّ محدود لا يمر على كل الجدول)"""
+    return export_queryset(kind, limit=max_rows + 1, **filters).count() > max_rows
+
+
+def _plain(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+class _Line:
+    """هدف كتابة لـ csv.writer يعيد السطر بدلاً من كتابته"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, columns):
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_plain(row[column]) for column in columns])
+
+
+def ndjson_lines(rows, columns):
+    for row in rows:
+        yield json.dumps({column: _plain(row[column]) for column in columns}, ensure_ascii=False) + '\n'
+
+
+def _blocks(lines):
+    """تجميع السطور في كتل بحجم BLOCK_SIZE تقريباً"""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzip(blocks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: ترويسة gzip
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(kind, output='csv', compress=False, chunk_size=CHUNK_SIZE, **filters):
+    """مولّد كتل bytes للتصدير المطلوب"""
+    if output not in FORMATS:
+        raise ExportError(f'صيغة غير مدعومة: {output}')
+    spec = EXPORTS.get(kind)
+    queryset = export_queryset(kind, **filters)
+
+    rows = queryset.iterator(chunk_size=chunk_size)
+    lines = csv_lines(rows, spec.columns) if output == 'csv' else ndjson_lines(rows, spec.columns)
+    blocks = _blocks(lines)
+    return _gzip(blocks) if compress else blocks
+
+
+def export_filename(kind, output, compress):
+    extension = FORMATS[output][1]
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    return f'{kind}-{stamp}.{extension}' + ('.gz' if compress else '')
@@ -0,0 +1,57 @@
+# labs/facets.py
+"""
+أعداد التصنيفات والصعوبة والمحتوى المميز (facets) لصفحة المعامل
+
+تُحسب جميع الأعداد من استعلام GROUP BY واحد على (category, difficulty,
+is_premium). عدد كل قيمة في بُعد معين يحترم الفلاتر المختارة في الأبعاد
+الأخرى فقط، حتى تبقى الخيارات البديلة في نفس البعد ظاهرة مع أعدادها.
+"""
+from collections import Counter
+
+from django.db.models import Count
+
+from .models import Lab
+
+FACET_FIELDS = ('category', 'difficulty', 'is_premium')
+
+
+def _matches(row, selected, skip=None):
+    return all(row[field] == value for field, value in selected.items() if field != skip)
+
+
+def compute_facets(queryset, selected):
+    """
+    queryset: المعامل بعد فلترة البحث وصلاحيات المستخدم (بدون فلاتر الأبعاد).
+    selected: القيم المختارة لكل بعد، مثل {'category': 'web_security'}.
+    """
+    rows = list(
+        queryset.order_by().values(*FACET_FIELDS).annotate(count=Count('pk'))
+    )
+
+    counts = {field: Counter() for field in FACET_FIELDS}
+    total = 0
+    for row in rows:
+        if _matches(row, selected):
+            total += row['count']
+        for field in FACET_FIELDS:
+            if _matches(row, selected, skip=field):
+                counts[field][row[field]] += row['count']
+
+    return {
+        'total': total,
+        'category': [
+            {'value': value, 'label': label, 'count': counts['category'][value],
+             'selected': selected.get('category') == value}
+            for value, label in Lab.CATEGORY_CHOICES
+        ],
+        'difficulty': [
+            {'value': value, 'label': label, 'count': counts['difficulty'][value],
+             'selected': selected.get('difficulty') == value}
+            for value, label in Lab.DIFFICULTY_CHOICES
+        ],
+        'is_premium': [
+            {'value': value, 'label': label, 'count': counts['is_premium'][value],
+             'selected': selected.get('is_premium') == value}
+            for value, label in ((False, 'مجاني'), (True, 'مميز'))
+        ],
+    }
@@ -0,0 +1,223 @@
+# labs/fastpath.py
+"""
+مسار التحويل السريع لنقاط القراءة الكثيفة (/api/labs/ و /api/challenges/)
+
+بدلاً من بناء كائن نموذج ثم المرور على حقول الـ Serializer لكل صف، تُجلب
+الأعمدة المطلوبة فقط عبر values() وتُبنى القواميس مباشرة: أسماء الاختيارات
+من جداول محسوبة مسبقاً، وروابط الملفات من التخزين، والتواريخ بنفس تنسيق DRF.
+الاستجابة تُكتب بـ orjson إن كان مثبتاً.
+
+المخرجات مطابقة لمخرجات الـ Serializer المقابل (بما فيها ?fields=). المسار
+اختياري: يعلن الـ ViewSet دعمه عبر fast_serialization = True، ولا يُستخدم إلا
+عند تفعيل الإعداد FAST_SERIALIZATION (معطل افتراضياً).
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.http import Http404
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import images
+from .models import Challenge, Lab
+from .serializers import (
+    ChallengeListSerializer, ChallengeSerializer, LabListSerializer, LabSerializer
+)
+
+try:
+    import orjson
+except ImportError:  # orjson اختياري
+    orjson = None
+
+
+# ========================
+# الترميز
+# ========================
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer يستخدم orjson عند توفره"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # أنواع لا يعرفها orjson (نصوص مترجمة كسولة مثلاً)
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def format_datetime(value):
+    """نفس تنسيق DateTimeField في DRF: التوقيت المحلي بصيغة ISO 8601"""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+# ========================
+# مواصفات الصفوف
+# ========================
+
+class FastSpec:
+    """
+    تحويل صفوف values() إلى مخرجات serializer_class.
+    computed: {'اسم الحقل': (أعمدة مطلوبة، دالة(row, request))} للحقول غير المباشرة.
+    """
+
+    def __init__(self, serializer_class, computed=None):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.computed = computed or {}
+        write_only = {
+            name for name, options in getattr(serializer_class.Meta, 'extra_kwargs', {}).items()
+            if options.get('write_only')
+        }
+        self.fields = [name for name in serializer_class.Meta.fields if name not in write_only]
+
+    def _field_plan(self, name):
+        """(الأعمدة، دالة التحويل) لحقل واحد"""
+        if name in self.computed:
+            return self.computed[name]
+
+        field = self.model._meta.get_field(name)
+        if isinstance(field, models.FileField):
+            storage = field.storage
+
+            def file_url(row, request):
+                if not row[name]:
+                    return None
+                url = storage.url(row[name])
+                return request.build_absolute_uri(url) if request is not None else url
+            return [name], file_url
+        if isinstance(field, models.DateTimeField):
+            return [name], lambda row, request: format_datetime(row[name])
+        return [name], lambda row, request: row[name]
+
+    def plan(self, request):
+        requested = self.serializer_class.requested_field_names(request)
+        plans = [(name, self._field_plan(name)) for name in self.fields if name in requested]
+        columns = []
+        for _, (needed, _) in plans:
+            columns.extend(column for column in needed if column not in columns)
+        converters = [(name, convert) for name, (_, convert) in plans]
+        return columns, converters
+
+    def rows(self, queryset, request):
+        """queryset بصيغة values() جاهز للترقيم، مع دالة تحويل الصفحة"""
+        columns, converters = self.plan(request)
+
+        def convert(rows):
+            return [{name: func(row, request) for name, func in converters} for row in rows]
+        return queryset.values(*columns), convert
+
+
+def _choice(column, choices):
+    labels = dict(choices)
+    return [column], lambda row, request: labels.get(row[column], row[column])
+
+
+def _completion_rate(row, request):
+    return (row['completions'] / row['views']) * 100 if row['views'] > 0 else 0
+
+
+def _thumbnail_url(row, request):
+    if not row['thumbnail']:
+        return None
+    url = Lab._meta.get_field('thumbnail').storage.url(row['thumbnail'])
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _thumbnail_srcset(row, request):
+    return images.srcset(row['id'], row['thumbnail'], row['thumbnail_variants'], request)
+
+
+LAB_COMPUTED = {
+    'category_display': _choice('category', Lab.CATEGORY_CHOICES),
+    'difficulty_display': _choice('difficulty', Lab.DIFFICULTY_CHOICES),
+    'challenge_count': (['challenge_total'], lambda row, request: row['challenge_total']),
+    'completion_rate': (['views', 'completions'], _completion_rate),
+    'thumbnail_url': (['thumbnail'], _thumbnail_url),
+    'thumbnail_srcset': (['id', 'thumbnail', 'thumbnail_variants'], _thumbnail_srcset),
+}
+
+CHALLENGE_COMPUTED = {
+    'lab_title': (['lab__title'], lambda row, request: row['lab__title']),
+    'answer_type_display': _choice('answer_type', Challenge.ANSWER_TYPE_CHOICES),
+    'level_display': _choice('level', Challenge.CHALLENGE_LEVEL_CHOICES),
+}
+
+FAST_SPECS = {
+    LabSerializer: FastSpec(LabSerializer, LAB_COMPUTED),
+    LabListSerializer: FastSpec(LabListSerializer, LAB_COMPUTED),
+    ChallengeSerializer: FastSpec(ChallengeSerializer, CHALLENGE_COMPUTED),
+    ChallengeListSerializer: FastSpec(ChallengeListSerializer, CHALLENGE_COMPUTED),
+}
+
+
+# ========================
+# دمج المسار في الـ ViewSet
+# ========================
+
+class FastPathMixin:
+    """
+    يستبدل list و retrieve بالمسار السريع عند fast_serialization = True وتفعيل
+    FAST_SERIALIZATION. يعود إلى الـ Serializer العادي إذا طُلب ?expand= أو لم
+    تكن هناك مواصفات.
+    """
+
+    fast_serialization = False
+
+    def fast_path_enabled(self):
+        return self.fast_serialization and getattr(settings, 'FAST_SERIALIZATION', False)
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.fast_path_enabled():
+            renderers = [FastJSONRenderer()] + [
+                renderer for renderer in renderers if not isinstance(renderer, JSONRenderer)
+            ]
+        return renderers
+
+    def get_fast_spec(self):
+        if not self.fast_path_enabled() or 'expand' in self.request.query_params:
+            return None
+        return FAST_SPECS.get(self.get_serializer_class())
+
+    def list(self, request, *args, **kwargs):
+        spec = self.get_fast_spec()
+        if spec is None:
+            return super().list(request, *args, **kwargs)
+
+        rows, convert = spec.rows(self.filter_queryset(self.get_queryset()), request)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(convert(page))
+        return Response(convert(rows))
+
+    def fast_retrieve(self, request):
+        """صف واحد عبر values()، أو None إذا لم يكن المسار السريع مفعلاً"""
+        spec = self.get_fast_spec()
+        if spec is None:
+            return None
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows, convert = spec.rows(self.filter_queryset(self.get_queryset()), request)
+        try:
+            data = convert(rows.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})[:1])
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not data:
+            raise Http404
+        return data[0]
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.fast_retrieve(request)
+        if data is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(data)
@@ -0,0 +1,271 @@
+# labs/grading.py
+"""
+محرك التقييم الآلي للتسليمات
+
+يتم تسجيل مقيّم (grader) لكل نوع إجابة في Challenge.ANSWER_TYPE_CHOICES،
+ويعمل التقييم خارج مسار الطلب: على عامل Celery أو على مجموعة خيوط داخل
+العملية حسب الإعداد GRADING_BACKEND.
+"""
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import events
+from .cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+
+# ========================
+# نتيجة التقييم
+# ========================
+
+@dataclass
+class GradeResult:
+    """نتيجة تقييم تسليم واحد"""
+
+    status: str
+    score: int = 0
+    output: str = ''
+    errors: str = ''
+    test_results: list = None
+    execution_time: float = None
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def is_correct(self):
+        return self.status == 'correct'
+
+    def as_update(self):
+        """الحقول التي تُكتب في المحاولة (وفي Submission إن تحسّنت) باستعلام UPDATE واحد"""
+        return {
+            'status': self.status,
+            'is_correct': self.is_correct,
+            'score': self.score,
+            'output': self.output,
+            'errors': self.errors,
+            'test_results': self.test_results,
+            'execution_time': self.execution_time,
+            **self.extra,
+        }
+
+
+# ========================
+# سجل المقيّمات
+# ========================
+
+GRADERS = {}
+
+
+def register_grader(*answer_types):
+    """تسجيل دالة تقييم لنوع أو أكثر من أنواع الإجابة"""
+    def decorator(func):
+        for answer_type in answer_types:
+            GRADERS[answer_type] = func
+        return func
+    return decorator
+
+
+def get_grader(answer_type):
+    return GRADERS.get(answer_type)
+
+
+def _result(challenge, is_correct, **kwargs):
+    if is_correct:
+        return GradeResult(status='correct', score=challenge.points, **kwargs)
+    return GradeResult(status='incorrect', score=0, **kwargs)
+
+
+def normalize_output(text):
+    """توحيد المخرجات: نهايات الأسطر والمسافات في نهاية كل سطر"""
+    lines = (text or '').replace('\r\n', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+@register_grader('flag', 'text')
+def grade_exact(submission, challenge):
+    """مطابقة تامة للنص بعد حذف المسافات الطرفية"""
+    return _result(challenge, submission.answer.strip() == challenge.correct_answer.strip())
+
+
+@register_grader('multiple_choice')
+def grade_multiple_choice(submission, challenge):
+    """مقارنة مجموعة الخيارات المختارة مع الخيارات الصحيحة (مفصولة بفواصل)"""
+    def choices(value):
+        return {item.strip().casefold() for item in re.split(r'[,،]', value or '') if item.strip()}
+
+    return _result(challenge, choices(submission.answer) == choices(challenge.correct_answer))
+
+
+@register_grader('code_output')
+def grade_code_output(submission, challenge):
+    """
+    تشغيل الكود المقدم (إن وُجد) ومقارنة مخرجاته مع المخرجات المتوقعة،
+    وإلا مقارنة المخرجات التي كتبها المستخدم مباشرة.
+    """
+    expected = challenge.expected_output or challenge.correct_answer
+    if not submission.code:
+        return _result(
+            challenge,
+            normalize_output(submission.answer) == normalize_output(expected),
+            output=submission.answer,
+        )
+
+    return grade_with_runner(
+        submission, challenge,
+        [{'name': 'expected_output', 'input': '', 'expected_output': expected}],
+    )
+
+
+SHA256_RE = re.compile(r'^[0-9a-fA-F]{64}$')
+
+# أقصى حجم يُقرأ من الملف عند مقارنة المحتوى نصياً
+FILE_COMPARE_LIMIT = 1024 * 1024
+
+
+@register_grader('file')
+def grade_file(submission, challenge):
+    """
+    مقارنة الملف المرفوع: إذا كانت الإجابة الصحيحة بصمة SHA-256 تتم مقارنة
+    البصمة، وإلا تتم مقارنة محتوى الملف نصياً.
+    """
+    if not submission.file:
+        return GradeResult(status='error', errors='لم يتم رفع أي ملف')
+
+    expected = challenge.correct_answer.strip()
+    with submission.file.open('rb') as fh:
+        if SHA256_RE.match(expected):
+            digest = hashlib.sha256()
+            for chunk in fh.chunks():
+                digest.update(chunk)
+            return _result(challenge, digest.hexdigest() == expected.lower())
+
+        content = fh.read(FILE_COMPARE_LIMIT + 1)
+    if len(content) > FILE_COMPARE_LIMIT:
+        return _result(challenge, False)
+    text = content.decode('utf-8', errors='replace')
+    return _result(challenge, normalize_output(text) == normalize_output(expected))
+
+
+@register_grader('code')
+def grade_code(submission, challenge):
+    """تشغيل الكود المقدم على حالات الاختبار الخاصة بالتحدي"""
+    from .runner import load_test_cases
+
+    test_cases = load_test_cases(challenge)
+    if not test_cases:
+        # لا توجد حالات اختبار: يبقى التسليم قيد المراجعة اليدوية
+        return None
+    return grade_with_runner(submission, challenge, test_cases)
+
+
+def grade_with_runner(submission, challenge, test_cases):
+    """تحويل تقرير مشغّل الكود إلى نتيجة تقييم"""
+    from .runner import run_tests
+
+    code = submission.code or submission.answer
+    report = run_tests(code, test_cases)
+    passed, total = report.passed, report.total
+
+    if passed == total:
+        status = 'correct'
+    elif passed:
+        status = 'partial'
+    elif report.count('timeout'):
+        status = 'timeout'
+    elif report.count('error'):
+        status = 'error'
+    else:
+        status = 'incorrect'
+
+    first_failure = next((result for result in report.results if not result.passed), None)
+    return GradeResult(
+        status=status,
+        score=round(challenge.points * passed / total) if total else 0,
+        output=report.results[0].output if report.results else '',
+        errors=first_failure.errors if first_failure else '',
+        test_results=[result.as_dict() for result in report.results],
+        execution_time=report.elapsed,
+    )
+
+
+# ========================
+# تنفيذ التقييم
+# ========================
+
+def grade_attempt(attempt_id):
+    """تقييم محاولة معلقة وتحديث أفضل نتيجة للمستخدم في التحدي"""
+    from .attempts import record_result
+    from .models import SubmissionAttempt
+
+    attempt = SubmissionAttempt.objects.select_related('challenge', 'lab').filter(
+        pk=attempt_id, status='pending'
+    ).first()
+    if attempt is None:
+        return None
+
+    grader = get_grader(attempt.challenge.answer_type)
+    if grader is None:
+        return None
+
+    try:
+        result = grader(attempt, attempt.challenge)
+    except Exception as exc:
+        logger.exception('فشل تقييم المحاولة %s', attempt_id)
+        result = GradeResult(status='error', errors=str(exc))
+
+    if result is None:
+        # يحتاج إلى مراجعة يدوية
+        return None
+
+    # النتيجة والحدث في نفس المعاملة؛ الإحصائيات المشتقة يطبقها مستهلك الأحداث
+    if record_result(attempt, result):
+        invalidate_user(attempt.user_id)
+    return result
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GRADING_THREAD_WORKERS', 4),
+                    thread_name_prefix='grading',
+                )
+    return _executor
+
+
+def _grade_in_thread(attempt_id):
+    close_old_connections()
+    try:
+        grade_attempt(attempt_id)
+    except Exception:
+        logger.exception('فشل تقييم المحاولة %s', attempt_id)
+    finally:
+        close_old_connections()
+
+
+def dispatch_grading(attempt_id):
+    """إرسال المحاولة إلى عامل التقييم المناسب"""
+    if getattr(settings, 'GRADING_BACKEND', 'thread') == 'celery':
+        from .tasks import grade_attempt_task
+        grade_attempt_task.delay(attempt_id)
+    else:
+        _get_executor().submit(_grade_in_thread, attempt_id)
+
+
+def enqueue_grading(attempt):
+    """جدولة تقييم المحاولة بعد نجاح المعاملة الحالية"""
+    attempt_id = attempt.pk
+    transaction.on_commit(lambda: dispatch_grading(attempt_id))
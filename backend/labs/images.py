@@ -0,0 +1,252 @@
+# labs/images.py
+"""
+نسخ مصغرة متعددة المقاسات لصورة المعمل (Lab.thumbnail)
+
+لكل مقاس في THUMBNAIL_WIDTHS تُولَّد نسختان WebP و JPEG عبر Pillow، باسم
+مشتق من محتوى الصورة الأصلية وإعدادات التوليد؛ فالاسم لا يتغير إلا بتغير
+المحتوى ويمكن تخزينه مؤقتاً في المتصفح بلا انتهاء. أسماء النسخ تُحفظ في
+Lab.thumbnail_variants مع اسم الصورة الأصلية التي وُلّدت منها.
+
+التوليد يجري في الخلفية (Celery أو خيط) بعد حفظ صورة جديدة، أو عند أول طلب
+يجد النسخ ناقصة أو قديمة. قفل في الذاكرة المؤقتة (cache.add) يضمن أن طلباً
+واحداً فقط يبدأ التوليد، وحتى انتهائه يعود الحقل None ويكتفي العميل بـ
+thumbnail_url. القفل يُؤخذ عند الجدولة بمدة تغطي الانتظار في طابور Celery،
+ويُجدد عند بدء التوليد ويُحذف عند انتهائه.
+
+انتهاء التوليد يُبطل ذاكرة الكتالوج، لكن مرة واحدة لكل دفعة: أول معمل ينتهي
+يجدول الإبطال بعد THUMBNAIL_INVALIDATE_DELAY ثانية، وما ينتهي قبله يُضم إليه
+(بدلاً من إبطال كامل مع كل صورة عند رفع صور كثيرة أو ملء النسخ الناقصة).
+"""
+import hashlib
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import invalidate_labs
+
+logger = logging.getLogger(__name__)
+
+# يُغيَّر عند تغيير طريقة التوليد لتُنتج أسماء جديدة
+PIPELINE_VERSION = 1
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+LOCK_KEY = 'thumbnail-variants-lock:{}'
+# مدة القفل من الجدولة حتى بدء العمل (الانتظار في الطابور)، ثم مدته أثناء التوليد
+QUEUED_LOCK_TTL = 60 * 60
+RUNNING_LOCK_TTL = 60 * 10
+INVALIDATE_KEY = 'thumbnail-variants-invalidate'
+
+
+def thumbnail_widths():
+    return tuple(getattr(settings, 'THUMBNAIL_WIDTHS', (320, 640, 960)))
+
+
+def invalidate_delay():
+    return getattr(settings, 'THUMBNAIL_INVALIDATE_DELAY', 10)
+
+
+def _storage():
+    from .models import Lab
+    return Lab._meta.get_field('thumbnail').storage
+
+
+def is_current(thumbnail, variants):
+    """هل النسخ المحفوظة مولّدة من الصورة الحالية"""
+    if not thumbnail:
+        return not variants
+    return bool(variants) and variants.get('source') == thumbnail
+
+
+# ========================
+# التوليد
+# ========================
+
+def render_variants(content, storage):
+    """
+    توليد النسخ وحفظ غير الموجود منها، وإرجاع
+    {'webp': [[العرض، المسار], ...], 'jpeg': [...]}
+    """
+    from PIL import Image, ImageOps
+
+    digest = hashlib.sha256(content + f'|v{PIPELINE_VERSION}'.encode()).hexdigest()[:20]
+
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGB')
+
+    # لا تكبير: المقاسات الأكبر من الأصل تُستبدل بعرض الأصل مرة واحدة
+    widths = sorted({min(width, image.width) for width in thumbnail_widths()})
+    variants = {name: [] for name in FORMATS}
+    for width in widths:
+        resized = None
+        for name, (pil_format, options) in FORMATS.items():
+            path = posixpath.join('labs/thumbnails/variants', f'{digest}-{width}.{name}')
+            if not storage.exists(path):
+                if resized is None:
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **options)
+                path = storage.save(path, ContentFile(buffer.getvalue()))
+            variants[name].append([width, path])
+    return variants
+
+
+def generate_variants(lab_id):
+    """توليد نسخ صورة المعمل الحالية وحفظ أسمائها (مع إبطال ذاكرة الكتالوج)"""
+    from .models import Lab
+
+    lab = Lab.objects.filter(pk=lab_id).only('pk', 'thumbnail', 'thumbnail_variants').first()
+    if lab is None:
+        return None
+
+    thumbnail = lab.thumbnail.name or ''
+    if is_current(thumbnail, lab.thumbnail_variants):
+        return lab.thumbnail_variants
+
+    variants = {}
+    if thumbnail:
+        try:
+            with lab.thumbnail.open('rb') as handle:
+                content = handle.read()
+            variants = render_variants(content, _storage())
+        except Exception:
+            # صورة تالفة: يُحفظ الفشل حتى لا تعاد المحاولة مع كل طلب
+            logger.exception('تعذر توليد نسخ صورة المعمل %s', lab_id)
+            variants = {'failed': True}
+        variants['source'] = thumbnail
+
+    # الشرط على الصورة يمنع الكتابة فوق نسخ صورة رُفعت أثناء التوليد
+    same_image = Q(thumbnail=thumbnail) if thumbnail else Q(thumbnail='') | Q(thumbnail__isnull=True)
+    updated = Lab.objects.filter(same_image, pk=lab_id).update(
+        thumbnail_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        schedule_invalidation()
+    return variants
+
+
+# ========================
+# الجدولة
+# ========================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'THUMBNAIL_THREAD_WORKERS', 2),
+                    thread_name_prefix='thumbnails',
+                )
+    return _executor
+
+
+def generate_and_unlock(lab_id):
+    key = LOCK_KEY.format(lab_id)
+    # القفل أُخذ عند الجدولة؛ يُجدد الآن لمدة التوليد نفسه
+    cache.set(key, 1, RUNNING_LOCK_TTL)
+    try:
+        return generate_variants(lab_id)
+    finally:
+        cache.delete(key)
+
+
+def _generate_in_thread(lab_id):
+    close_old_connections()
+    try:
+        generate_and_unlock(lab_id)
+    except Exception:
+        logger.exception('تعذر توليد نسخ صورة المعمل %s', lab_id)
+    finally:
+        close_old_connections()
+
+
+def request_variants(lab_id):
+    """جدولة التوليد ما لم يكن جارياً بالفعل لهذا المعمل"""
+    if not cache.add(LOCK_KEY.format(lab_id), 1, QUEUED_LOCK_TTL):
+        return False
+    if getattr(settings, 'THUMBNAIL_BACKEND', 'thread') == 'celery':
+        from .tasks import generate_thumbnail_variants_task
+        generate_thumbnail_variants_task.delay(lab_id)
+    else:
+        _get_executor().submit(_generate_in_thread, lab_id)
+    return True
+
+
+def flush_invalidation():
+    """إبطال ذاكرة الكتالوج لدفعة النسخ المنتهية"""
+    # الحذف قبل الإبطال: ما ينتهي بعده يجدول دفعة جديدة
+    cache.delete(INVALIDATE_KEY)
+    invalidate_labs()
+
+
+def _flush_in_thread():
+    try:
+        flush_invalidation()
+    except Exception:
+        logger.exception('تعذر إبطال ذاكرة الكتالوج بعد توليد النسخ')
+
+
+def schedule_invalidation():
+    """جدولة إبطال واحد للكتالوج ما لم يكن مجدولاً بالفعل"""
+    delay = invalidate_delay()
+    if not delay:
+        invalidate_labs()
+        return False
+    # مدة المفتاح أطول من التأخير حتى لا تُجدول دفعة ثانية قبل الأولى؛ وإن فُقدت
+    # المهمة ينتهي المفتاح وتُجدول الدفعة التالية
+    if not cache.add(INVALIDATE_KEY, 1, delay + 60):
+        return False
+    if getattr(settings, 'THUMBNAIL_BACKEND', 'thread') == 'celery':
+        from .tasks import invalidate_thumbnail_batch_task
+        invalidate_thumbnail_batch_task.apply_async(countdown=delay)
+    else:
+        timer = threading.Timer(delay, _flush_in_thread)
+        timer.daemon = True
+        timer.start()
+    return True
+
+
+# ========================
+# العرض
+# ========================
+
+def srcset(lab_id, thumbnail, variants, request=None):
+    """
+    {'webp': 'رابط 320w, ...', 'jpeg': '...'} أو None إذا لم تتوفر النسخ بعد
+    (ويُطلب توليدها في هذه الحالة).
+    """
+    if not thumbnail:
+        return None
+    if not is_current(thumbnail, variants):
+        request_variants(lab_id)
+        return None
+    if variants.get('failed'):
+        return None
+
+    storage = _storage()
+
+    def url(path):
+        value = storage.url(path)
+        return request.build_absolute_uri(value) if request is not None else value
+
+    return {
+        name: ', '.join(f'{url(path)} {width}w' for width, path in variants.get(name, []))
+        for name in FORMATS
+    }
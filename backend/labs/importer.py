@@ -0,0 +1,520 @@
+# labs/importer.py
+"""
+استيراد المعامل والتحديات من حزم المحتوى
+
+المصدر مجلد أو ملف zip يحتوي مجلداً لكل معمل فيه lab.json (البيانات الوصفية
+والتحديات) مع الملفات المشار إليها (الدليل، ملفات البداية، الصورة، ملفات
+التحديات). مثال lab.json:
+
+    {
+        "slug": "sql-injection-101", "title": "...", "description": "...",
+        "category": "web_security", "difficulty": "beginner",
+        "guide": "guide.pdf", "starter_files": "starter.zip",
+        "challenges": [
+            {"order": 1, "title": "...", "description": "...",
+             "answer_type": "flag", "correct_answer": "FLAG{...}"}
+        ]
+    }
+
+المراحل:
+1. التحقق من الحزم بالتوازي (ProcessPoolExecutor)؛ التحقق لا يلمس قاعدة البيانات.
+2. المقارنة مع المعامل الموجودة بالـ slug ومع تحدياتها بالترتيب (order)، فلا
+   يُكتب إلا الجديد أو المتغير.
+3. الكتابة بـ bulk_create / bulk_update في معاملة واحدة؛ الملفات الجديدة تُحذف
+   من التخزين إذا تراجعت المعاملة.
+4. بما أن العمليات المجمعة لا تطلق الإشارات: تحديث فهرس البحث وإعادة حساب
+   challenge_total و LabStatistics للمعامل المتأثرة وإبطال ذاكرة الكتالوج.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import lab_statistics, search
+from .cache import invalidate_labs
+from .models import Challenge, Lab
+
+MANIFEST = 'lab.json'
+SLUG_RE = re.compile(r'^[-a-zA-Z0-9_]+$')
+BATCH_SIZE = 1000
+# أقل من هذا العدد من الحزم يكون التحقق في نفس العملية أسرع من تشغيل العمليات
+PARALLEL_THRESHOLD = 50
+
+REQUIRED = object()
+
+# الحقل في lab.json: (حقل النموذج، القيمة الافتراضية أو REQUIRED)
+LAB_FIELDS = {
+    'title': ('title', REQUIRED),
+    'description': ('description', REQUIRED),
+    'category': ('category', REQUIRED),
+    'difficulty': ('difficulty', REQUIRED),
+    'overview': ('overview', ''),
+    'learning_objectives': ('learning_objectives', ''),
+    'points': ('points', 100),
+    'estimated_time': ('estimated_time', 60),
+    'is_premium': ('is_premium', False),
+    'is_active': ('is_active', True),
+    'requires_vm': ('requires_vm', False),
+    'vm_image': ('vm_image', ''),
+}
+LAB_FILES = {
+    'thumbnail': 'thumbnail',
+    'guide': 'lab_guide',
+    'starter_files': 'starter_files',
+}
+CHALLENGE_FIELDS = {
+    'title': ('title', REQUIRED),
+    'description': ('description', REQUIRED),
+    'answer_type': ('answer_type', REQUIRED),
+    'correct_answer': ('correct_answer', REQUIRED),
+    'instructions': ('instructions', ''),
+    'hint': ('hint', ''),
+    'solution_hint': ('solution_hint', ''),
+    'challenge_type': ('challenge_type', 'regular'),
+    'level': ('level', 'medium'),
+    'correct_code': ('correct_code', ''),
+    'expected_output': ('expected_output', ''),
+    'multiple_choices': ('multiple_choices', None),
+    'points': ('points', 10),
+}
+CHALLENGE_FILES = {
+    'starter_code': 'starter_code',
+    'test_cases': 'test_cases',
+    'attachments': 'attachments',
+}
+
+
+class PackageError(ValueError):
+    """مصدر استيراد غير صالح"""
+
+
+@dataclass
+class ImportReport:
+    packages: int = 0
+    labs_created: int = 0
+    labs_updated: int = 0
+    labs_unchanged: int = 0
+    challenges_created: int = 0
+    challenges_updated: int = 0
+    files_written: int = 0
+    dry_run: bool = False
+    errors: dict = field(default_factory=dict)
+    timings: dict = field(default_factory=dict)
+
+    def as_dict(self):
+        return {
+            'packages': self.packages,
+            'labs': {
+                'created': self.labs_created,
+                'updated': self.labs_updated,
+                'unchanged': self.labs_unchanged,
+            },
+            'challenges': {
+                'created': self.challenges_created,
+                'updated': self.challenges_updated,
+            },
+            'files_written': self.files_written,
+            'dry_run': self.dry_run,
+            'errors': self.errors,
+            'timings': {name: round(value, 3) for name, value in self.timings.items()},
+        }
+
+
+# ========================
+# مصادر الحزم
+# ========================
+
+class DirectorySource:
+    """مجلد يحتوي مجلداً لكل معمل"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def packages(self):
+        """(اسم الحزمة، نص lab.json، أسماء الملفات النسبية داخلها)"""
+        for root, _dirs, files in os.walk(self.path):
+            if MANIFEST not in files:
+                continue
+            with open(os.path.join(root, MANIFEST), encoding='utf-8') as handle:
+                manifest = handle.read()
+            names = set()
+            for sub_root, _sub_dirs, sub_files in os.walk(root):
+                relative = os.path.relpath(sub_root, root)
+                for name in sub_files:
+                    names.add(posixpath.normpath(posixpath.join(relative.replace(os.sep, '/'), name)))
+            yield os.path.relpath(root, self.path), manifest, names
+
+    def read(self, package, name):
+        with open(os.path.join(self.path, package, *name.split('/')), 'rb') as handle:
+            return handle.read()
+
+    def close(self):
+        pass
+
+
+class ZipSource:
+    """ملف zip بنفس بنية المجلد"""
+
+    def __init__(self, file):
+        try:
+            self.archive = zipfile.ZipFile(file)
+        except zipfile.BadZipFile as exc:
+            raise PackageError(f'ملف zip غير صالح: {exc}')
+
+    def packages(self):
+        names = [info.filename for info in self.archive.infolist() if not info.is_dir()]
+        roots = sorted(
+            posixpath.dirname(name) for name in names
+            if posixpath.basename(name) == MANIFEST
+        )
+        for root in roots:
+            prefix = f'{root}/' if root else ''
+            files = {name[len(prefix):] for name in names if name.startswith(prefix)}
+            manifest = self.archive.read(f'{prefix}{MANIFEST}').decode('utf-8')
+            yield root or '.', manifest, files
+
+    def read(self, package, name):
+        prefix = '' if package == '.' else f'{package}/'
+        return self.archive.read(f'{prefix}{name}')
+
+    def close(self):
+        self.archive.close()
+
+
+def open_source(path_or_file):
+    if isinstance(path_or_file, str) and os.path.isdir(path_or_file):
+        return DirectorySource(path_or_file)
+    if isinstance(path_or_file, str) and not os.path.exists(path_or_file):
+        raise PackageError(f'المصدر غير موجود: {path_or_file}')
+    return ZipSource(path_or_file)
+
+
+# ========================
+# التحقق (يعمل في عمليات منفصلة)
+# ========================
+
+FIELD_TYPES = {
+    'CharField': str,
+    'TextField': str,
+    'IntegerField': int,
+    'PositiveIntegerField': int,
+    'BooleanField': bool,
+}
+
+
+def _field_rules(model, spec):
+    """لكل حقل في spec: (النوع المتوقع أو None، أقصى طول أو None) من تعريف النموذج"""
+    rules = {}
+    for model_field, _default in spec.values():
+        field_object = model._meta.get_field(model_field)
+        rules[model_field] = (FIELD_TYPES.get(field_object.get_internal_type()), field_object.max_length)
+    return rules
+
+
+def _validation_rules():
+    """قواعد التحقق مستخرجة من النماذج في العملية الرئيسية وتُمرر للعمليات الفرعية"""
+    return {
+        'choices': {
+            'category': {value for value, _label in Lab.CATEGORY_CHOICES},
+            'difficulty': {value for value, _label in Lab.DIFFICULTY_CHOICES},
+            'answer_type': {value for value, _label in Challenge.ANSWER_TYPE_CHOICES},
+            'level': {value for value, _label in Challenge.CHALLENGE_LEVEL_CHOICES},
+        },
+        'lab': _field_rules(Lab, LAB_FIELDS),
+        'challenge': _field_rules(Challenge, CHALLENGE_FIELDS),
+    }
+
+
+def _clean_fields(data, spec, choices, field_rules, errors, where):
+    cleaned = {}
+    for key, (model_field, default) in spec.items():
+        value = data.get(key, default)
+        if value is REQUIRED or value is None and default is REQUIRED:
+            errors.append(f'{where}: الحقل {key} مطلوب')
+            continue
+        expected, max_length = field_rules[model_field]
+        if expected is bool and not isinstance(value, bool):
+            errors.append(f'{where}: الحقل {key} يجب أن يكون true أو false')
+        elif expected is int and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+            errors.append(f'{where}: الحقل {key} يجب أن يكون عدداً صحيحاً موجباً')
+        elif expected is str and not isinstance(value, str):
+            errors.append(f'{where}: الحقل {key} يجب أن يكون نصاً')
+        elif max_length is not None and len(value) > max_length:
+            errors.append(f'{where}: الحقل {key} أطول من {max_length} حرفاً')
+        elif key in choices and value not in choices[key]:
+            errors.append(f'{where}: قيمة غير صالحة للحقل {key}: {value}')
+        cleaned[model_field] = value
+    return cleaned
+
+
+def _clean_files(data, spec, files, errors, where):
+    cleaned = {}
+    for key, model_field in spec.items():
+        name = data.get(key)
+        if not name:
+            continue
+        normalized = posixpath.normpath(str(name))
+        if normalized.startswith(('/', '..')) or normalized not in files:
+            errors.append(f'{where}: الملف {name} غير موجود في الحزمة')
+            continue
+        cleaned[model_field] = normalized
+    return cleaned
+
+
+def validate_package(package, rules):
+    """
+    التحقق من حزمة واحدة: package = (الاسم، نص lab.json، أسماء الملفات).
+    تُرجع (الاسم، البيانات المنظفة أو None، قائمة الأخطاء).
+    """
+    name, manifest, files = package
+    errors = []
+    try:
+        data = json.loads(manifest)
+    except ValueError as exc:
+        return name, None, [f'{MANIFEST}: JSON غير صالح: {exc}']
+    if not isinstance(data, dict):
+        return name, None, [f'{MANIFEST}: يجب أن يكون كائناً']
+
+    slug = data.get('slug') or ''
+    if not isinstance(slug, str) or not SLUG_RE.match(slug) or len(slug) > 200:
+        errors.append(f'slug غير صالح: {slug!r}')
+    lab = {
+        'slug': slug,
+        'fields': _clean_fields(data, LAB_FIELDS, rules['choices'], rules['lab'], errors, 'lab'),
+        'files': _clean_files(data, LAB_FILES, files, errors, 'lab'),
+        'challenges': [],
+    }
+
+    challenges = data.get('challenges') or []
+    if not isinstance(challenges, list):
+        errors.append('challenges يجب أن تكون قائمة')
+        challenges = []
+
+    orders = set()
+    for index, item in enumerate(challenges):
+        where = f'challenges[{index}]'
+        if not isinstance(item, dict):
+            errors.append(f'{where}: يجب أن يكون كائناً')
+            continue
+        order = item.get('order', index + 1)
+        if not isinstance(order, int) or isinstance(order, bool):
+            errors.append(f'{where}: order يجب أن يكون عدداً صحيحاً')
+        elif order in orders:
+            errors.append(f'{where}: order مكرر: {order}')
+        orders.add(order)
+        lab['challenges'].append({
+            'order': order,
+            'fields': _clean_fields(
+                item, CHALLENGE_FIELDS, rules['choices'], rules['challenge'], errors, where
+            ),
+            'files': _clean_files(item, CHALLENGE_FILES, files, errors, where),
+        })
+
+    return name, (None if errors else lab), errors
+
+
+def validate_packages(packages, workers=None):
+    """التحقق من جميع الحزم، بالتوازي عندما يكون عددها كبيراً"""
+    check = partial(validate_package, rules=_validation_rules())
+    if workers == 1 or len(packages) < PARALLEL_THRESHOLD:
+        return [check(package) for package in packages]
+    workers = workers or getattr(settings, 'LAB_IMPORT_WORKERS', None) or os.cpu_count()
+    chunksize = max(1, len(packages) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(check, packages, chunksize=chunksize))
+
+
+# ========================
+# الكتابة
+# ========================
+
+def _store_file(source, package, name, field_object, slug, current, stored):
+    """
+    حفظ ملف الحزمة باسم مشتق من محتواه؛ إذا طابق الاسم الحالي فلا شيء يُكتب.
+    الملفات المنشأة فعلاً تُضاف إلى stored لحذفها إذا تراجعت المعاملة.
+    تُرجع (المسار، هل كُتب).
+    """
+    content = source.read(package, name)
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, extension = posixpath.splitext(posixpath.basename(name))
+    path = posixpath.join(field_object.upload_to, f'{slug}-{stem}-{digest}{extension}')
+    if current == path and default_storage.exists(path):
+        return path, False
+    if not default_storage.exists(path):
+        path = default_storage.save(path, ContentFile(content))
+        stored.append(path)
+    return path, True
+
+
+def _apply(instance, values):
+    """نسخ القيم المتغيرة فقط، وإرجاع أسماء الحقول التي تغيرت"""
+    changed = []
+    for name, value in values.items():
+        current = getattr(instance, name)
+        if hasattr(current, 'name'):  # FieldFile
+            current = current.name or None
+        if current != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def _file_values(source, package, slug, model, files, instance, report, stored):
+    values = {}
+    for model_field, name in files.items():
+        current = getattr(instance, model_field).name if instance is not None else None
+        path, written = _store_file(
+            source, package, name, model._meta.get_field(model_field), slug, current, stored
+        )
+        values[model_field] = path
+        report.files_written += written
+    return values
+
+
+def _write(source, valid, report, stored):
+    """كتابة الحزم الصالحة في معاملة واحدة، وإرجاع معرفات المعامل المتأثرة"""
+    now = timezone.now()
+    slugs = [lab['slug'] for _package, lab in valid]
+    existing = {lab.slug: lab for lab in Lab.objects.filter(slug__in=slugs)}
+
+    # المعامل
+    new_labs, changed_labs, lab_fields = [], [], set()
+    for package, data in valid:
+        lab = existing.get(data['slug'])
+        values = dict(data['fields'])
+        values.update(_file_values(
+            source, package, data['slug'], Lab, data['files'], lab, report, stored
+        ))
+        if lab is None:
+            lab = Lab(slug=data['slug'], **values)
+            lab.search_document = search.build_document(lab)
+            new_labs.append(lab)
+            continue
+        changed = _apply(lab, values)
+        if changed:
+            lab.search_document = search.build_document(lab)
+            lab.updated_at = now
+            lab_fields.update(changed)
+            changed_labs.append(lab)
+        else:
+            report.labs_unchanged += 1
+
+    Lab.objects.bulk_create(new_labs, batch_size=BATCH_SIZE)
+    if changed_labs:
+        Lab.objects.bulk_update(
+            changed_labs, [*lab_fields, 'search_document', 'updated_at'], batch_size=BATCH_SIZE
+        )
+    report.labs_created = len(new_labs)
+    report.labs_updated = len(changed_labs)
+
+    # إعادة القراءة للحصول على المعرفات (لا تعيدها كل قواعد البيانات من bulk_create)
+    labs = {lab.slug: lab for lab in Lab.objects.filter(slug__in=slugs).only(
+        'pk', 'slug', 'search_document'
+    )}
+
+    # التحديات (مفتاحها المعمل والترتيب)
+    current = {
+        (challenge.lab_id, challenge.order): challenge
+        for challenge in Challenge.objects.filter(lab__in=labs.values())
+    }
+    new_challenges, changed_challenges, challenge_fields = [], [], set()
+    touched_labs = set()
+    for package, data in valid:
+        lab = labs[data['slug']]
+        for item in data['challenges']:
+            challenge = current.get((lab.pk, item['order']))
+            values = dict(item['fields'])
+            values.update(_file_values(
+                source, package, data['slug'], Challenge, item['files'], challenge, report, stored
+            ))
+            if challenge is None:
+                new_challenges.append(Challenge(lab_id=lab.pk, order=item['order'], **values))
+                touched_labs.add(lab.pk)
+                continue
+            changed = _apply(challenge, values)
+            if changed:
+                challenge.updated_at = now
+                challenge_fields.update(changed)
+                changed_challenges.append(challenge)
+                touched_labs.add(lab.pk)
+
+    Challenge.objects.bulk_create(new_challenges, batch_size=BATCH_SIZE)
+    if changed_challenges:
+        Challenge.objects.bulk_update(
+            changed_challenges, [*challenge_fields, 'updated_at'], batch_size=BATCH_SIZE
+        )
+    report.challenges_created = len(new_challenges)
+    report.challenges_updated = len(changed_challenges)
+
+    # تغيير التحديات يغيّر محتوى المعمل (ETag يعتمد على updated_at)
+    Lab.objects.filter(pk__in=touched_labs).update(updated_at=now)
+
+    affected = {labs[lab.slug].pk for lab in [*new_labs, *changed_labs]} | touched_labs
+    search_labs = [lab for lab in labs.values() if lab.pk in affected]
+    return affected, search_labs
+
+
+def import_labs(path_or_file, dry_run=False, workers=None):
+    """استيراد الحزم من مجلد أو ملف zip، وإرجاع ImportReport"""
+    report = ImportReport(dry_run=dry_run)
+    timings = report.timings
+
+    started = time.perf_counter()
+    source = open_source(path_or_file)
+    try:
+        packages = list(source.packages())
+        report.packages = len(packages)
+        timings['discover'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = validate_packages(packages, workers=workers)
+        timings['validate'] = time.perf_counter() - started
+
+        valid, seen = [], {}
+        for name, data, errors in results:
+            if data is not None and data['slug'] in seen:
+                errors = [f'slug مكرر مع الحزمة {seen[data["slug"]]}']
+            if errors:
+                report.errors[name] = errors
+                continue
+            seen[data['slug']] = name
+            valid.append((name, data))
+
+        # الاستيراد كله أو لا شيء: أي حزمة غير صالحة توقف الكتابة
+        if report.errors or dry_run:
+            return report
+
+        started = time.perf_counter()
+        stored = []
+        try:
+            with transaction.atomic():
+                affected, search_labs = _write(source, valid, report, stored)
+                timings['write'] = time.perf_counter() - started
+
+                started = time.perf_counter()
+                search.index_labs(search_labs)
+                if affected:
+                    lab_statistics.rebuild(lab_ids=list(affected))
+                transaction.on_commit(invalidate_labs)
+        except Exception:
+            # الملفات تُكتب قبل الالتزام لأن مساراتها تُحفظ في الصفوف؛ بعد التراجع لا يشير إليها شيء
+            for path in stored:
+                default_storage.delete(path)
+            raise
+        timings['post_process'] = time.perf_counter() - started
+    finally:
+        source.close()
+        timings['total'] = sum(timings.values())
+    return report
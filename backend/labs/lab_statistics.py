@@ -0,0 +1,211 @@
+# labs/lab_statistics.py
+"""
+محرك إحصائيات المعامل (LabStatistics)
+
+تُحدّث الإحصائيات تدريجياً مع كل حدث (تسليم، تقييم، بدء، إكمال، مراجعة)
+باستعلام UPDATE واحد يزيد المجاميع التراكمية ويعيد حساب المتوسطات والنسب
+منها داخل قاعدة البيانات. أما rebuild() فتعيد حساب كل المعامل من البيانات
+الأصلية باستعلام مجمع واحد لكل مصدر.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Challenge, Lab, LabReview, LabStatistics, SubmissionAttempt, UserLabProgress
+
+
+def _apply(lab_id, **changes):
+    """تطبيق التحديث، مع إنشاء صف الإحصائيات إذا لم يكن موجوداً"""
+    changes['last_calculated'] = timezone.now()
+    if LabStatistics.objects.filter(lab_id=lab_id).update(**changes):
+        return
+    LabStatistics.objects.get_or_create(lab_id=lab_id)
+    LabStatistics.objects.filter(lab_id=lab_id).update(**changes)
+
+
+def _rate(numerator, denominator):
+    """نسبة مئوية من تعبيرين، مع تجنب القسمة على صفر"""
+    return numerator * 100.0 / Greatest(denominator, 1)
+
+
+# ========================
+# الأحداث
+# ========================
+
+def record_submissions(lab_id, count=1):
+    """تسليمات جديدة"""
+    _apply(lab_id, total_submissions=F('total_submissions') + count)
+
+
+def record_graded(lab_id, graded=1, correct=0, score=0):
+    """نتائج تقييم: عدد المقيّم، عدد الصحيح، ومجموع الدرجات"""
+    graded_total = F('graded_submissions') + graded
+    _apply(
+        lab_id,
+        graded_submissions=graded_total,
+        correct_submissions=F('correct_submissions') + correct,
+        score_sum=F('score_sum') + score,
+        success_rate=_rate(F('correct_submissions') + correct, graded_total),
+        average_score=(F('score_sum') + score) * 1.0 / Greatest(graded_total, 1),
+    )
+
+
+def record_starts(lab_id, count=1):
+    """مستخدمون بدأوا المعمل"""
+    starts = F('total_starts') + count
+    _apply(
+        lab_id,
+        total_starts=starts,
+        completion_rate=_rate(F('total_completions'), starts),
+        dropout_rate=_rate(Greatest(starts - F('total_completions'), 0), starts),
+    )
+
+
+def record_completions(lab_id, count=1, time_spent=0):
+    """مستخدمون أكملوا المعمل، مع مجموع الوقت المستغرق بالثواني"""
+    completions = F('total_completions') + count
+    time_sum = F('completion_time_sum') + time_spent
+    _apply(
+        lab_id,
+        total_completions=completions,
+        completion_time_sum=time_sum,
+        completion_rate=_rate(completions, F('total_starts')),
+        dropout_rate=_rate(Greatest(F('total_starts') - completions, 0), F('total_starts')),
+        average_completion_time=time_sum * 1.0 / Greatest(completions, 1),
+    )
+    Lab.objects.filter(pk=lab_id).update(completions=F('completions') + count)
+
+
+def record_reviews(lab_id, rating_delta, count_delta):
+    """إضافة مراجعة (+) أو إزالتها (-) أو تعديل تقييمها (count_delta=0)"""
+    rating_sum = F('rating_sum') + rating_delta
+    rating_count = F('rating_count') + count_delta
+    _apply(
+        lab_id,
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        average_rating=rating_sum * 1.0 / Greatest(rating_count, 1),
+    )
+
+
+# ========================
+# إعادة البناء الكاملة
+# ========================
+
+def _rate_value(numerator, denominator):
+    return numerator * 100.0 / denominator if denominator else 0
+
+
+def rebuild(lab_ids=None):
+    """
+    إعادة حساب إحصائيات جميع المعامل (أو المحددة منها) باستعلام مجمع واحد لكل
+    مصدر: التسليمات، التقدم، المراجعات، والمعامل نفسها.
+    """
+    def scoped(queryset, field='lab_id'):
+        return queryset.filter(**{f'{field}__in': lab_ids}) if lab_ids is not None else queryset
+
+    not_pending = ~Q(status='pending')
+    submissions = {
+        row['lab_id']: row
+        for row in scoped(SubmissionAttempt.objects.all()).order_by().values('lab_id').annotate(
+            total=Count('pk'),
+            graded=Count('pk', filter=not_pending),
+            correct=Count('pk', filter=Q(status='correct')),
+            score_sum=Sum('score', filter=not_pending),
+        )
+    }
+    progress = {
+        row['lab_id']: row
+        for row in scoped(UserLabProgress.objects.all()).order_by().values('lab_id').annotate(
+            starts=Count('pk', filter=Q(is_started=True)),
+            completions=Count('pk', filter=Q(is_completed=True)),
+            time_sum=Sum('total_time_spent', filter=Q(is_completed=True)),
+        )
+    }
+    reviews = {
+        row['lab_id']: row
+        for row in scoped(LabReview.objects.filter(is_approved=True)).order_by().values('lab_id').annotate(
+            rating_sum=Sum('rating'),
+            rating_count=Count('pk'),
+        )
+    }
+    challenges = dict(
+        scoped(Challenge.objects.all()).order_by().values('lab_id').annotate(
+            total=Count('pk')
+        ).values_list('lab_id', 'total')
+    )
+    labs = list(scoped(Lab.objects.all(), 'pk').only(
+        'pk', 'views', 'completions', 'average_score', 'challenge_total'
+    ))
+
+    empty = defaultdict(int)
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            stats.lab_id: stats
+            for stats in scoped(LabStatistics.objects.select_for_update())
+        }
+        missing = [LabStatistics(lab_id=lab.pk) for lab in labs if lab.pk not in existing]
+        LabStatistics.objects.bulk_create(missing, batch_size=2000)
+        if missing:
+            existing.update({
+                stats.lab_id: stats
+                for stats in LabStatistics.objects.filter(lab_id__in=[item.lab_id for item in missing])
+            })
+
+        for lab in labs:
+            stats = existing[lab.pk]
+            sub = submissions.get(lab.pk, empty)
+            prog = progress.get(lab.pk, empty)
+            rev = reviews.get(lab.pk, empty)
+
+            stats.total_views = lab.views
+            stats.total_submissions = sub['total']
+            stats.graded_submissions = sub['graded']
+            stats.correct_submissions = sub['correct']
+            stats.score_sum = sub['score_sum'] or 0
+            stats.total_starts = prog['starts']
+            stats.total_completions = prog['completions']
+            stats.completion_time_sum = prog['time_sum'] or 0
+            stats.rating_sum = rev['rating_sum'] or 0
+            stats.rating_count = rev['rating_count']
+
+            stats.success_rate = _rate_value(stats.correct_submissions, stats.graded_submissions)
+            stats.average_score = (
+                stats.score_sum / stats.graded_submissions if stats.graded_submissions else 0
+            )
+            stats.completion_rate = _rate_value(stats.total_completions, stats.total_starts)
+            stats.dropout_rate = _rate_value(
+                max(stats.total_starts - stats.total_completions, 0), stats.total_starts
+            )
+            stats.average_completion_time = (
+                stats.completion_time_sum / stats.total_completions if stats.total_completions else 0
+            )
+            stats.average_rating = (
+                stats.rating_sum / stats.rating_count if stats.rating_count else 0
+            )
+            stats.last_calculated = now
+
+            lab.completions = stats.total_completions
+            lab.average_score = stats.average_score
+            lab.challenge_total = challenges.get(lab.pk, 0)
+
+        LabStatistics.objects.bulk_update(
+            [existing[lab.pk] for lab in labs],
+            [
+                'total_views', 'total_submissions', 'graded_submissions', 'correct_submissions',
+                'score_sum', 'total_starts', 'total_completions', 'completion_time_sum',
+                'rating_sum', 'rating_count', 'success_rate', 'average_score',
+                'completion_rate', 'dropout_rate', 'average_completion_time',
+                'average_rating', 'last_calculated',
+            ],
+            batch_size=1000,
+        )
+        Lab.objects.bulk_update(
+            labs, ['completions', 'average_score', 'challenge_total'], batch_size=1000
+        )
+
+    return len(labs)
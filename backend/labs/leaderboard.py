@@ -0,0 +1,278 @@
+# labs/leaderboard.py
+"""
+لوحة المتصدرين
+
+تُحدّث النقاط تدريجياً مع كل تسليم صحيح بدلاً من إعادة تجميع التسليمات.
+يتوفر مخزنان للترتيب (LEADERBOARD_BACKEND):
+- Redis (Sorted Sets): الترتيب والجلب بتكلفة O(log n). هو الافتراضي متى
+  ضُبط REDIS_URL، والمخزن المعتمد في الإنتاج.
+- قاعدة البيانات (LeaderboardEntry): بديل للتطوير والنشر بلا Redis. الأوائل
+  تُقرأ من فهرس (scope, -points, user)، لكن ترتيب مستخدم معين (rank) يعدّ
+  الصفوف التي تسبقه في الفهرس، أي O(ترتيبه)، ويبطؤ مع كبر اللوحة.
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+
+GLOBAL_SCOPE = 'global'
+REDIS_KEY_PREFIX = 'leaderboard:'
+
+
+def category_scope(category):
+    return f'category:{category}'
+
+
+def lab_scope(lab_id):
+    return f'lab:{lab_id}'
+
+
+def scopes_for(lab_id, category):
+    """النطاقات التي تتأثر بنقاط معمل معين"""
+    return [GLOBAL_SCOPE, category_scope(category), lab_scope(lab_id)]
+
+
+# ========================
+# مخزن قاعدة البيانات
+# ========================
+
+class DatabaseLeaderboard:
+    """ترتيب المتصدرين في جدول LeaderboardEntry (البديل عند عدم توفر Redis)"""
+
+    def increment(self, scope, user_id, points):
+        from .models import LeaderboardEntry
+
+        updated = LeaderboardEntry.objects.filter(scope=scope, user_id=user_id).update(
+            points=F('points') + points
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                LeaderboardEntry.objects.create(scope=scope, user_id=user_id, points=points)
+        except IntegrityError:
+            # أنشأ طلب آخر الصف في نفس اللحظة
+            LeaderboardEntry.objects.filter(scope=scope, user_id=user_id).update(
+                points=F('points') + points
+            )
+
+    def top(self, scope, limit, offset=0):
+        from .models import LeaderboardEntry
+
+        rows = LeaderboardEntry.objects.filter(scope=scope).order_by('-points', 'user_id').values_list(
+            'user_id', 'points'
+        )[offset:offset + limit]
+        return [(user_id, points, offset + index + 1) for index, (user_id, points) in enumerate(rows)]
+
+    def score(self, scope, user_id):
+        from .models import LeaderboardEntry
+
+        return LeaderboardEntry.objects.filter(scope=scope, user_id=user_id).values_list(
+            'points', flat=True
+        ).first()
+
+    def rank(self, scope, user_id):
+        """عدّ من يسبق المستخدم في الفهرس: O(الترتيب)، ولهذا Redis هو الافتراضي"""
+        from .models import LeaderboardEntry
+
+        points = self.score(scope, user_id)
+        if points is None:
+            return None
+        # عدّان منفصلان يمسح كل منهما مدى متصلاً من الفهرس؛ شرط OR واحد يمسح النطاق كله
+        entries = LeaderboardEntry.objects.filter(scope=scope)
+        higher = entries.filter(points__gt=points).count()
+        tied = entries.filter(points=points, user_id__lt=user_id).count()
+        return higher + tied + 1
+
+    def replace(self, entries):
+        """استبدال جميع الإدخالات (يُستخدم عند إعادة البناء)"""
+        from .models import LeaderboardEntry
+
+        with transaction.atomic():
+            LeaderboardEntry.objects.all().delete()
+            LeaderboardEntry.objects.bulk_create(
+                (LeaderboardEntry(scope=scope, user_id=user_id, points=points)
+                 for (scope, user_id), points in entries.items()),
+                batch_size=5000,
+            )
+
+
+# ========================
+# مخزن Redis
+# ========================
+
+class RedisLeaderboard:
+    """ترتيب المتصدرين في Sorted Sets داخل Redis"""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, scope):
+        return f'{REDIS_KEY_PREFIX}{scope}'
+
+    def increment(self, scope, user_id, points):
+        self.client.zincrby(self._key(scope), points, user_id)
+
+    def top(self, scope, limit, offset=0):
+        rows = self.client.zrevrange(self._key(scope), offset, offset + limit - 1, withscores=True)
+        return [(int(user_id), int(points), offset + index + 1)
+                for index, (user_id, points) in enumerate(rows)]
+
+    def score(self, scope, user_id):
+        points = self.client.zscore(self._key(scope), user_id)
+        return None if points is None else int(points)
+
+    def rank(self, scope, user_id):
+        rank = self.client.zrevrank(self._key(scope), user_id)
+        return None if rank is None else rank + 1
+
+    def replace(self, entries):
+        by_scope = defaultdict(dict)
+        for (scope, user_id), points in entries.items():
+            by_scope[scope][user_id] = points
+
+        pipe = self.client.pipeline()
+        for key in self.client.scan_iter(f'{REDIS_KEY_PREFIX}*'):
+            pipe.delete(key)
+        for scope, members in by_scope.items():
+            pipe.zadd(self._key(scope), members)
+        pipe.execute()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """المخزن المستخدم حسب الإعداد LEADERBOARD_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if getattr(settings, 'LEADERBOARD_BACKEND', 'db') == 'redis':
+                    _backend = RedisLeaderboard(settings.REDIS_URL)
+                else:
+                    _backend = DatabaseLeaderboard()
+    return _backend
+
+
+# ========================
+# التحديث التدريجي
+# ========================
+
+def record_points(user_id, lab_id, category, points, completed_labs=0):
+    """إضافة نقاط التسليمات الصحيحة إلى الملف الشخصي وجميع النطاقات المتأثرة"""
+    from .models import UserProfile
+
+    profile_update = {'total_points': F('total_points') + points}
+    if completed_labs:
+        profile_update['completed_labs_count'] = F('completed_labs_count') + completed_labs
+
+    if not UserProfile.objects.filter(user_id=user_id).update(**profile_update):
+        UserProfile.objects.get_or_create(user_id=user_id)
+        UserProfile.objects.filter(user_id=user_id).update(**profile_update)
+
+    if not points:
+        return
+
+    board = get_leaderboard()
+
+    def apply():
+        for scope in scopes_for(lab_id, category):
+            board.increment(scope, user_id, points)
+
+    if isinstance(board, DatabaseLeaderboard):
+        apply()
+    else:
+        # Redis خارج المعاملة: لا نكتب إلا بعد نجاحها حتى لا تتكرر النقاط عند الإعادة
+        transaction.on_commit(apply)
+
+
+# ========================
+# القراءة
+# ========================
+
+def _with_usernames(rows):
+    User = get_user_model()
+    usernames = dict(
+        User.objects.filter(pk__in=[user_id for user_id, _, _ in rows]).values_list('pk', 'username')
+    )
+    return [
+        {'rank': rank, 'user_id': user_id, 'username': usernames.get(user_id), 'points': points}
+        for user_id, points, rank in rows
+    ]
+
+
+def top(scope, limit=10):
+    """أعلى limit مستخدم في النطاق"""
+    return _with_usernames(get_leaderboard().top(scope, limit))
+
+
+def around(scope, user_id, neighbours=5):
+    """ترتيب المستخدم مع المستخدمين المحيطين به"""
+    board = get_leaderboard()
+    rank = board.rank(scope, user_id)
+    if rank is None:
+        return {'rank': None, 'points': 0, 'entries': []}
+
+    offset = max(rank - 1 - neighbours, 0)
+    rows = board.top(scope, neighbours * 2 + 1, offset=offset)
+    return {
+        'rank': rank,
+        'points': board.score(scope, user_id),
+        'entries': _with_usernames(rows),
+    }
+
+
+# ========================
+# إعادة البناء الكاملة
+# ========================
+
+def rebuild():
+    """
+    إعادة حساب جميع النطاقات من التسليمات الصحيحة في استعلام واحد مجمع،
+    وتحديث total_points و completed_labs_count و rank في الملفات الشخصية.
+    """
+    from .models import Submission, UserProfile
+
+    entries = defaultdict(int)
+    completed_labs = defaultdict(int)
+    rows = Submission.objects.filter(status='correct').values(
+        'user_id', 'lab_id', 'lab__category'
+    ).annotate(points=Sum('score')).iterator(chunk_size=5000)
+
+    for row in rows:
+        user_id, points = row['user_id'], row['points'] or 0
+        entries[(GLOBAL_SCOPE, user_id)] += points
+        entries[(category_scope(row['lab__category']), user_id)] += points
+        entries[(lab_scope(row['lab_id']), user_id)] += points
+        completed_labs[user_id] += 1
+
+    get_leaderboard().replace(entries)
+
+    totals = sorted(
+        ((user_id, points) for (scope, user_id), points in entries.items() if scope == GLOBAL_SCOPE),
+        key=lambda item: (-item[1], item[0]),
+    )
+    ranks = {user_id: index + 1 for index, (user_id, _) in enumerate(totals)}
+
+    with transaction.atomic():
+        existing = set(UserProfile.objects.values_list('user_id', flat=True))
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in ranks if user_id not in existing],
+            batch_size=5000,
+        )
+        profiles = list(UserProfile.objects.only('pk', 'user_id'))
+        for profile in profiles:
+            profile.total_points = entries.get((GLOBAL_SCOPE, profile.user_id), 0)
+            profile.completed_labs_count = completed_labs.get(profile.user_id, 0)
+            profile.rank = ranks.get(profile.user_id, 0)
+        UserProfile.objects.bulk_update(
+            profiles, ['total_points', 'completed_labs_count', 'rank'], batch_size=5000
+        )
+
+    return len(ranks)
@@ -0,0 +1,459 @@
+# labs/management/commands/benchmark.py
+import resource
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'قياس أداء مكونات المنصة'
+
+    suites = {
+        'runner': 'bench_runner',
+        'submission_stats': 'bench_submission_stats',
+        'search': 'bench_search',
+        'payload': 'bench_payload',
+        'fastpath': 'bench_fastpath',
+        'leaderboard': 'bench_leaderboard',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(self.suites))
+        parser.add_argument('--count', type=int, default=100,
+                            help='عدد العمليات (أو الصفوف) في القياس')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='عدد الطلبات المتزامنة')
+        parser.add_argument('--repeat', type=int, default=None,
+                            help='عدد مرات تكرار كل قياس (الافتراضي حسب المجموعة)')
+
+    def handle(self, *args, **options):
+        getattr(self, self.suites[options['suite']])(**options)
+
+    def timed(self, func, repeat):
+        """تنفيذ الدالة عدة مرات وإرجاع قائمة الأزمنة بالثواني"""
+        timings = []
+        for index in range(repeat):
+            started = time.perf_counter()
+            func(index)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def latency_rows(self, timings):
+        return [
+            ('المتوسط (ms)', f'{statistics.mean(timings) * 1000:.3f}'),
+            ('p50 (ms)', f'{_percentile(timings, 50) * 1000:.3f}'),
+            ('p95 (ms)', f'{_percentile(timings, 95) * 1000:.3f}'),
+        ]
+
+    def report(self, title, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for label, value in rows:
+            self.stdout.write(f'  {label:<32} {value}')
+
+    # ========================
+    # مشغّل الكود
+    # ========================
+
+    def bench_runner(self, count, concurrency, **options):
+        """عدد التسليمات في الثانية لمشغّل الكود مع ثلاث حالات اختبار لكل تسليم"""
+        from labs.runner import run_tests
+
+        code = 'import sys\nprint(sum(int(x) for x in sys.stdin.read().split()))\n'
+        test_cases = [
+            {'input': '1 2 3', 'expected_output': '6'},
+            {'input': '10 20', 'expected_output': '30'},
+            {'input': '', 'expected_output': '0'},
+        ]
+
+        latencies = []
+
+        def submit(_):
+            started = time.perf_counter()
+            report = run_tests(code, test_cases)
+            latencies.append(time.perf_counter() - started)
+            return report.passed == report.total
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            passed = sum(pool.map(submit, range(count)))
+        elapsed = time.perf_counter() - started
+
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        self.report('مشغّل الكود', [
+            ('التسليمات', count),
+            ('الناجحة', passed),
+            ('تسليمات/ثانية', f'{count / elapsed:.1f}'),
+            ('متوسط زمن التسليم (ms)', f'{statistics.mean(latencies) * 1000:.1f}'),
+            ('p95 (ms)', f'{_percentile(latencies, 95) * 1000:.1f}'),
+            ('أقصى ذاكرة لعملية فرعية (KB)', children.ru_maxrss),
+            ('أقصى ذاكرة للعملية الرئيسية (KB)', own.ru_maxrss),
+        ])
+
+    # ========================
+    # إحصائيات التسليمات
+    # ========================
+
+    def bench_submission_stats(self, count, **options):
+        """
+        زمن تسجيل محاولة (submit_attempt) بعد تعبئة سجل المحاولات بعدد count من
+        المحاولات المتكررة لنفس التحدي. تُنفذ داخل معاملة يتم التراجع عنها في النهاية.
+        """
+        from django.contrib.auth import get_user_model
+        from labs.attempts import submit_attempt
+        from labs.models import Challenge, Lab, Submission, SubmissionAttempt
+
+        User = get_user_model()
+        sample = 200
+
+        with transaction.atomic():
+            lab = Lab.objects.create(title='bench', slug='bench-submission-stats', description='bench')
+            challenge = Challenge.objects.create(
+                lab=lab, title='bench', description='bench',
+                answer_type='flag', correct_answer='flag',
+            )
+            User.objects.bulk_create(
+                User(username=f'bench-stats-{index}') for index in range(100)
+            )
+            users = list(User.objects.filter(username__startswith='bench-stats-').order_by('pk'))
+            submissions = Submission.objects.bulk_create(
+                Submission(user=user, lab=lab, challenge=challenge, answer='x') for user in users
+            )
+
+            for offset in range(0, count, 5000):
+                SubmissionAttempt.objects.bulk_create(
+                    SubmissionAttempt(
+                        submission=submissions[index % len(users)], user=users[index % len(users)],
+                        lab=lab, challenge=challenge, answer='x', status='incorrect',
+                    )
+                    for index in range(offset, min(offset + 5000, count))
+                )
+
+            timings = self.timed(
+                lambda index: submit_attempt(users[index % len(users)], challenge, answer='flag'),
+                sample,
+            )
+            self.report(f'submit_attempt() بعد {count} محاولة', self.latency_rows(timings))
+
+            solved = self.timed(
+                lambda index: Submission.objects.filter(
+                    user=users[index % len(users)], challenge=challenge, status='correct'
+                ).exists(),
+                sample,
+            )
+            self.report('هل حل المستخدم التحدي؟', self.latency_rows(solved))
+
+            for size in (count, count * 10):
+                self.bench_counter_updates(lab, users, size)
+            transaction.set_rollback(True)
+
+    def bench_counter_updates(self, lab, users, size):
+        """
+        زمن تطبيق size تسليم على عدادات التحديات (attempts و solved_count و
+        success_rate): مسار save() القديم لكل تسليم، ثم تحديثات F() لكل تسليم
+        وبالدفعات، ثم المستهلك كاملاً (process_batch) بحدث واحد وبالدفعات؛ المستهلك
+        يحدّث أيضاً إحصائيات المعمل والنقاط ولوحة الصدارة. كل تشغيل داخل savepoint
+        يُتراجع عنه حتى تبدأ جميع الطرق من نفس البيانات.
+        """
+        from collections import Counter
+
+        from django.conf import settings
+        from labs import events
+        from labs.models import Challenge, DomainEvent, Submission
+
+        batch_size = getattr(settings, 'DOMAIN_EVENTS_BATCH_SIZE', 500)
+
+        challenges = Challenge.objects.bulk_create(
+            Challenge(
+                lab=lab, title=f'bench-counter-{index}', description='bench',
+                answer_type='flag', correct_answer='flag', order=index + 1,
+            )
+            for index in range(10)
+        )
+        Submission.objects.bulk_create(
+            Submission(
+                user=user, lab=lab, challenge=challenge, answer='x',
+                status='correct' if index % 2 else 'incorrect',
+            )
+            for challenge in challenges
+            for index, user in enumerate(users)
+        )
+        graded = [
+            {
+                'attempt_id': None, 'submission_id': None,
+                'lab_id': lab.pk, 'category': lab.category,
+                'challenge_id': challenges[index % len(challenges)].pk,
+                'user_id': users[index % len(users)].pk,
+                'status': 'correct' if index % 3 == 0 else 'incorrect',
+                'score': 10 if index % 3 == 0 else 0,
+                'newly_solved': index % 3 == 0, 'first_in_lab': False,
+            }
+            for index in range(size)
+        ]
+
+        def legacy():
+            # ما كان يفعله Submission.save() قبل العدادات: تحميل التحدي وعدّ
+            # الحلول الصحيحة وحفظ الصف كاملاً لكل تسليم
+            for payload in graded:
+                challenge = Challenge.objects.get(pk=payload['challenge_id'])
+                challenge.attempts += 1
+                if payload['status'] == 'correct':
+                    challenge.success_rate = (
+                        challenge.get_successful_submissions() / challenge.attempts * 100
+                    )
+                challenge.save()
+
+        def counters(batch_size):
+            # نفس عدادات التحدي فقط كما يجمعها المستهلك: UPDATE واحد لكل تحدٍ في الدفعة
+            def run():
+                for start in range(0, size, batch_size):
+                    batch = graded[start:start + batch_size]
+                    attempts = Counter(p['challenge_id'] for p in batch)
+                    for challenge_id, amount in attempts.items():
+                        Challenge.record_attempt(challenge_id, amount)
+                    solved = Counter(p['challenge_id'] for p in batch if p['newly_solved'])
+                    for challenge_id, amount in solved.items():
+                        Challenge.record_success(challenge_id, amount)
+            return run
+
+        def consumer(batch_size):
+            def run():
+                DomainEvent.objects.bulk_create(
+                    DomainEvent(event_type=event_type, payload=payload)
+                    for payload in graded
+                    for event_type, payload in (
+                        (events.SUBMISSION_CREATED,
+                         {'challenge_id': payload['challenge_id'], 'lab_id': payload['lab_id']}),
+                        (events.SUBMISSION_GRADED, payload),
+                    )
+                )
+                started = time.perf_counter()
+                events.process_pending(batch_size)
+                return time.perf_counter() - started
+            return run
+
+        def measure(func):
+            savepoint = transaction.savepoint()
+            started = time.perf_counter()
+            elapsed = func()
+            if elapsed is None:
+                elapsed = time.perf_counter() - started
+            transaction.savepoint_rollback(savepoint)
+            return elapsed
+
+        rows = []
+        for label, func in (
+            ('save() لكل تسليم (قبل)', legacy),
+            ('عدادات F() لكل تسليم', counters(1)),
+            ('عدادات F() بدفعات', counters(batch_size)),
+            ('process_batch بحدث واحد', consumer(1)),
+            ('process_batch بدفعات', consumer(batch_size)),
+        ):
+            elapsed = measure(func)
+            rows.append((
+                label,
+                f'{elapsed * 1000:.1f} ms  {elapsed / size * 1e6:.0f} µs/تسليم  '
+                f'{size / elapsed:.0f} تسليم/ثانية',
+            ))
+        self.report(f'تحديث العدادات لـ {size} تسليم على {len(challenges)} تحديات', rows)
+        Challenge.objects.filter(pk__in=[challenge.pk for challenge in challenges]).delete()
+
+    # ========================
+    # البحث النصي
+    # ========================
+
+    def bench_search(self, count, **options):
+        """زمن البحث بعد إنشاء count معمل بعناوين عربية وإنجليزية"""
+        import random
+        from labs import search
+        from labs.models import Lab
+
+        words = [
+            'أمن', 'الويب', 'الشبكات', 'التشفير', 'الهندسة', 'العكسية', 'تحليل',
+            'البرمجيات', 'الخبيثة', 'ثغرة', 'حقن', 'sql', 'xss', 'buffer', 'overflow',
+            'forensics', 'packet', 'capture', 'إثبات', 'المفاهيم', 'مُتَقَدِّم',
+        ]
+        queries = ['امن', 'الشبكات', 'sql injection', 'تحليل البرمجيات الخبيثه', 'متقدم', 'overflow']
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            search.ensure_index()
+            labs = []
+            for index in range(count):
+                lab = Lab(
+                    title=' '.join(rng.choices(words, k=4)),
+                    slug=f'bench-search-{index}',
+                    description=' '.join(rng.choices(words, k=40)),
+                    overview=' '.join(rng.choices(words, k=20)),
+                )
+                lab.search_document = search.build_document(lab)
+                labs.append(lab)
+            Lab.objects.bulk_create(labs, batch_size=2000)
+            search.index_labs(Lab.objects.filter(slug__startswith='bench-search-').only(
+                'pk', 'search_document'
+            ))
+
+            for query in queries:
+                timings = self.timed(
+                    lambda _: list(search.search(Lab.objects.active(), query).values_list('pk', flat=True)[:20]),
+                    20,
+                )
+                self.report(f'بحث "{query}" في {count} معمل', self.latency_rows(timings))
+            transaction.set_rollback(True)
+
+    # ========================
+    # حجم استجابة قائمة المعامل
+    # ========================
+
+    def bench_payload(self, count, repeat=None, **options):
+        """حجم وزمن تحويل صفحة من count معمل: الـ Serializer الكامل مقابل المختصر مع .only()"""
+        from rest_framework.renderers import JSONRenderer
+        from labs.models import Lab
+        from labs.serializers import LabListSerializer, LabSerializer
+
+        text = 'نص تجريبي طويل لوصف المعمل وأهدافه ' * 40
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            Lab.objects.bulk_create(
+                (Lab(title=f'bench {index}', slug=f'bench-payload-{index}', description=text,
+                     overview=text, learning_objectives=text)
+                 for index in range(count)),
+                batch_size=2000,
+            )
+            queryset = Lab.objects.filter(slug__startswith='bench-payload-')
+            columns = LabListSerializer.model_fields_for(None)
+
+            variants = [
+                ('LabSerializer', LabSerializer, lambda: queryset),
+                ('LabListSerializer + only()', LabListSerializer, lambda: queryset.only(*columns)),
+            ]
+            results = []
+            for title, serializer_class, rows in variants:
+                sizes = []
+
+                def render(_):
+                    sizes.append(len(renderer.render(serializer_class(list(rows()), many=True).data)))
+
+                timings = self.timed(render, repeat or 10)
+                results.append((sizes[-1], statistics.mean(timings)))
+                self.report(f'{title} ({count} معمل)', [
+                    ('حجم الاستجابة (بايت)', sizes[-1]),
+                    *self.latency_rows(timings),
+                ])
+            (full_size, full_time), (list_size, list_time) = results
+            self.report('المختصر مقارنة بالكامل', [
+                ('نسبة الحجم', f'{list_size / full_size:.1%}'),
+                ('نسبة الزمن', f'{list_time / full_time:.1%}'),
+            ])
+            transaction.set_rollback(True)
+
+    # ========================
+    # المسار السريع لقائمة المعامل
+    # ========================
+
+    def bench_fastpath(self, count, repeat=None, **options):
+        """طلبات/ثانية لـ /api/labs/ بالـ Serializer العادي مقابل المسار السريع"""
+        from django.test import override_settings
+        from rest_framework.pagination import PageNumberPagination
+        from rest_framework.test import APIRequestFactory
+        from labs.models import Lab
+        from labs.views import LabViewSet
+
+        factory = APIRequestFactory()
+        repeat = repeat or 50
+        page_size = min(count, 100)
+        # قائمة المعامل لا تقبل page_size من العميل، فتُحدد الصفحة هنا
+        pagination = type('BenchPagination', (PageNumberPagination,), {'page_size': page_size})
+
+        with transaction.atomic():
+            Lab.objects.bulk_create(
+                (Lab(title=f'bench {index}', slug=f'bench-fastpath-{index}', description='bench',
+                     category=Lab.CATEGORY_CHOICES[index % len(Lab.CATEGORY_CHOICES)][0],
+                     difficulty=Lab.DIFFICULTY_CHOICES[index % len(Lab.DIFFICULTY_CHOICES)][0])
+                 for index in range(count)),
+                batch_size=2000,
+            )
+
+            for title, fast in (('LabSerializer', False), ('المسار السريع', True)):
+                # بدون تخزين الاستجابات: وإلا كانت كل الطلبات بعد الأولى إصابة
+                view = LabViewSet.as_view(
+                    {'get': 'list'}, throttle_classes=[], cached_actions=(),
+                    pagination_class=pagination,
+                )
+
+                def request(_):
+                    response = view(factory.get('/api/labs/'))
+                    response.render()
+                    assert len(response.data['results']) == page_size
+
+                with override_settings(FAST_SERIALIZATION=fast):
+                    timings = self.timed(request, repeat)
+                self.report(f'{title} (صفحة من {page_size} معمل)', [
+                    ('طلبات/ثانية', f'{repeat / sum(timings):.1f}'),
+                    *self.latency_rows(timings),
+                ])
+            transaction.set_rollback(True)
+
+    # ========================
+    # لوحة المتصدرين (مخزن قاعدة البيانات)
+    # ========================
+
+    def bench_leaderboard(self, count, repeat=None, **options):
+        """
+        زمن top و rank و around في DatabaseLeaderboard مع count مستخدم في النطاق
+        العام. rank يعدّ من يسبق المستخدم، فيُقاس عند عدة مواقع في الترتيب.
+        """
+        import random
+        from django.contrib.auth import get_user_model
+        from labs import leaderboard
+        from labs.models import LeaderboardEntry
+
+        User = get_user_model()
+        board = leaderboard.DatabaseLeaderboard()
+        scope = leaderboard.GLOBAL_SCOPE
+        repeat = repeat or 50
+        rng = random.Random(42)
+
+        with transaction.atomic():
+            for offset in range(0, count, 5000):
+                User.objects.bulk_create(
+                    User(username=f'bench-board-{index}')
+                    for index in range(offset, min(offset + 5000, count))
+                )
+            user_ids = list(
+                User.objects.filter(username__startswith='bench-board-').values_list('pk', flat=True)
+            )
+            # مدى نقاط ضيق نسبياً حتى تكثر التعادلات كما في الواقع
+            LeaderboardEntry.objects.filter(scope=scope).delete()
+            for offset in range(0, count, 5000):
+                LeaderboardEntry.objects.bulk_create(
+                    LeaderboardEntry(scope=scope, user_id=user_id, points=rng.randint(0, count // 10))
+                    for user_id in user_ids[offset:offset + 5000]
+                )
+            ordered = [user_id for user_id, _points, _rank in board.top(scope, count)]
+
+            self.report(f'top(10) من {count} مستخدم', self.latency_rows(
+                self.timed(lambda _: board.top(scope, 10), repeat)
+            ))
+            for percent in (0, 1, 50, 99):
+                user_id = ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+                self.report(f'rank() لمستخدم عند {percent}% من الترتيب', self.latency_rows(
+                    self.timed(lambda _: board.rank(scope, user_id), repeat)
+                ))
+            user_id = ordered[len(ordered) // 2]
+            self.report('around() بخمسة جيران عند منتصف الترتيب', self.latency_rows(
+                self.timed(lambda _: leaderboard.around(scope, user_id, 5), repeat)
+            ))
+            transaction.set_rollback(True)
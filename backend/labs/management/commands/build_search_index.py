@@ -0,0 +1,16 @@
+# labs/management/commands/build_search_index.py
+from django.core.management.base import BaseCommand
+
+from labs.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'إنشاء فهرس البحث النصي الكامل وإعادة فهرسة جميع المعامل'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--database', default=None, help='القاعدة المطلوب فهرستها (قاعدة الكتابة افتراضياً)')
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'], using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f'تمت فهرسة {total} معمل'))
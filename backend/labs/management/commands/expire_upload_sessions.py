@@ -0,0 +1,12 @@
+# labs/management/commands/expire_upload_sessions.py
+from django.core.management.base import BaseCommand
+
+from labs.uploads import expire_sessions
+
+
+class Command(BaseCommand):
+    help = 'إنهاء جلسات الرفع المتروكة وحذف ملفاتها المؤقتة'
+
+    def handle(self, *args, **options):
+        total = expire_sessions()
+        self.stdout.write(self.style.SUCCESS(f'تم إنهاء {total} جلسة رفع'))
@@ -0,0 +1,49 @@
+# labs/management/commands/export_data.py
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from labs import export
+
+
+class Command(BaseCommand):
+    help = 'تصدير التسليمات أو المحاولات أو التقدم إلى ملف CSV/NDJSON (مع gzip اختياري)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument('--output', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='ضغط الناتج بـ gzip')
+        parser.add_argument('--lab', type=int, dest='lab_id', help='معرف معمل محدد')
+        parser.add_argument('--since', help='من تاريخ (ISO)')
+        parser.add_argument('--until', help='حتى تاريخ (ISO)')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+        parser.add_argument('--file', help='مسار الملف (الافتراضي: المخرج القياسي)')
+
+    def handle(self, *args, **options):
+        try:
+            chunks = export.stream_export(
+                options['kind'], output=options['output'], compress=options['gzip'],
+                chunk_size=options['chunk_size'], lab_id=options['lab_id'],
+                since=export.parse_moment(options['since']),
+                until=export.parse_moment(options['until'], end_of_day=True),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        started = time.perf_counter()
+        written = 0
+        target = open(options['file'], 'wb') if options['file'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                target.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['file']:
+                target.close()
+
+        if options['file']:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'تم تصدير {written} بايت إلى {options["file"]} خلال {elapsed:.2f} ثانية'
+            ))
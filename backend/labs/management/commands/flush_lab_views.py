@@ -0,0 +1,12 @@
+# labs/management/commands/flush_lab_views.py
+from django.core.management.base import BaseCommand
+
+from labs.counters import flush_views
+
+
+class Command(BaseCommand):
+    help = 'كتابة مشاهدات المعامل المجمعة في قاعدة البيانات'
+
+    def handle(self, *args, **options):
+        updated = flush_views()
+        self.stdout.write(self.style.SUCCESS(f'تم تحديث مشاهدات {updated} معمل'))
@@ -0,0 +1,28 @@
+# labs/management/commands/import_labs.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from labs.importer import PackageError, import_labs
+
+
+class Command(BaseCommand):
+    help = 'استيراد المعامل والتحديات من مجلد أو ملف zip يحتوي حزماً بملف lab.json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='مسار المجلد أو ملف zip')
+        parser.add_argument('--dry-run', action='store_true', help='التحقق فقط بدون كتابة')
+        parser.add_argument('--workers', type=int, help='عدد عمليات التحقق المتوازية')
+
+    def handle(self, *args, **options):
+        try:
+            report = import_labs(options['source'], dry_run=options['dry_run'], workers=options['workers'])
+        except PackageError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(json.dumps(report.as_dict(), ensure_ascii=False, indent=2))
+        if report.errors:
+            raise CommandError(f'{len(report.errors)} حزمة غير صالحة، لم يُستورد شيء')
+        self.stdout.write(self.style.SUCCESS(
+            f'تم استيراد {report.packages} حزمة خلال {report.timings["total"]:.2f} ثانية'
+        ))
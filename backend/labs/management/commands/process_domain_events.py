@@ -0,0 +1,36 @@
+# labs/management/commands/process_domain_events.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from labs.events import process_pending, prune_processed
+
+
+class Command(BaseCommand):
+    help = 'تطبيق الأحداث المعلقة في صندوق الصادر على الإحصائيات والعدادات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true',
+                            help='الاستمرار في المعالجة كعامل دائم')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='ثواني الانتظار عند عدم وجود أحداث (مع --loop)')
+        parser.add_argument('--prune', action='store_true',
+                            help='حذف الأحداث المعالجة الأقدم من DOMAIN_EVENTS_RETENTION ثم الخروج')
+        parser.add_argument('--retention', type=int, default=None,
+                            help='مدة الاحتفاظ بالثواني (مع --prune)')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            deleted = prune_processed(retention=options['retention'])
+            self.stdout.write(f'تم حذف {deleted} حدث معالج')
+            return
+
+        while True:
+            processed = process_pending(batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f'تمت معالجة {processed} حدث')
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
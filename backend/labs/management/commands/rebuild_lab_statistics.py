@@ -0,0 +1,20 @@
+# labs/management/commands/rebuild_lab_statistics.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from labs.lab_statistics import rebuild
+
+
+class Command(BaseCommand):
+    help = 'إعادة حساب إحصائيات جميع المعامل من التسليمات والتقدم والمراجعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lab', type=int, action='append', dest='lab_ids',
+                            help='معرف معمل محدد (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild(lab_ids=options['lab_ids'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'تم حساب إحصائيات {total} معمل خلال {elapsed:.2f} ثانية'))
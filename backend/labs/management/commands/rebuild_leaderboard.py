@@ -0,0 +1,12 @@
+# labs/management/commands/rebuild_leaderboard.py
+from django.core.management.base import BaseCommand
+
+from labs.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء لوحة المتصدرين ونقاط المستخدمين وترتيبهم من التسليمات الصحيحة'
+
+    def handle(self, *args, **options):
+        ranked = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'تم ترتيب {ranked} مستخدم'))
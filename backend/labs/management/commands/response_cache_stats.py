@@ -0,0 +1,23 @@
+# labs/management/commands/response_cache_stats.py
+from django.core.management.base import BaseCommand
+
+from labs.response_cache import get_metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = 'عرض نسبة الإصابة في الذاكرة المؤقتة للاستجابات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', action='append', dest='names',
+                            help='اسم الـ ViewSet (يمكن تكراره)، الافتراضي LabViewSet')
+        parser.add_argument('--reset', action='store_true', help='تصفير العدادات بعد العرض')
+
+    def handle(self, *args, **options):
+        names = options['names'] or ['LabViewSet']
+        for name, metrics in get_metrics(names).items():
+            self.stdout.write(
+                f"{name}: إصابات={metrics['hits']} إخفاقات={metrics['misses']} "
+                f"نسبة الإصابة={metrics['hit_ratio']}%"
+            )
+        if options['reset']:
+            reset_metrics(names)
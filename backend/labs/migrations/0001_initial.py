@@ -0,0 +1,376 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:18
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='بصمة SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='الحجم (بايت)')),
+                ('file', models.FileField(max_length=255, upload_to='', verbose_name='الملف')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'ملف مخزن',
+                'verbose_name_plural': 'الملفات المخزنة',
+            },
+        ),
+        migrations.CreateModel(
+            name='DomainEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=64, verbose_name='نوع الحدث')),
+                ('payload', models.JSONField(default=dict, verbose_name='البيانات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المعالجة')),
+            ],
+            options={
+                'verbose_name': 'حدث',
+                'verbose_name_plural': 'صندوق الأحداث',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='labs_event_pending_idx'), models.Index(fields=['event_type', 'created_at'], name='labs_domain_event_t_cf9938_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Lab',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='عنوان المعمل')),
+                ('slug', models.SlugField(max_length=200, unique=True, verbose_name='الرابط')),
+                ('description', models.TextField(verbose_name='الوصف')),
+                ('overview', models.TextField(blank=True, verbose_name='نظرة عامة')),
+                ('learning_objectives', models.TextField(blank=True, verbose_name='أهداف التعلم')),
+                ('category', models.CharField(choices=[('web_security', 'أمن الويب'), ('network_security', 'أمن الشبكات'), ('cryptography', 'التشفير'), ('digital_forensics', 'التحقيق الجنائي الرقمي'), ('reverse_engineering', 'الهندسة العكسية'), ('malware_analysis', 'تحليل البرمجيات الخبيثة'), ('social_engineering', 'الهندسة الاجتماعية'), ('iot_security', 'أمن إنترنت الأشياء')], default='web_security', max_length=100, verbose_name='التصنيف')),
+                ('difficulty', models.CharField(choices=[('beginner', 'مبتدئ'), ('intermediate', 'متوسط'), ('advanced', 'متقدم'), ('expert', 'خبير')], default='beginner', max_length=20, verbose_name='مستوى الصعوبة')),
+                ('points', models.IntegerField(default=100, verbose_name='النقاط')),
+                ('estimated_time', models.IntegerField(default=60, verbose_name='الوقت المقدر (دقيقة)')),
+                ('thumbnail', models.ImageField(blank=True, null=True, upload_to='labs/thumbnails/', verbose_name='الصورة المصغرة')),
+                ('thumbnail_variants', models.JSONField(blank=True, default=dict, editable=False, verbose_name='نسخ الصورة المصغرة')),
+                ('lab_guide', models.FileField(blank=True, null=True, upload_to='labs/guides/', verbose_name='دليل المعمل')),
+                ('starter_files', models.FileField(blank=True, null=True, upload_to='labs/starter_files/', verbose_name='ملفات البدء')),
+                ('solution_file', models.FileField(blank=True, null=True, upload_to='labs/solutions/', verbose_name='ملف الحل')),
+                ('is_premium', models.BooleanField(default=False, verbose_name='مميز')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('requires_vm', models.BooleanField(default=False, verbose_name='يتطلب جهاز افتراضي')),
+                ('vm_image', models.CharField(blank=True, max_length=200, verbose_name='صورة الجهاز الافتراضي')),
+                ('views', models.IntegerField(default=0, verbose_name='عدد المشاهدات')),
+                ('completions', models.IntegerField(default=0, verbose_name='عدد الإكمالات')),
+                ('average_score', models.FloatField(default=0, verbose_name='متوسط النقاط')),
+                ('challenge_total', models.IntegerField(default=0, editable=False, verbose_name='عدد التحديات')),
+                ('search_document', models.TextField(blank=True, editable=False, verbose_name='نص البحث')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ النشر')),
+            ],
+            options={
+                'verbose_name': 'معمل',
+                'verbose_name_plural': 'المعامل',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['category'], name='labs_lab_categor_af8cb9_idx'), models.Index(fields=['difficulty'], name='labs_lab_difficu_731b9f_idx'), models.Index(fields=['is_active'], name='labs_lab_is_acti_052382_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Challenge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='عنوان التحدي')),
+                ('description', models.TextField(verbose_name='وصف التحدي')),
+                ('instructions', models.TextField(blank=True, verbose_name='التعليمات')),
+                ('hint', models.TextField(blank=True, verbose_name='تلميح')),
+                ('solution_hint', models.TextField(blank=True, verbose_name='تلميح الحل')),
+                ('challenge_type', models.CharField(default='regular', max_length=20, verbose_name='نوع التحدي')),
+                ('answer_type', models.CharField(choices=[('text', 'نص'), ('code', 'كود'), ('file', 'ملف'), ('flag', 'علم'), ('multiple_choice', 'اختيار متعدد'), ('code_output', 'مخرجات الكود')], max_length=20, verbose_name='نوع الإجابة')),
+                ('level', models.CharField(choices=[('easy', 'سهل'), ('medium', 'متوسط'), ('hard', 'صعب')], default='medium', max_length=20, verbose_name='مستوى التحدي')),
+                ('correct_answer', models.TextField(verbose_name='الإجابة الصحيحة')),
+                ('correct_code', models.TextField(blank=True, verbose_name='الكود الصحيح')),
+                ('expected_output', models.TextField(blank=True, verbose_name='المخرجات المتوقعة')),
+                ('multiple_choices', models.JSONField(blank=True, null=True, verbose_name='خيارات متعددة')),
+                ('points', models.IntegerField(default=10, verbose_name='النقاط')),
+                ('order', models.IntegerField(default=0, verbose_name='الترتيب')),
+                ('starter_code', models.FileField(blank=True, null=True, upload_to='challenges/code/', verbose_name='كود البدء')),
+                ('test_cases', models.FileField(blank=True, null=True, upload_to='challenges/tests/', verbose_name='حالات الاختبار')),
+                ('attachments', models.FileField(blank=True, null=True, upload_to='challenges/attachments/', verbose_name='المرفقات')),
+                ('attempts', models.IntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('solved_count', models.IntegerField(default=0, verbose_name='عدد الحلول الصحيحة')),
+                ('success_rate', models.FloatField(default=0, verbose_name='نسبة النجاح')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('lab', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='challenges', to='labs.lab', verbose_name='المعمل')),
+            ],
+            options={
+                'verbose_name': 'تحدي',
+                'verbose_name_plural': 'التحديات',
+                'ordering': ['order'],
+                'unique_together': {('lab', 'order')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LabStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_views', models.IntegerField(default=0, verbose_name='إجمالي المشاهدات')),
+                ('total_starts', models.IntegerField(default=0, verbose_name='إجمالي البدء')),
+                ('total_completions', models.IntegerField(default=0, verbose_name='إجمالي الإكمالات')),
+                ('total_submissions', models.IntegerField(default=0, verbose_name='إجمالي التسليمات')),
+                ('average_rating', models.FloatField(default=0, verbose_name='متوسط التقييم')),
+                ('average_completion_time', models.FloatField(default=0, verbose_name='متوسط وقت الإكمال')),
+                ('average_score', models.FloatField(default=0, verbose_name='متوسط الدرجات')),
+                ('completion_rate', models.FloatField(default=0, verbose_name='نسبة الإكمال')),
+                ('success_rate', models.FloatField(default=0, verbose_name='نسبة النجاح')),
+                ('dropout_rate', models.FloatField(default=0, verbose_name='نسبة الانسحاب')),
+                ('graded_submissions', models.IntegerField(default=0, verbose_name='التسليمات المقيّمة')),
+                ('correct_submissions', models.IntegerField(default=0, verbose_name='التسليمات الصحيحة')),
+                ('score_sum', models.BigIntegerField(default=0, verbose_name='مجموع الدرجات')),
+                ('completion_time_sum', models.BigIntegerField(default=0, verbose_name='مجموع أوقات الإكمال (ثانية)')),
+                ('rating_sum', models.IntegerField(default=0, verbose_name='مجموع التقييمات')),
+                ('rating_count', models.IntegerField(default=0, verbose_name='عدد التقييمات')),
+                ('last_calculated', models.DateTimeField(auto_now=True, verbose_name='آخر حساب')),
+                ('lab', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='labs.lab', verbose_name='المعمل')),
+            ],
+            options={
+                'verbose_name': 'إحصائيات معمل',
+                'verbose_name_plural': 'إحصائيات المعامل',
+            },
+        ),
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer', models.TextField(verbose_name='الإجابة')),
+                ('code', models.TextField(blank=True, verbose_name='الكود المقدم')),
+                ('file', models.FileField(blank=True, null=True, upload_to='submissions/files/', verbose_name='الملف المرفوع')),
+                ('status', models.CharField(choices=[('pending', 'قيد المراجعة'), ('correct', 'صحيح'), ('incorrect', 'غير صحيح'), ('partial', 'صحيح جزئياً'), ('timeout', 'انتهى الوقت'), ('error', 'خطأ في التنفيذ')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('score', models.IntegerField(default=0, verbose_name='الدرجة')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='هل الإجابة صحيحة؟')),
+                ('execution_time', models.FloatField(blank=True, null=True, verbose_name='وقت التنفيذ (ثانية)')),
+                ('completion_time', models.IntegerField(blank=True, null=True, verbose_name='وقت الإكمال (ثانية)')),
+                ('test_results', models.JSONField(blank=True, null=True, verbose_name='نتائج الاختبارات')),
+                ('output', models.TextField(blank=True, verbose_name='المخرجات')),
+                ('errors', models.TextField(blank=True, verbose_name='الأخطاء')),
+                ('review_notes', models.TextField(blank=True, verbose_name='ملاحظات المراجعة')),
+                ('review_score', models.IntegerField(blank=True, null=True, verbose_name='درجة المراجعة')),
+                ('attempt_count', models.IntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر محاولة')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ التسليم')),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ المراجعة')),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='labs.challenge', verbose_name='التحدي')),
+                ('lab', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='labs.lab', verbose_name='المعمل')),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_submissions', to=settings.AUTH_USER_MODEL, verbose_name='المراجع')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_submissions', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'تسليم',
+                'verbose_name_plural': 'التسليمات',
+                'ordering': ['-submitted_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SubmissionAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer', models.TextField(blank=True, verbose_name='الإجابة')),
+                ('code', models.TextField(blank=True, verbose_name='الكود المقدم')),
+                ('file', models.FileField(blank=True, null=True, upload_to='submissions/files/', verbose_name='الملف المرفوع')),
+                ('status', models.CharField(choices=[('pending', 'قيد المراجعة'), ('correct', 'صحيح'), ('incorrect', 'غير صحيح'), ('partial', 'صحيح جزئياً'), ('timeout', 'انتهى الوقت'), ('error', 'خطأ في التنفيذ')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('score', models.IntegerField(default=0, verbose_name='الدرجة')),
+                ('is_correct', models.BooleanField(default=False, verbose_name='هل الإجابة صحيحة؟')),
+                ('execution_time', models.FloatField(blank=True, null=True, verbose_name='وقت التنفيذ (ثانية)')),
+                ('test_results', models.JSONField(blank=True, null=True, verbose_name='نتائج الاختبارات')),
+                ('output', models.TextField(blank=True, verbose_name='المخرجات')),
+                ('errors', models.TextField(blank=True, verbose_name='الأخطاء')),
+                ('submitted_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ التسليم')),
+                ('graded_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التقييم')),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_attempts', to='labs.challenge', verbose_name='التحدي')),
+                ('lab', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_attempts', to='labs.lab', verbose_name='المعمل')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='labs.submission', verbose_name='التسليم')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_attempts', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'محاولة تسليم',
+                'verbose_name_plural': 'محاولات التسليم',
+                'ordering': ['-submitted_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='اسم الملف')),
+                ('size', models.BigIntegerField(verbose_name='الحجم الكلي (بايت)')),
+                ('received', models.BigIntegerField(default=0, verbose_name='المستلم (بايت)')),
+                ('status', models.CharField(choices=[('active', 'جارية'), ('complete', 'مكتملة'), ('expired', 'منتهية')], default='active', max_length=20, verbose_name='الحالة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('blob', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='labs.blob', verbose_name='الملف المخزن')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'جلسة رفع',
+                'verbose_name_plural': 'جلسات الرفع',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserLabProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_started', models.BooleanField(default=False, verbose_name='بدء المعمل')),
+                ('is_completed', models.BooleanField(default=False, verbose_name='معمل مكتمل')),
+                ('completion_percentage', models.FloatField(default=0, verbose_name='نسبة الإكمال')),
+                ('completed_challenges_count', models.IntegerField(default=0, verbose_name='عدد التحديات المكتملة')),
+                ('total_score', models.IntegerField(default=0, verbose_name='مجموع النقاط')),
+                ('max_possible_score', models.IntegerField(default=0, verbose_name='أقصى درجة ممكنة')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ البدء')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإكمال')),
+                ('total_time_spent', models.IntegerField(default=0, verbose_name='إجمالي الوقت المستغرق (ثانية)')),
+                ('attempt_count', models.IntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('completed_challenges', models.ManyToManyField(blank=True, related_name='completed_by', to='labs.challenge', verbose_name='التحديات المكتملة')),
+                ('lab', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='labs.lab', verbose_name='المعمل')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_progress', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'تقدم المستخدم في المعمل',
+                'verbose_name_plural': 'تقدم المستخدمين في المعامل',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bio', models.TextField(blank=True, null=True)),
+                ('avatar', models.ImageField(blank=True, null=True, upload_to='avatars/')),
+                ('total_points', models.IntegerField(default=0)),
+                ('rank', models.IntegerField(default=0)),
+                ('completed_labs_count', models.IntegerField(default=0)),
+                ('streak_days', models.IntegerField(default=0)),
+                ('last_activity', models.DateTimeField(auto_now=True)),
+                ('is_public', models.BooleanField(default=True)),
+                ('receive_emails', models.BooleanField(default=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LabReview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.IntegerField(choices=[(1, '⭐'), (2, '⭐⭐'), (3, '⭐⭐⭐'), (4, '⭐⭐⭐⭐'), (5, '⭐⭐⭐⭐⭐')], verbose_name='التقييم')),
+                ('comment', models.TextField(blank=True, verbose_name='التعليق')),
+                ('difficulty_rating', models.IntegerField(choices=[(1, '⭐'), (2, '⭐⭐'), (3, '⭐⭐⭐'), (4, '⭐⭐⭐⭐'), (5, '⭐⭐⭐⭐⭐')], verbose_name='تقييم الصعوبة')),
+                ('content_quality', models.IntegerField(choices=[(1, '⭐'), (2, '⭐⭐'), (3, '⭐⭐⭐'), (4, '⭐⭐⭐⭐'), (5, '⭐⭐⭐⭐⭐')], verbose_name='جودة المحتوى')),
+                ('usefulness', models.IntegerField(choices=[(1, '⭐'), (2, '⭐⭐'), (3, '⭐⭐⭐'), (4, '⭐⭐⭐⭐'), (5, '⭐⭐⭐⭐⭐')], verbose_name='الفائدة')),
+                ('is_approved', models.BooleanField(default=True, verbose_name='مقبول')),
+                ('helpful_count', models.IntegerField(default=0, verbose_name='عدد المفيد')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ التقييم')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('lab', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='labs.lab', verbose_name='المعمل')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lab_reviews', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'تقييم معمل',
+                'verbose_name_plural': 'تقييمات المعامل',
+                'ordering': ['-created_at'],
+                'unique_together': {('user', 'lab')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=120, verbose_name='النطاق')),
+                ('points', models.IntegerField(default=0, verbose_name='النقاط')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'ترتيب المتصدرين',
+                'verbose_name_plural': 'لوحة المتصدرين',
+                'indexes': [models.Index(fields=['scope', '-points', 'user'], name='labs_leader_scope_10968b_idx')],
+                'unique_together': {('scope', 'user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('type', models.CharField(choices=[('info', 'معلومات'), ('success', 'نجاح'), ('warning', 'تحذير'), ('error', 'خطأ'), ('achievement', 'إنجاز')], default='info', max_length=20)),
+                ('is_read', models.BooleanField(default=False)),
+                ('link', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='labs_notifi_user_id_ab1fe7_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', 'lab'], name='labs_submis_user_id_17dbe0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['status'], name='labs_submis_status_8dceba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['submitted_at'], name='labs_submis_submitt_fd31a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', '-submitted_at', '-id'], name='labs_submis_user_id_d07827_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='submission',
+            unique_together={('user', 'challenge')},
+        ),
+        migrations.AddIndex(
+            model_name='submissionattempt',
+            index=models.Index(fields=['challenge', 'submitted_at'], name='labs_submis_challen_cc0135_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionattempt',
+            index=models.Index(fields=['user', 'challenge', 'submitted_at'], name='labs_submis_user_id_fb55be_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submissionattempt',
+            index=models.Index(fields=['submission', '-submitted_at', '-id'], name='labs_submis_submiss_93a049_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uploadsession',
+            index=models.Index(fields=['status', 'updated_at'], name='labs_upload_status_101c4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userlabprogress',
+            index=models.Index(fields=['user', 'is_completed'], name='labs_userla_user_id_28813a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userlabprogress',
+            index=models.Index(fields=['completion_percentage'], name='labs_userla_complet_2794a0_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userlabprogress',
+            unique_together={('user', 'lab')},
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['-total_points', 'user'], name='labs_userpr_total_p_8789f9_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+"""
+ملء عدادات التحدي (attempts و solved_count و success_rate) من التسليمات
+الموجودة، حتى لا تبدأ نسبة النجاح من الصفر للتحديات القديمة.
+"""
+from django.db import migrations
+from django.db.models import Count, Q
+
+BATCH_SIZE = 500
+
+
+def backfill_challenge_counters(apps, schema_editor):
+    Challenge = apps.get_model('labs', 'Challenge')
+    db = schema_editor.connection.alias
+
+    challenges = Challenge.objects.using(db).annotate(
+        submission_total=Count('submissions'),
+        solved_total=Count('submissions', filter=Q(submissions__status='correct')),
+    ).only('pk')
+
+    batch = []
+    for challenge in challenges.iterator(chunk_size=BATCH_SIZE):
+        challenge.attempts = challenge.submission_total
+        challenge.solved_count = challenge.solved_total
+        challenge.success_rate = challenge.solved_total * 100.0 / max(challenge.submission_total, 1)
+        batch.append(challenge)
+        if len(batch) >= BATCH_SIZE:
+            Challenge.objects.using(db).bulk_update(batch, ['attempts', 'solved_count', 'success_rate'])
+            batch = []
+    if batch:
+        Challenge.objects.using(db).bulk_update(batch, ['attempts', 'solved_count', 'success_rate'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_challenge_counters, migrations.RunPython.noop),
+    ]
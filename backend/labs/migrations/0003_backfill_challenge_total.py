@@ -0,0 +1,36 @@
+"""
+ملء Lab.challenge_total من عدد التحديات الفعلي لكل معمل؛ العدّاد كان يبدأ
+من الصفر للمعامل الموجودة قبل إضافته.
+"""
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 500
+
+
+def backfill_challenge_total(apps, schema_editor):
+    Lab = apps.get_model('labs', 'Lab')
+    db = schema_editor.connection.alias
+
+    labs = Lab.objects.using(db).annotate(total=Count('challenges')).only('pk')
+
+    batch = []
+    for lab in labs.iterator(chunk_size=BATCH_SIZE):
+        lab.challenge_total = lab.total
+        batch.append(lab)
+        if len(batch) >= BATCH_SIZE:
+            Lab.objects.using(db).bulk_update(batch, ['challenge_total'])
+            batch = []
+    if batch:
+        Lab.objects.using(db).bulk_update(batch, ['challenge_total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0002_backfill_challenge_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_challenge_total, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+"""
+سجل المحاولات للتسليمات الموجودة قبل SubmissionAttempt: محاولة واحدة لكل
+تسليم بنفس الإجابة والنتيجة والتاريخ، مع attempt_count=1 و
+last_attempt_at=submitted_at. إحصائيات المعامل والمنصة تعدّ المحاولات، وبدون
+هذا الملء تبدأ من الصفر وتظهر التسليمات القديمة أولاً في "آخر المحاولات".
+"""
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
+
+BATCH_SIZE = 1000
+
+COPIED_FIELDS = (
+    'user_id', 'lab_id', 'challenge_id', 'answer', 'code', 'file',
+    'status', 'score', 'is_correct', 'execution_time', 'test_results', 'output', 'errors',
+)
+
+
+def backfill_submission_attempts(apps, schema_editor):
+    Submission = apps.get_model('labs', 'Submission')
+    SubmissionAttempt = apps.get_model('labs', 'SubmissionAttempt')
+    db = schema_editor.connection.alias
+
+    legacy = Submission.objects.using(db).filter(attempt_count=0, attempts__isnull=True)
+    last_pk = 0
+    while True:
+        rows = list(
+            legacy.filter(pk__gt=last_pk).order_by('pk').values(
+                'pk', 'reviewed_at', 'submitted_at', *COPIED_FIELDS
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1]['pk']
+
+        ids = [row['pk'] for row in rows]
+
+        SubmissionAttempt.objects.using(db).bulk_create(
+            SubmissionAttempt(
+                submission_id=row['pk'],
+                graded_at=None if row['status'] == 'pending' else row['reviewed_at'] or row['submitted_at'],
+                **{field: row[field] for field in COPIED_FIELDS},
+            )
+            for row in rows
+        )
+        # submitted_at فيه auto_now_add فيأخذ وقت الترحيل عند الإنشاء؛ يُعاد إلى تاريخ التسليم
+        SubmissionAttempt.objects.using(db).filter(submission_id__in=ids).update(
+            submitted_at=Subquery(
+                Submission.objects.using(db).filter(pk=OuterRef('submission_id')).values('submitted_at')[:1]
+            )
+        )
+        Submission.objects.using(db).filter(pk__in=ids).update(
+            attempt_count=1, last_attempt_at=F('submitted_at')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0003_backfill_challenge_total'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_submission_attempts, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,30 @@
 # labs/models.py
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# ========================
+# استعلامات مخصصة (QuerySets)
+# ========================
+
+class LabQuerySet(models.QuerySet):
+    """استعلامات مخصصة للمعامل"""
+    
+    def active(self):
+        """المعامل النشطة فقط"""
+        return self.filter(is_active=True)
+    
+    def with_challenge_count(self):
+        """إضافة عدد التحديات كحقل محسوب بدلاً من استعلام لكل معمل"""
+        return self.annotate(challenge_count=models.Count('challenges'))
+
+
 # ========================
 # نموذج المعمل (Lab)
 # ========================
@@ -59,6 +80,9 @@ class Lab(models.Model):
     # الملفات والوسائط
     thumbnail = models.ImageField(upload_to='labs/thumbnails/', null=True, blank=True,
                                  verbose_name='الصورة المصغرة')
+    # النسخ المولّدة من الصورة (labs/images.py)
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False,
+                                          verbose_name='نسخ الصورة المصغرة')
     lab_guide = models.FileField(upload_to='labs/guides/', null=True, blank=True,
                                 verbose_name='دليل المعمل')
     starter_files = models.FileField(upload_to='labs/starter_files/', null=True, blank=True,
@@ -76,12 +100,19 @@ class Lab(models.Model):
     views = models.IntegerField(default=0, verbose_name='عدد المشاهدات')
     completions = models.IntegerField(default=0, verbose_name='عدد الإكمالات')
     average_score = models.FloatField(default=0, verbose_name='متوسط النقاط')
+    challenge_total = models.IntegerField(default=0, editable=False,
+                                          verbose_name='عدد التحديات')
+    
+    # البحث: نص موحّد يُفهرس (انظر labs/search.py)
+    search_document = models.TextField(blank=True, editable=False, verbose_name='نص البحث')
     
     # التواريخ
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')
     published_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ النشر')
     
+    objects = LabQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'معمل'
         verbose_name_plural = 'المعامل'
@@ -95,9 +126,39 @@ class Lab(models.Model):
     def __str__(self):
         return self.title
     
+    # عدادات تُكتب فقط بتحديثات F() (counters.py و events.py و signals.py)؛ الحفظ
+    # الكامل لنسخة محملة سابقاً (لوحة الإدارة مثلاً) كان سيعيد قيمها القديمة
+    COUNTER_FIELDS = frozenset({'views', 'completions', 'average_score', 'challenge_total'})
+    
+    def save(self, *args, **kwargs):
+        from . import search
+        
+        self.search_document = search.build_document(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'search_document'}
+        elif not self._state.adding and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        search.index_labs([self], using=self._state.db)
+    
+    def delete(self, *args, **kwargs):
+        from . import search
+        
+        lab_id, using = self.pk, self._state.db
+        result = super().delete(*args, **kwargs)
+        search.remove_lab(lab_id, using=using)
+        return result
+    
     def get_challenge_count(self):
         """عدد التحديات في المعمل"""
-        return self.challenges.count()
+        # استخدام القيمة المحسوبة مسبقاً إن وُجدت (with_challenge_count)
+        if hasattr(self, 'challenge_count'):
+            return self.challenge_count
+        return self.challenge_total
     
     def get_average_completion_time(self):
         """متوسط وقت الإكمال"""
@@ -169,6 +230,7 @@ class Challenge(models.Model):
     
     # إحصائيات
     attempts = models.IntegerField(default=0, verbose_name='عدد المحاولات')
+    solved_count = models.IntegerField(default=0, verbose_name='عدد الحلول الصحيحة')
     success_rate = models.FloatField(default=0, verbose_name='نسبة النجاح')
     
     # التواريخ
@@ -191,6 +253,22 @@ class Challenge(models.Model):
     def get_successful_submissions(self):
         """عدد التسليمات الناجحة"""
         return self.submissions.filter(status='correct').count()
+    
+    @classmethod
+    def record_attempt(cls, challenge_id, amount=1):
+        """زيادة عدد المحاولات وإعادة حساب نسبة النجاح باستعلام UPDATE واحد"""
+        return cls.objects.filter(pk=challenge_id).update(
+            attempts=F('attempts') + amount,
+            success_rate=F('solved_count') * 100.0 / (F('attempts') + amount),
+        )
+    
+    @classmethod
+    def record_success(cls, challenge_id, amount=1):
+        """زيادة عدد الحلول الصحيحة وإعادة حساب نسبة النجاح باستعلام UPDATE واحد"""
+        return cls.objects.filter(pk=challenge_id).update(
+            solved_count=F('solved_count') + amount,
+            success_rate=(F('solved_count') + amount) * 100.0 / Greatest(F('attempts'), 1),
+        )
 
 
 # ========================
@@ -245,35 +323,108 @@ class Submission(models.Model):
     review_notes = models.TextField(blank=True, verbose_name='ملاحظات المراجعة')
     review_score = models.IntegerField(null=True, blank=True, verbose_name='درجة المراجعة')
     
+    # المحاولات (السجل الكامل في SubmissionAttempt)
+    attempt_count = models.IntegerField(default=0, verbose_name='عدد المحاولات')
+    last_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name='آخر محاولة')
+    
     # التواريخ
     submitted_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ التسليم')
     reviewed_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ المراجعة')
     
+    # ترتيب النتائج عند اختيار أفضل محاولة
+    RESULT_RANK = {'correct': 4, 'partial': 3, 'incorrect': 2, 'timeout': 1, 'error': 1, 'pending': 0}
+    
     class Meta:
         verbose_name = 'تسليم'
         verbose_name_plural = 'التسليمات'
         ordering = ['-submitted_at']
+        # صف واحد لكل مستخدم وتحدٍ يحمل أفضل نتيجة؛ "هل حله؟" استعلام بالمفتاح
         unique_together = ['user', 'challenge']
         indexes = [
             models.Index(fields=['user', 'lab']),
             models.Index(fields=['status']),
             models.Index(fields=['submitted_at']),
+            # ترقيم تسليمات المستخدم بالمفاتيح (labs/pagination.py)
+            models.Index(fields=['user', '-submitted_at', '-id']),
         ]
     
     def __str__(self):
         return f"تسليم {self.user.username} - {self.challenge.title}"
     
+    def is_improved_by(self, status, score):
+        """هل نتيجة المحاولة أفضل من النتيجة المحفوظة؟"""
+        if self.status == 'pending':
+            return True
+        rank = self.RESULT_RANK
+        return (rank.get(status, 0), score) > (rank.get(self.status, 0), self.score)
+
+
+# ========================
+# نموذج محاولة التسليم (SubmissionAttempt)
+# ========================
+
+class SubmissionAttempt(models.Model):
+    """محاولة تسليم واحدة؛ سجل إلحاقي فقط، وأفضل نتيجة تُنسخ إلى Submission"""
+    
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='attempts',
+                                   verbose_name='التسليم')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='submission_attempts',
+                             verbose_name='المستخدم')
+    lab = models.ForeignKey(Lab, on_delete=models.CASCADE, related_name='submission_attempts',
+                            verbose_name='المعمل')
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE,
+                                  related_name='submission_attempts', verbose_name='التحدي')
+    
+    # الإجابة
+    answer = models.TextField(blank=True, verbose_name='الإجابة')
+    code = models.TextField(blank=True, verbose_name='الكود المقدم')
+    file = models.FileField(upload_to='submissions/files/', null=True, blank=True,
+                            verbose_name='الملف المرفوع')
+    
+    # النتيجة
+    status = models.CharField(max_length=20, choices=Submission.STATUS_CHOICES, default='pending',
+                              verbose_name='الحالة')
+    score = models.IntegerField(default=0, verbose_name='الدرجة')
+    is_correct = models.BooleanField(default=False, verbose_name='هل الإجابة صحيحة؟')
+    execution_time = models.FloatField(null=True, blank=True, verbose_name='وقت التنفيذ (ثانية)')
+    test_results = models.JSONField(null=True, blank=True, verbose_name='نتائج الاختبارات')
+    output = models.TextField(blank=True, verbose_name='المخرجات')
+    errors = models.TextField(blank=True, verbose_name='الأخطاء')
+    
+    # التواريخ
+    submitted_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ التسليم')
+    graded_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ التقييم')
+    
+    class Meta:
+        verbose_name = 'محاولة تسليم'
+        verbose_name_plural = 'محاولات التسليم'
+        ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['challenge', 'submitted_at']),
+            models.Index(fields=['user', 'challenge', 'submitted_at']),
+            # سجل محاولات تسليم واحد بالمفاتيح (labs/pagination.py)
+            models.Index(fields=['submission', '-submitted_at', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"محاولة {self.user_id} - {self.challenge_id} ({self.status})"
+    
     def save(self, *args, **kwargs):
-        # تحديث إحصائيات التحدي عند الحفظ
-        if self.pk is None:  # إذا كان تسليم جديد
-            self.challenge.attempts += 1
-            if self.status == 'correct':
-                self.challenge.success_rate = (
-                    self.challenge.get_successful_submissions() / self.challenge.attempts * 100
-                )
-            self.challenge.save()
+        from . import events
+        from .cache import invalidate_user
         
-        super().save(*args, **kwargs)
+        is_new = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # الإحصائيات (المحاولات، إحصائيات المعمل...) تُحدّث من صندوق الأحداث
+            if is_new:
+                user_id = self.user_id
+                transaction.on_commit(lambda: invalidate_user(user_id))
+                events.emit(
+                    events.SUBMISSION_CREATED,
+                    lab_id=self.lab_id, challenge_id=self.challenge_id, user_id=self.user_id,
+                )
 
 
 # ========================
@@ -297,6 +448,8 @@ class UserLabProgress(models.Model):
     completed_challenges = models.ManyToManyField(Challenge, blank=True,
                                                  verbose_name='التحديات المكتملة',
                                                  related_name='completed_by')
+    completed_challenges_count = models.IntegerField(default=0,
+                                                     verbose_name='عدد التحديات المكتملة')
     
     # النقاط والدرجات
     total_score = models.IntegerField(default=0, verbose_name='مجموع النقاط')
@@ -326,21 +479,75 @@ class UserLabProgress(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.lab.title}"
     
+    @classmethod
+    def record_solved(cls, user_id, lab_id, challenge_id, score=0):
+        """
+        تسجيل حل تحدٍ بشكل صحيح: يُقفل صف التقدم، ويُضاف التحدي إلى المكتملة،
+        ثم يُحدّث العدد والنسبة وحالة الإكمال باستعلام UPDATE واحد.
+        يُستدعى داخل معاملة التقييم؛ إعادة الاستدعاء لنفس التحدي لا تغيّر شيئاً.
+        """
+        from . import events
+        
+        now = timezone.now()
+        with transaction.atomic():
+            cls.objects.get_or_create(user_id=user_id, lab_id=lab_id)
+            progress = cls.objects.select_for_update().select_related('lab').only(
+                'pk', 'is_started', 'is_completed', 'started_at', 'completed_challenges_count',
+                'lab__challenge_total',
+            ).get(user_id=user_id, lab_id=lab_id)
+            
+            _, added = cls.completed_challenges.through.objects.get_or_create(
+                userlabprogress_id=progress.pk, challenge_id=challenge_id
+            )
+            if not added:
+                return progress
+            
+            changes = {}
+            if not progress.is_started:
+                progress.started_at = progress.started_at or now
+                changes.update(is_started=True, started_at=progress.started_at)
+                events.emit(events.PROGRESS_STARTED, lab_id=lab_id, user_id=user_id)
+            
+            # الصف مقفل، لذا القيم المقروءة هي القيم الحالية
+            total = progress.lab.challenge_total
+            completed_count = progress.completed_challenges_count + 1
+            completing = not progress.is_completed and total > 0 and completed_count >= total
+            if completing:
+                time_spent = int((now - progress.started_at).total_seconds())
+                changes.update(is_completed=True, completed_at=now, total_time_spent=time_spent)
+                events.emit(events.PROGRESS_COMPLETED, lab_id=lab_id, user_id=user_id,
+                            time_spent=time_spent)
+            
+            cls.objects.filter(pk=progress.pk).update(
+                completed_challenges_count=F('completed_challenges_count') + 1,
+                total_score=F('total_score') + (score or 0),
+                completion_percentage=min(completed_count * 100.0 / total, 100) if total else 0,
+                updated_at=now,
+                **changes,
+            )
+        return progress
+    
     def update_progress(self):
-        """تحديث تقدم المستخدم"""
-        total_challenges = self.lab.challenges.count()
+        """إعادة مزامنة التقدم من التحديات المكتملة فعلياً (استعلامان)"""
         completed_count = self.completed_challenges.count()
+        total_challenges = Lab.objects.filter(pk=self.lab_id).values_list(
+            'challenge_total', flat=True
+        ).first() or 0
         
+        self.completed_challenges_count = completed_count
         if total_challenges > 0:
-            self.completion_percentage = (completed_count / total_challenges) * 100
-        
-        self.is_completed = self.completion_percentage >= 100
-        
+            self.completion_percentage = min(completed_count * 100.0 / total_challenges, 100)
+        self.is_completed = total_challenges > 0 and completed_count >= total_challenges
         if self.is_completed and not self.completed_at:
-            from django.utils import timezone
             self.completed_at = timezone.now()
         
-        self.save()
+        type(self).objects.filter(pk=self.pk).update(
+            completed_challenges_count=self.completed_challenges_count,
+            completion_percentage=self.completion_percentage,
+            is_completed=self.is_completed,
+            completed_at=self.completed_at,
+            updated_at=timezone.now(),
+        )
 
 
 # ========================
@@ -388,6 +595,40 @@ class LabReview(models.Model):
     
     def __str__(self):
         return f"تقييم {self.user.username} لـ {self.lab.title}"
+    
+    @staticmethod
+    def rating_weight(lab_id, rating, is_approved):
+        """(المعمل، مجموع التقييم، العدد) الذي يساهم به التقييم في إحصائيات المعمل"""
+        return (lab_id, rating, 1) if is_approved else (lab_id, 0, 0)
+    
+    def save(self, *args, **kwargs):
+        """
+        الحفظ وإصدار فرق التقييم (REVIEW_CHANGED) في معاملة واحدة: لا يُحفظ
+        تقييم دون حدثه ولا حدث دون تقييمه. الصف السابق يُقفل حتى لا يحسب
+        تعديلان متزامنان الفرق من نفس القيمة القديمة.
+        """
+        from . import events
+        
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = LabReview.objects.select_for_update().filter(pk=self.pk).values(
+                    'lab_id', 'rating', 'is_approved'
+                ).first()
+            super().save(*args, **kwargs)
+            
+            changes = []
+            if previous:
+                lab_id, rating, count = self.rating_weight(
+                    previous['lab_id'], previous['rating'], previous['is_approved']
+                )
+                changes.append((lab_id, -rating, -count))
+            changes.append(self.rating_weight(self.lab_id, self.rating, self.is_approved))
+            
+            for lab_id, rating_delta, count_delta in changes:
+                if rating_delta or count_delta:
+                    events.emit(events.REVIEW_CHANGED, lab_id=lab_id,
+                                rating_delta=rating_delta, count_delta=count_delta)
 
 
 # ========================
@@ -416,6 +657,14 @@ class LabStatistics(models.Model):
     success_rate = models.FloatField(default=0, verbose_name='نسبة النجاح')
     dropout_rate = models.FloatField(default=0, verbose_name='نسبة الانسحاب')
     
+    # المجاميع التراكمية التي تُشتق منها المتوسطات والنسب (انظر labs/lab_statistics.py)
+    graded_submissions = models.IntegerField(default=0, verbose_name='التسليمات المقيّمة')
+    correct_submissions = models.IntegerField(default=0, verbose_name='التسليمات الصحيحة')
+    score_sum = models.BigIntegerField(default=0, verbose_name='مجموع الدرجات')
+    completion_time_sum = models.BigIntegerField(default=0, verbose_name='مجموع أوقات الإكمال (ثانية)')
+    rating_sum = models.IntegerField(default=0, verbose_name='مجموع التقييمات')
+    rating_count = models.IntegerField(default=0, verbose_name='عدد التقييمات')
+    
     # تحديث
     last_calculated = models.DateTimeField(auto_now=True, verbose_name='آخر حساب')
     
@@ -427,51 +676,12 @@ class LabStatistics(models.Model):
         return f"إحصائيات {self.lab.title}"
     
     def calculate_statistics(self):
-        """حساب جميع الإحصائيات"""
-        from django.db.models import Avg, Count
-        
-        # حساب الإحصائيات الأساسية
-        self.total_starts = self.lab.user_progress.filter(is_started=True).count()
-        self.total_completions = self.lab.user_progress.filter(is_completed=True).count()
-        self.total_submissions = self.lab.submissions.count()
-        
-        # حساب المتوسطات
-        if self.lab.reviews.filter(is_approved=True).exists():
-            self.average_rating = self.lab.reviews.filter(
-                is_approved=True
-            ).aggregate(avg=Avg('rating'))['avg'] or 0
+        """إعادة حساب جميع الإحصائيات لهذا المعمل من البيانات الأصلية"""
+        from .lab_statistics import rebuild
         
-        # حساب النسب
-        if self.total_starts > 0:
-            self.completion_rate = (self.total_completions / self.total_starts) * 100
-        
-        self.save()
-
-
-# ========================
-# إشارات (Signals) - يمكن إضافتها في ملف signals.py منفصل
-# ========================
-
-"""
-# في ملف labs/signals.py
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
-from .models import Lab, LabStatistics, Submission, Challenge
-
-@receiver(post_save, sender=Lab)
-def create_lab_statistics(sender, instance, created, **kwargs):
-    if created:
-        LabStatistics.objects.create(lab=instance)
-
-@receiver(post_save, sender=Submission)
-def update_challenge_statistics(sender, instance, **kwargs):
-    instance.challenge.save()  # سيؤدي إلى تحديث إحصائيات التحدي
+        rebuild(lab_ids=[self.lab_id])
+        self.refresh_from_db()
 
-@receiver(post_save, sender=LabReview)
-def update_lab_rating(sender, instance, **kwargs):
-    if instance.lab.statistics:
-        instance.lab.statistics.calculate_statistics()
-"""
 
 print("✅ تم تحميل نماذج المعامل بنجاح!")
 # ========================
@@ -499,6 +709,10 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # ترقيم إشعارات المستخدم بالمفاتيح (labs/pagination.py)
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -524,6 +738,11 @@ class UserProfile(models.Model):
     is_public = models.BooleanField(default=True)
     receive_emails = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-total_points', 'user']),
+        ]
+
     def __str__(self):
         return self.user.username
 
@@ -540,3 +759,117 @@ class UserProfile(models.Model):
         ).aggregate(total=models.Sum('score'))['total'] or 0
         
         self.save()
+
+
+# ========================
+# نموذج لوحة المتصدرين (LeaderboardEntry)
+# ========================
+
+class LeaderboardEntry(models.Model):
+    """
+    نقاط المستخدم ضمن نطاق معين: global أو category:<التصنيف> أو lab:<المعرف>.
+    الفهرس (scope, -points, user) يسمح بجلب الأوائل وحساب الترتيب من الفهرس مباشرة.
+    """
+    
+    scope = models.CharField(max_length=120, verbose_name='النطاق')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaderboard_entries',
+                            verbose_name='المستخدم')
+    points = models.IntegerField(default=0, verbose_name='النقاط')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')
+    
+    class Meta:
+        verbose_name = 'ترتيب المتصدرين'
+        verbose_name_plural = 'لوحة المتصدرين'
+        unique_together = ['scope', 'user']
+        indexes = [
+            models.Index(fields=['scope', '-points', 'user']),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope} - {self.user_id}: {self.points}"
+
+
+# ========================
+# صندوق الأحداث (DomainEvent)
+# ========================
+
+class DomainEvent(models.Model):
+    """
+    حدث يُكتب في نفس معاملة التغيير (transactional outbox)، ثم يطبقه المستهلك
+    على البيانات المشتقة على دفعات (انظر labs/events.py).
+    """
+    
+    event_type = models.CharField(max_length=64, verbose_name='نوع الحدث')
+    payload = models.JSONField(default=dict, verbose_name='البيانات')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ المعالجة')
+    
+    class Meta:
+        verbose_name = 'حدث'
+        verbose_name_plural = 'صندوق الأحداث'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='labs_event_pending_idx'),
+            models.Index(fields=['event_type', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.pk}"
+
+
+# ========================
+# الملفات المخزنة بالمحتوى (Blob) وجلسات الرفع (UploadSession)
+# ========================
+
+class Blob(models.Model):
+    """
+    ملف مخزن مرة واحدة بحسب محتواه في blobs/ab/cd/<sha256><الامتداد>، وتشير إليه حقول
+    الملفات (Submission.file، Challenge.attachments، ...) بنفس المسار.
+    """
+    
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='بصمة SHA-256')
+    size = models.BigIntegerField(verbose_name='الحجم (بايت)')
+    file = models.FileField(max_length=255, verbose_name='الملف')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    
+    class Meta:
+        verbose_name = 'ملف مخزن'
+        verbose_name_plural = 'الملفات المخزنة'
+    
+    def __str__(self):
+        return self.sha256
+
+
+class UploadSession(models.Model):
+    """جلسة رفع ملف على أجزاء يمكن استئنافها (انظر labs/uploads.py)"""
+    
+    STATUS_CHOICES = [
+        ('active', 'جارية'),
+        ('complete', 'مكتملة'),
+        ('expired', 'منتهية'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions',
+                            verbose_name='المستخدم')
+    filename = models.CharField(max_length=255, verbose_name='اسم الملف')
+    size = models.BigIntegerField(verbose_name='الحجم الكلي (بايت)')
+    received = models.BigIntegerField(default=0, verbose_name='المستلم (بايت)')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active',
+                             verbose_name='الحالة')
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, null=True, blank=True,
+                            related_name='upload_sessions', verbose_name='الملف المخزن')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')
+    
+    class Meta:
+        verbose_name = 'جلسة رفع'
+        verbose_name_plural = 'جلسات الرفع'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
@@ -0,0 +1,101 @@
+# labs/pagination.py
+"""
+ترقيم الصفحات بالمفاتيح (keyset pagination)
+
+بدلاً من COUNT(*) و OFFSET، يُرمّز آخر صف في الصفحة (التاريخ والمعرّف) في
+مؤشر، وتبدأ الصفحة التالية بشرط WHERE على (التاريخ، المعرّف) يستفيد من
+الفهرس المركب، فتبقى تكلفة الصفحة ثابتة مهما تعمّق المستخدم.
+
+الوضع اختياري: يُفعّل بوجود المعامل cursor (ولو فارغاً للصفحة الأولى)،
+وبدونه يعمل الترقيم العادي بأرقام الصفحات كما كان.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """ترتيب تنازلي على (ordering_field, id) مع الإبقاء على الترقيم العادي"""
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering_field = 'created_at'
+    invalid_cursor_message = 'مؤشر غير صالح'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request.query_params[self.cursor_query_param])
+
+        field = self.ordering_field
+        queryset = queryset.order_by(f'-{field}', '-id')
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page_rows = rows[:page_size]
+        return self.page_rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page_rows[-1]
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(getattr(last, self.ordering_field), last.pk)
+        )
+
+    def get_previous_link(self):
+        if getattr(self, 'keyset', False):
+            return None
+        return super().get_previous_link()
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps([value.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+
+class SubmissionPagination(KeysetPagination):
+    ordering_field = 'submitted_at'
+
+
+class NotificationPagination(KeysetPagination):
+    ordering_field = 'created_at'
@@ -0,0 +1,111 @@
+# labs/response_cache.py
+"""
+تخزين استجابات تصفح المعامل مؤقتاً
+
+المفتاح مكوّن من المسار ومعاملات الاستعلام (مرتبة) وفئة المستخدم (مجهول،
+عادي، مشرف) لأن get_queryset يفلتر المعامل المميزة حسب الفئة، ومن المخطط
+والمضيف لأن الاستجابة تحتوي روابط مطلقة (thumbnail_url و thumbnail_srcset). المفاتيح
+مرتبطة بإصدار نطاق المعامل، فأي حفظ أو حذف لمعمل أو تحدٍ يبطلها جميعاً
+(labs/signals.py). التخزين في Redis إن كان مُعداً وإلا في ذاكرة العملية.
+
+الاستجابة التي تُخزن تُبنى دائماً من القاعدة الرئيسية ولو كان الإجراء يقرأ من
+النسخ (ReplicaReadMixin): بعد إبطال الإصدار قد تكون النسخة متأخرة عن الكتابة،
+فتُخزن استجابة قديمة تحت الإصدار الجديد طوال LABS_CACHE_TTL. الإخفاق نادر،
+والإصابات لا تلمس قاعدة البيانات أصلاً.
+
+تُحسب مرات الإصابة والإخفاق لكل ViewSet، وتُعرض عبر الأمر response_cache_stats.
+"""
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from cyberlabs.db_router import primary_only
+
+from .cache import labs_cache_key, labs_cache_ttl, user_tier
+
+METRICS_KEY_PREFIX = 'response-cache:'
+METRICS_TTL = 60 * 60 * 24 * 30
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, METRICS_TTL):
+            cache.incr(key)
+
+
+def record_metric(name, hit):
+    _incr(f'{METRICS_KEY_PREFIX}{name}:{"hits" if hit else "misses"}')
+
+
+def get_metrics(names):
+    """{'اسم': {'hits', 'misses', 'hit_ratio'}} للأسماء المعطاة"""
+    keys = [f'{METRICS_KEY_PREFIX}{name}:{kind}' for name in names for kind in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    metrics = {}
+    for name in names:
+        hits = values.get(f'{METRICS_KEY_PREFIX}{name}:hits', 0)
+        misses = values.get(f'{METRICS_KEY_PREFIX}{name}:misses', 0)
+        total = hits + misses
+        metrics[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits * 100.0 / total, 2) if total else 0,
+        }
+    return metrics
+
+
+def reset_metrics(names):
+    cache.delete_many([
+        f'{METRICS_KEY_PREFIX}{name}:{kind}' for name in names for kind in ('hits', 'misses')
+    ])
+
+
+def request_fingerprint(request):
+    """(فئة المستخدم، المضيف، المسار، المعاملات بترتيب ثابت): ما يحدد محتوى الاستجابة"""
+    query = urlencode(sorted(
+        (name, value) for name, values in request.query_params.lists() for value in values
+    ))
+    origin = f'{request.scheme}://{request.get_host()}'
+    return user_tier(request.user), origin, request.path, query
+
+
+def response_cache_key(request):
+    return labs_cache_key('response', *request_fingerprint(request))
+
+
+class ResponseCacheMixin:
+    """
+    تخزين استجابات GET الناجحة للإجراءات في cached_actions.
+    يستدعي الـ ViewSet cached_response(request, build) حيث build تبني الاستجابة.
+    """
+
+    cached_actions = ()
+    response_cache_name = None
+
+    def get_response_cache_name(self):
+        return self.response_cache_name or type(self).__name__
+
+    def cached_response(self, request, build):
+        if request.method != 'GET' or self.action not in self.cached_actions:
+            return build()
+
+        key = response_cache_key(request)
+        name = self.get_response_cache_name()
+        entry = cache.get(key)
+        if entry is not None:
+            record_metric(name, hit=True)
+            response = Response(entry['data'], status=entry['status'])
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record_metric(name, hit=False)
+        with primary_only():
+            response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, {'data': response.data, 'status': response.status_code}, labs_cache_ttl())
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,350 @@
+# labs/runner.py
+"""
+مشغّل الكود المعزول لتحديات code و code_output
+
+كل حالة اختبار تعمل في عملية Python فرعية مستقلة داخل nsjail:
+- مستخدم غير مميز (CODE_RUNNER_UID) داخل user namespace.
+- جذر ملفات فارغ للقراءة فقط؛ لا يُربط إلا مجلدات Python والنظام اللازمة
+  للتشغيل والسكربت نفسه (للقراءة فقط)، فلا وصول إلى .env أو قاعدة البيانات.
+- network namespace فارغ: لا شبكة.
+- PID namespace: إنهاء العملية الأولى يُنهي كل ما أنشأته، ولا يفلت منه
+  os.setsid() أو fork.
+- حدود الوقت والذاكرة والملفات وعدد العمليات (RLIMIT_NPROC)، واختيارياً
+  cgroup v2 لكل تشغيل (pids.max و memory.max) عبر CODE_RUNNER_CGROUP_ROOT.
+
+تعمل حالات الاختبار بالتوازي عبر مجموعة عمال مشتركة، وعدد العمال يحدد أقصى
+عدد من العمليات الفرعية في نفس الوقت (وبالتالي الحد الأعلى لاستهلاك الذاكرة).
+
+CODE_RUNNER_SANDBOX = 'none' يشغّل الكود بالحدود فقط دون عزل، وهو للتطوير
+المحلي فقط؛ إذا لم يتوفر nsjail في غير ذلك يُرفض التشغيل.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# يُنفذ داخل العملية الفرعية: تطبيق الحدود ثم تشغيل كود المستخدم
+BOOTSTRAP = (
+    'import resource, runpy, sys\n'
+    'cpu, memory, fsize, nproc = map(int, sys.argv[1:5])\n'
+    'resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))\n'
+    'resource.setrlimit(resource.RLIMIT_AS, (memory, memory))\n'
+    'resource.setrlimit(resource.RLIMIT_FSIZE, (fsize, fsize))\n'
+    'resource.setrlimit(resource.RLIMIT_CORE, (0, 0))\n'
+    'resource.setrlimit(resource.RLIMIT_NOFILE, (32, 32))\n'
+    'resource.setrlimit(resource.RLIMIT_NPROC, (nproc, nproc))\n'
+    'sys.argv = sys.argv[5:]\n'
+    'runpy.run_path(sys.argv[0], run_name="__main__")\n'
+)
+
+# الإشارات التي تعني تجاوز حد وقت المعالج
+CPU_LIMIT_SIGNALS = {signal.SIGXCPU, signal.SIGKILL}
+# حد nsjail للوقت احتياطي فقط: يتجاوز مهلة communicate بهذا الهامش (ثوانٍ) حتى
+# تنتهي مهلتنا أولاً دائماً ولا يتسابق الاثنان على نفس اللحظة
+NSJAIL_TIME_MARGIN = 2
+
+# مسار السكربت داخل السجن
+SANDBOX_DIR = '/sandbox'
+# مجلدات النظام التي تُربط للقراءة فقط إن وُجدت (مكتبات Python المشتركة)
+SYSTEM_MOUNTS = ('/usr', '/lib', '/lib64', '/bin')
+
+
+class SandboxUnavailable(RuntimeError):
+    """لا يمكن تشغيل كود المستخدم بأمان على هذا الخادم"""
+
+
+@dataclass
+class RunnerLimits:
+    """حدود تشغيل حالة اختبار واحدة"""
+
+    cpu_seconds: int = 2
+    wall_seconds: float = 5
+    memory_bytes: int = 256 * 1024 * 1024
+    output_bytes: int = 64 * 1024
+    processes: int = 16
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**getattr(settings, 'CODE_RUNNER_LIMITS', {}))
+
+
+@dataclass
+class TestCaseResult:
+    """نتيجة حالة اختبار واحدة"""
+
+    name: str
+    status: str  # passed / failed / timeout / error
+    time: float
+    output: str = ''
+    errors: str = ''
+    returncode: int = None
+
+    @property
+    def passed(self):
+        return self.status == 'passed'
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'status': self.status,
+            'passed': self.passed,
+            'time': round(self.time, 4),
+            'output': self.output,
+            'errors': self.errors,
+            'returncode': self.returncode,
+        }
+
+
+@dataclass
+class RunReport:
+    """نتيجة تشغيل الكود على جميع حالات الاختبار"""
+
+    results: list = field(default_factory=list)
+    elapsed: float = 0
+
+    @property
+    def total(self):
+        return len(self.results)
+
+    @property
+    def passed(self):
+        return sum(1 for result in self.results if result.passed)
+
+    def count(self, status):
+        return sum(1 for result in self.results if result.status == status)
+
+
+# ========================
+# تشغيل حالة اختبار واحدة
+# ========================
+
+def _read_limited(fh, limit):
+    fh.seek(0)
+    return fh.read(limit).decode('utf-8', errors='replace')
+
+
+def _mebibytes(value):
+    """حدود nsjail بالميغابايت (مع التقريب للأعلى)"""
+    return max(1, math.ceil(value / (1024 * 1024)))
+
+
+def _sandbox_mode():
+    return getattr(settings, 'CODE_RUNNER_SANDBOX', 'nsjail')
+
+
+def _sandbox_command(workdir, limits):
+    """أمر nsjail الذي يشغّل BOOTSTRAP معزولاً، أو SandboxUnavailable"""
+    nsjail = shutil.which(getattr(settings, 'CODE_RUNNER_NSJAIL', 'nsjail'))
+    if nsjail is None:
+        raise SandboxUnavailable('nsjail غير مثبت؛ لن يُشغّل كود المستخدم دون عزل')
+
+    uid = str(getattr(settings, 'CODE_RUNNER_UID', 65534))
+    command = [
+        nsjail, '--mode', 'o', '--really_quiet',
+        '--user', uid, '--group', uid,
+        '--hostname', 'sandbox',
+        '--cwd', SANDBOX_DIR,
+        '--time_limit', str(math.ceil(limits.wall_seconds) + NSJAIL_TIME_MARGIN),
+        '--rlimit_cpu', str(limits.cpu_seconds),
+        '--rlimit_as', str(_mebibytes(limits.memory_bytes)),
+        '--rlimit_fsize', str(_mebibytes(limits.output_bytes)),
+        '--rlimit_nofile', '32',
+        '--rlimit_nproc', str(limits.processes),
+        '--rlimit_core', '0',
+        '--disable_proc',
+        '--iface_no_lo',
+        '--bindmount_ro', f'{workdir}:{SANDBOX_DIR}',
+        '--bindmount', '/dev/null',
+        '--tmpfsmount', '/tmp',
+    ]
+    # بدون --chroot يكون الجذر tmpfs فارغاً للقراءة فقط؛ تُربط مكتبات Python فقط
+    prefixes = {os.path.realpath(sys.base_prefix), os.path.realpath(sys.prefix)}
+    for path in sorted(set(SYSTEM_MOUNTS) | prefixes):
+        if os.path.exists(path):
+            command += ['--bindmount_ro', path]
+
+    cgroup_root = getattr(settings, 'CODE_RUNNER_CGROUP_ROOT', '')
+    if cgroup_root:
+        # cgroup لكل تشغيل يحدد عدد العمليات والذاكرة لكل ما ينشئه الكود معاً
+        command += [
+            '--use_cgroupv2', '--cgroupv2_mount', cgroup_root,
+            '--cgroup_pids_max', str(limits.processes),
+            '--cgroup_mem_max', str(limits.memory_bytes),
+        ]
+    return command + ['--']
+
+
+def run_code(code, stdin='', limits=None):
+    """
+    تشغيل الكود في عملية فرعية معزولة.
+    يُرجع (status, stdout, stderr, returncode, elapsed) حيث status أحد:
+    ok / timeout / error.
+    """
+    limits = limits or RunnerLimits.from_settings()
+    sandboxed = _sandbox_mode() != 'none'
+
+    with tempfile.TemporaryDirectory(prefix='cyberlabs-run-') as workdir:
+        script = os.path.join(workdir, 'main.py')
+        with open(script, 'w', encoding='utf-8') as fh:
+            fh.write(code)
+
+        if sandboxed:
+            try:
+                prefix = _sandbox_command(workdir, limits)
+            except SandboxUnavailable as exc:
+                logger.error('%s', exc)
+                return 'error', '', str(exc), None, 0
+            # المستخدم داخل السجن يقرأ السكربت فقط
+            os.chmod(workdir, 0o755)
+            os.chmod(script, 0o644)
+            script_path = os.path.join(SANDBOX_DIR, 'main.py')
+        else:
+            prefix, script_path = [], script
+
+        # المخرجات تُكتب في ملفات محدودة الحجم (RLIMIT_FSIZE) بدلاً من الذاكرة
+        with tempfile.TemporaryFile(dir=workdir) as stdout, \
+                tempfile.TemporaryFile(dir=workdir) as stderr:
+            started = time.perf_counter()
+            proc = subprocess.Popen(
+                prefix + [
+                    sys.executable, '-I', '-S', '-c', BOOTSTRAP,
+                    str(limits.cpu_seconds), str(limits.memory_bytes),
+                    str(limits.output_bytes), str(limits.processes), script_path,
+                ],
+                stdin=subprocess.PIPE,
+                stdout=stdout,
+                stderr=stderr,
+                cwd=workdir,
+                env={'PATH': '/usr/bin:/bin', 'PYTHONIOENCODING': 'utf-8', 'LANG': 'C.UTF-8'},
+                start_new_session=True,
+            )
+            timed_out = False
+            try:
+                proc.communicate(input=(stdin or '').encode('utf-8'), timeout=limits.wall_seconds)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                _kill(proc, sandboxed)
+                proc.wait()
+            except BrokenPipeError:
+                # أنهى البرنامج التنفيذ قبل قراءة المدخلات
+                proc.wait()
+            elapsed = time.perf_counter() - started
+
+            out = _read_limited(stdout, limits.output_bytes)
+            err = _read_limited(stderr, limits.output_bytes)
+
+    returncode = proc.returncode
+    if timed_out or _terminating_signal(returncode, sandboxed) in CPU_LIMIT_SIGNALS:
+        return 'timeout', out, err, returncode, elapsed
+    if returncode != 0:
+        return 'error', out, err, returncode, elapsed
+    return 'ok', out, err, returncode, elapsed
+
+
+def _terminating_signal(returncode, sandboxed):
+    """
+    الإشارة التي أنهت كود المستخدم أو None. بدون عزل يعيد Popen القيمة السالبة
+    للإشارة؛ أما nsjail فيخرج بـ 128 + رقم الإشارة التي أنهت العملية داخله.
+    """
+    if returncode is None:
+        return None
+    if returncode < 0:
+        return -returncode
+    if sandboxed and returncode > 128:
+        return returncode - 128
+    return None
+
+
+def _kill(proc, sandboxed):
+    """
+    إنهاء التشغيل بعد انتهاء الوقت. داخل nsjail يكفي إنهاء nsjail: العملية
+    الأولى في PID namespace تموت معه (PR_SET_PDEATHSIG) فيُنهي النواة كل
+    عمليات الـ namespace مهما غيّرت جلستها أو مجموعتها.
+    """
+    try:
+        if sandboxed:
+            proc.kill()
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run_test_case(code, test_case, index, limits=None):
+    """تشغيل الكود على حالة اختبار ومقارنة المخرجات"""
+    from .grading import normalize_output
+
+    name = test_case.get('name') or f'test_{index + 1}'
+    status, out, err, returncode, elapsed = run_code(code, test_case.get('input', ''), limits)
+
+    if status == 'ok':
+        expected = test_case.get('expected_output', '')
+        status = 'passed' if normalize_output(out) == normalize_output(expected) else 'failed'
+
+    return TestCaseResult(
+        name=name, status=status, time=elapsed,
+        output=out, errors=err, returncode=returncode,
+    )
+
+
+# ========================
+# مجموعة العمال المشتركة
+# ========================
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'CODE_RUNNER_WORKERS', None) or os.cpu_count(),
+                    thread_name_prefix='code-runner',
+                )
+    return _executor
+
+
+def run_tests(code, test_cases, limits=None):
+    """تشغيل جميع حالات الاختبار بالتوازي وإرجاع تقرير بالتوقيتات"""
+    limits = limits or RunnerLimits.from_settings()
+    started = time.perf_counter()
+    futures = [
+        _get_executor().submit(run_test_case, code, test_case, index, limits)
+        for index, test_case in enumerate(test_cases)
+    ]
+    results = [future.result() for future in futures]
+    return RunReport(results=results, elapsed=time.perf_counter() - started)
+
+
+def load_test_cases(challenge):
+    """
+    قراءة حالات الاختبار من ملف JSON بالشكل:
+    [{"name": "...", "input": "...", "expected_output": "..."}, ...]
+    أو {"tests": [...]}. عند عدم وجود الملف تُستخدم المخرجات المتوقعة للتحدي.
+    """
+    if challenge.test_cases:
+        with challenge.test_cases.open('rb') as fh:
+            data = json.loads(fh.read().decode('utf-8'))
+        if isinstance(data, dict):
+            data = data.get('tests', [])
+        return [case for case in data if isinstance(case, dict)]
+
+    if challenge.expected_output:
+        return [{'name': 'expected_output', 'input': '', 'expected_output': challenge.expected_output}]
+    return []
@@ -0,0 +1,207 @@
+# labs/search.py
+"""
+البحث النصي الكامل في المعامل
+
+يُحفظ في Lab.search_document نص موحّد (normalised) من العنوان والوصف والنظرة
+العامة، ثم يُفهرس حسب قاعدة البيانات:
+- PostgreSQL: فهرس GIN على to_tsvector('simple', search_document).
+- SQLite: جدول FTS5 افتراضي (labs_lab_fts) مرتبط بمعرف المعمل.
+ويتم التوحيد نفسه على نص البحث، فتتطابق صيغ الألف والهمزة والتاء المربوطة
+والحروف مع التشكيل أو بدونه.
+
+الفهرس يُكتب على قاعدة الكتابة للمعامل، ويُنفذ البحث على قاعدة الاستعلام
+نفسه (queryset.db، وقد تكون نسخة قراءة)؛ وجود جدول FTS5 يُفحص لكل قاعدة
+على حدة.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+FTS_TABLE = 'labs_lab_fts'
+PG_INDEX = 'labs_lab_search_gin'
+PG_CONFIG = 'simple'
+
+# التشكيل (الفتحة... السكون، والألف الخنجرية) والتطويل
+ARABIC_DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+ARABIC_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+})
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    """توحيد النص العربي واللاتيني قبل الفهرسة أو البحث"""
+    text = ARABIC_DIACRITICS_RE.sub('', text or '')
+    return text.translate(ARABIC_LETTER_MAP).casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_text(text))
+
+
+def build_document(lab):
+    """النص الموحّد الذي يُفهرس للمعمل"""
+    parts = [lab.title, lab.description, lab.overview, lab.learning_objectives]
+    return ' '.join(tokenize(' '.join(part or '' for part in parts)))
+
+
+# ========================
+# صيانة الفهرس
+# ========================
+
+# alias -> هل يوجد جدول FTS5 في تلك القاعدة
+_fts_ready = {}
+
+
+def _connection(using=None):
+    """اتصال القاعدة المطلوبة، أو قاعدة الكتابة للمعامل"""
+    from .models import Lab
+    return connections[using or router.db_for_write(Lab)]
+
+
+def _lab_table(connection):
+    from .models import Lab
+    return connection.ops.quote_name(Lab._meta.db_table)
+
+
+def fts_available(using=None):
+    """هل يوجد جدول FTS5 (SQLite فقط) في القاعدة المحددة"""
+    connection = _connection(using)
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_ready:
+        _fts_ready[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_ready[connection.alias]
+
+
+def ensure_index(using=None):
+    """إنشاء فهرس البحث المناسب لقاعدة البيانات المحددة"""
+    connection = _connection(using)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {_lab_table(connection)} "
+                f"USING gin (to_tsvector('{PG_CONFIG}', search_document))"
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(search_document, tokenize='unicode61 remove_diacritics 2')"
+            )
+            _fts_ready[connection.alias] = True
+
+
+def index_labs(labs, using=None):
+    """تحديث صفوف FTS5 للمعامل (PostgreSQL يحدّث الفهرس تلقائياً)"""
+    if not fts_available(using):
+        return
+    with _connection(using).cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, search_document) VALUES (%s, %s)',
+            [(lab.pk, lab.search_document) for lab in labs],
+        )
+
+
+def remove_lab(lab_id, using=None):
+    if not fts_available(using):
+        return
+    with _connection(using).cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [lab_id])
+
+
+def rebuild_index(batch_size=2000, using=None):
+    """إعادة حساب search_document لجميع المعامل وإعادة تعبئة الفهرس"""
+    from .models import Lab
+
+    using = _connection(using).alias
+    ensure_index(using)
+    if fts_available(using):
+        with _connection(using).cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    total = 0
+    batch = []
+    labs = Lab.objects.using(using).only(
+        'pk', 'title', 'description', 'overview', 'learning_objectives', 'search_document'
+    ).order_by('pk').iterator(chunk_size=batch_size)
+    for lab in labs:
+        lab.search_document = build_document(lab)
+        batch.append(lab)
+        if len(batch) >= batch_size:
+            total += _write_batch(batch, using)
+            batch = []
+    if batch:
+        total += _write_batch(batch, using)
+    return total
+
+
+def _write_batch(labs, using):
+    from .models import Lab
+
+    Lab.objects.using(using).bulk_update(labs, ['search_document'])
+    index_labs(labs, using)
+    return len(labs)
+
+
+# ========================
+# تنفيذ البحث
+# ========================
+
+def search(queryset, query):
+    """
+    تصفية المعامل حسب نص البحث مع إضافة search_rank (الأعلى أفضل)
+    وترتيب النتائج حسبه.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    # الفحص والاستعلام على القاعدة نفسها التي سيُنفذ عليها الـ queryset
+    using = queryset.db
+    connection = connections[using]
+    table = _lab_table(connection)
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        vector = f"to_tsvector('{PG_CONFIG}', {table}.search_document)"
+        ts = f"to_tsquery('{PG_CONFIG}', %s)"
+        return queryset.filter(
+            RawSQL(f'{vector} @@ {ts}', [tsquery], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'ts_rank({vector}, {ts})', [tsquery], output_field=FloatField())
+        ).order_by('-search_rank', '-created_at')
+
+    if fts_available(using):
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # ربط مباشر بجدول FTS5: المطابقة تُنفذ مرة واحدة وتُحسب bm25 من نفس
+        # الصف؛ الاستعلام الفرعي المرتبط بكل معمل كان يعيد MATCH لكل صف.
+        # bm25 تُرجع قيماً سالبة (الأصغر أفضل) فنعكسها
+        return queryset.extra(
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).order_by('-search_rank', '-created_at')
+
+    # بدون فهرس: مطابقة جزئية على النص الموحّد
+    for token in tokens:
+        queryset = queryset.filter(search_document__contains=token)
+    return queryset
+
+
+class LabSearchFilter(BaseFilterBackend):
+    """بديل SearchFilter يستخدم فهرس البحث النصي الكامل"""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search(queryset, query)
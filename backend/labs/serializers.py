@@ -2,14 +2,109 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import (
-    Lab, Challenge, Submission, 
-    UserLabProgress, LabReview, LabStatistics
+    Lab, Challenge, Submission, SubmissionAttempt,
+    UserLabProgress, LabReview, LabStatistics, UploadSession
 )
 
+from . import images
+from .uploads import UploadError, resolve_upload
+
 User = get_user_model()
 
 
-class LabSerializer(serializers.ModelSerializer):
+# ========================
+# الحقول الديناميكية (?fields= و ?expand=)
+# ========================
+
+def _split_param(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class DynamicFieldsMixin:
+    """
+    اختيار الحقول المرسلة عبر ?fields=id,title وتوسيع العلاقات عبر ?expand=lab.
+    
+    - expandable_fields: {'اسم الحقل': 'اسم الـ Serializer'} لاستبدال المعرّف بكائن.
+    - Meta.field_sources: أعمدة النموذج التي يحتاجها حقل غير مباشر
+      (مثل difficulty_display ← difficulty) لبناء .only() في الـ ViewSet.
+    
+    تُقرأ معاملات الطلب للـ Serializer الجذري فقط (أو عنصر القائمة الجذرية)،
+    أما المتداخل فيمكن تمرير fields/expand له صراحة.
+    """
+    
+    expandable_fields = {}
+    
+    def __init__(self, *args, **kwargs):
+        self._requested_fields = kwargs.pop('fields', None)
+        self._requested_expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+    
+    def _is_root(self):
+        parent = self.parent
+        return parent is None or (
+            isinstance(parent, serializers.ListSerializer) and parent.parent is None
+        )
+    
+    def _query_param(self, name):
+        request = self.context.get('request')
+        if request is None or not self._is_root():
+            return None
+        return _split_param(request.query_params.get(name))
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        
+        expand = self._requested_expand
+        if expand is None:
+            expand = self._query_param('expand') or []
+        for name in expand:
+            if name in self.expandable_fields and name in fields:
+                serializer_class = globals()[self.expandable_fields[name]]
+                fields[name] = serializer_class(read_only=True, context=self.context)
+        
+        requested = self._requested_fields
+        if requested is None:
+            requested = self._query_param('fields')
+        if requested:
+            for name in set(fields) - set(requested):
+                fields.pop(name)
+        return fields
+    
+    @classmethod
+    def requested_field_names(cls, request):
+        """أسماء الحقول التي ستُرسل للطلب"""
+        names = list(cls.Meta.fields)
+        requested = _split_param(request.query_params.get('fields')) if request else []
+        if requested:
+            names = [name for name in names if name in requested]
+        return names
+    
+    @classmethod
+    def model_fields_for(cls, request):
+        """
+        أعمدة النموذج اللازمة للحقول المطلوبة (لاستخدامها في .only())،
+        أو None إذا تعذر تحديدها بأمان.
+        """
+        if request is not None and request.query_params.get('expand'):
+            # الكائنات الموسّعة تحتاج صفوفها كاملة
+            return None
+        model = cls.Meta.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        sources = getattr(cls.Meta, 'field_sources', {})
+        declared = cls._declared_fields
+        
+        columns = {'pk'}
+        for name in cls.requested_field_names(request):
+            if name in sources:
+                columns.update(sources[name])
+            elif name in concrete and name not in declared:
+                columns.add(name)
+            else:
+                return None
+        return sorted(columns)
+
+
+class LabSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer للمعامل"""
     
     difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
@@ -17,6 +112,7 @@ class LabSerializer(serializers.ModelSerializer):
     challenge_count = serializers.SerializerMethodField()
     completion_rate = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Lab
@@ -24,7 +120,7 @@ class LabSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'description', 'overview', 
             'learning_objectives', 'category', 'category_display',
             'difficulty', 'difficulty_display', 'points', 
-            'estimated_time', 'thumbnail', 'thumbnail_url',
+            'estimated_time', 'thumbnail', 'thumbnail_url', 'thumbnail_srcset',
             'lab_guide', 'starter_files', 'solution_file',
             'is_premium', 'is_active', 'requires_vm', 'vm_image',
             'views', 'completions', 'average_score',
@@ -35,10 +131,22 @@ class LabSerializer(serializers.ModelSerializer):
             'id', 'slug', 'views', 'completions', 'average_score',
             'created_at', 'updated_at', 'published_at'
         ]
+        extra_kwargs = {
+            'solution_file': {'write_only': True},
+        }
+        field_sources = {
+            'category_display': ['category'],
+            'difficulty_display': ['difficulty'],
+            'challenge_count': ['challenge_total'],
+            'completion_rate': ['views', 'completions'],
+            'thumbnail_url': ['thumbnail'],
+            'thumbnail_srcset': ['thumbnail', 'thumbnail_variants'],
+            'solution_file': [],
+        }
     
     def get_challenge_count(self, obj):
         """عدد التحديات في المعمل"""
-        return obj.challenges.count()
+        return obj.get_challenge_count()
     
     def get_completion_rate(self, obj):
         """نسبة الإكمال"""
@@ -54,11 +162,31 @@ class LabSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.thumbnail.url)
             return obj.thumbnail.url
         return None
+    
+    def get_thumbnail_srcset(self, obj):
+        """روابط النسخ المصغرة بصيغة srcset لكل صيغة (WebP و JPEG)"""
+        return images.srcset(
+            obj.pk, obj.thumbnail.name, obj.thumbnail_variants, self.context.get('request')
+        )
 
 
-class ChallengeSerializer(serializers.ModelSerializer):
+class LabListSerializer(LabSerializer):
+    """Serializer مختصر لقوائم المعامل (بدون النصوص الطويلة والملفات)"""
+    
+    class Meta(LabSerializer.Meta):
+        fields = [
+            'id', 'title', 'slug', 'category', 'category_display',
+            'difficulty', 'difficulty_display', 'points', 'estimated_time',
+            'thumbnail_url', 'thumbnail_srcset', 'is_premium', 'views', 'completions',
+            'average_score', 'challenge_count', 'completion_rate', 'published_at'
+        ]
+
+
+class ChallengeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer للتحديات"""
     
+    expandable_fields = {'lab': 'LabListSerializer'}
+    
     answer_type_display = serializers.CharField(source='get_answer_type_display', read_only=True)
     level_display = serializers.CharField(source='get_level_display', read_only=True)
     lab_title = serializers.CharField(source='lab.title', read_only=True)
@@ -72,33 +200,78 @@ class ChallengeSerializer(serializers.ModelSerializer):
             'correct_answer', 'correct_code', 'expected_output',
             'multiple_choices', 'hint', 'solution_hint',
             'points', 'order', 'starter_code', 'test_cases',
-            'attachments', 'attempts', 'success_rate',
+            'attachments', 'attempts', 'solved_count', 'success_rate',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['attempts', 'success_rate', 'created_at', 'updated_at']
+        read_only_fields = ['attempts', 'solved_count', 'success_rate', 'created_at', 'updated_at']
+        # الإجابات لا تُرسل للعميل أبداً
+        extra_kwargs = {
+            'correct_answer': {'write_only': True},
+            'correct_code': {'write_only': True},
+            'expected_output': {'write_only': True},
+            'test_cases': {'write_only': True},
+        }
+        field_sources = {
+            'lab_title': ['lab', 'lab__title'],
+            'answer_type_display': ['answer_type'],
+            'level_display': ['level'],
+            'correct_answer': [], 'correct_code': [],
+            'expected_output': [], 'test_cases': [],
+        }
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class ChallengeListSerializer(ChallengeSerializer):
+    """Serializer مختصر لقوائم التحديات"""
+    
+    class Meta(ChallengeSerializer.Meta):
+        fields = [
+            'id', 'lab', 'lab_title', 'title', 'answer_type', 'answer_type_display',
+            'level', 'level_display', 'points', 'order',
+            'attempts', 'solved_count', 'success_rate'
+        ]
+
+
+def resolve_upload_field(serializer, data):
+    """استبدال upload_id بمسار الملف المخزن (Blob) في data['file']"""
+    upload_id = data.pop('upload_id', None)
+    if upload_id is None:
+        return
+    if data.get('file'):
+        raise serializers.ValidationError({'upload_id': 'أرسل ملفاً أو upload_id وليس كليهما'})
+    request = serializer.context.get('request')
+    try:
+        data['file'] = resolve_upload(request.user, upload_id)
+    except (UploadError, AttributeError):
+        raise serializers.ValidationError({'upload_id': 'جلسة الرفع غير موجودة أو لم تكتمل'})
+
+
+class SubmissionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer للتسليمات"""
     
+    expandable_fields = {'lab': 'LabListSerializer', 'challenge': 'ChallengeListSerializer'}
+    
     user = serializers.StringRelatedField(read_only=True)
     lab_title = serializers.CharField(source='lab.title', read_only=True)
     challenge_title = serializers.CharField(source='challenge.title', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    upload_id = serializers.UUIDField(required=False, write_only=True)
     
     class Meta:
         model = Submission
         fields = [
             'id', 'user', 'lab', 'lab_title', 'challenge', 'challenge_title',
-            'answer', 'code', 'file', 'status', 'status_display',
+            'answer', 'code', 'file', 'upload_id', 'status', 'status_display',
             'is_correct', 'execution_time', 'completion_time',
             'test_results', 'output', 'errors', 'score',
             'reviewed_by', 'review_notes', 'review_score',
+            'attempt_count', 'last_attempt_at',
             'submitted_at', 'reviewed_at'
         ]
         read_only_fields = [
             'id', 'user', 'submitted_at', 'reviewed_at',
-            'test_results', 'output', 'errors', 'score'
+            'status', 'is_correct', 'execution_time',
+            'test_results', 'output', 'errors', 'score',
+            'attempt_count', 'last_attempt_at'
         ]
     
     def validate(self, data):
@@ -112,12 +285,30 @@ class SubmissionSerializer(serializers.ModelSerializer):
                 'challenge': 'هذا التحدي لا ينتمي إلى المعمل المحدد'
             })
         
+        resolve_upload_field(self, data)
         return data
 
 
-class UserLabProgressSerializer(serializers.ModelSerializer):
+class SubmissionAttemptSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer لمحاولات التسليم (للقراءة فقط)"""
+    
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = SubmissionAttempt
+        fields = [
+            'id', 'submission', 'challenge', 'answer', 'file',
+            'status', 'status_display', 'is_correct', 'score',
+            'execution_time', 'errors', 'submitted_at', 'graded_at'
+        ]
+        read_only_fields = fields
+
+
+class UserLabProgressSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer لتقدم المستخدم"""
     
+    expandable_fields = {'lab': 'LabListSerializer'}
+    
     user = serializers.StringRelatedField(read_only=True)
     lab_title = serializers.CharField(source='lab.title', read_only=True)
     
@@ -126,7 +317,8 @@ class UserLabProgressSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'lab', 'lab_title',
             'is_started', 'is_completed', 'completion_percentage',
-            'completed_challenges', 'total_score', 'max_possible_score',
+            'completed_challenges', 'completed_challenges_count',
+            'total_score', 'max_possible_score',
             'started_at', 'completed_at', 'total_time_spent',
             'attempt_count', 'created_at', 'updated_at'
         ]
@@ -135,7 +327,7 @@ class UserLabProgressSerializer(serializers.ModelSerializer):
         ]
 
 
-class LabReviewSerializer(serializers.ModelSerializer):
+class LabReviewSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer لتقييمات المعامل"""
     
     user = serializers.StringRelatedField(read_only=True)
@@ -147,13 +339,13 @@ class LabReviewSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'username', 'lab', 'lab_title',
             'rating', 'difficulty_rating', 'content_quality',
-            'support_quality', 'comment', 'is_approved',
+            'usefulness', 'comment', 'is_approved',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class LabStatisticsSerializer(serializers.ModelSerializer):
+class LabStatisticsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer لإحصائيات المعامل"""
     
     lab_title = serializers.CharField(source='lab.title', read_only=True)
@@ -163,9 +355,9 @@ class LabStatisticsSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'lab', 'lab_title',
             'total_views', 'total_starts', 'total_completions',
-            'average_rating', 'average_completion_time',
-            'completion_rate', 'challenge_success_rate',
-            'user_retention_rate', 'last_calculated'
+            'total_submissions', 'average_rating', 'average_completion_time',
+            'average_score', 'completion_rate', 'success_rate',
+            'dropout_rate', 'last_calculated'
         ]
         read_only_fields = ['id', 'last_calculated']
 
@@ -177,9 +369,11 @@ class SubmitChallengeSerializer(serializers.Serializer):
     answer = serializers.CharField(required=False, allow_blank=True)
     code = serializers.CharField(required=False, allow_blank=True)
     file = serializers.FileField(required=False)
+    upload_id = serializers.UUIDField(required=False, write_only=True)
     
     def validate(self, data):
         """التحقق من وجود إجابة واحدة على الأقل"""
+        resolve_upload_field(self, data)
         if not any([data.get('answer'), data.get('code'), data.get('file')]):
             raise serializers.ValidationError(
                 "يجب تقديم إجابة على الأقل (نص، كود، أو ملف)"
@@ -193,7 +387,8 @@ class LabSearchSerializer(serializers.Serializer):
     search = serializers.CharField(required=False)
     category = serializers.CharField(required=False)
     difficulty = serializers.CharField(required=False)
-    is_premium = serializers.BooleanField(required=False)
+    # None عند عدم الإرسال: BooleanField يحوّل الغياب إلى False فيُفلتر المميز خطأً
+    is_premium = serializers.BooleanField(required=False, allow_null=True, default=None)
 
 
 class UserProgressSerializer(serializers.Serializer):
@@ -210,13 +405,13 @@ class UserProgressSerializer(serializers.Serializer):
 
 from .models import Notification, UserProfile
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer للإشعارات"""
     class Meta:
         model = Notification
         fields = ['id', 'title', 'message', 'type', 'is_read', 'link', 'created_at']
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer للملف الشخصي"""
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
@@ -229,3 +424,40 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'streak_days', 'last_activity', 'is_public', 'receive_emails'
         ]
         read_only_fields = ['total_points', 'rank', 'completed_labs_count', 'streak_days', 'last_activity']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer لجلسات الرفع على أجزاء"""
+    
+    sha256 = serializers.CharField(source='blob.sha256', read_only=True, default=None)
+    
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'size', 'received', 'status', 'sha256',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'received', 'status', 'created_at', 'updated_at']
+
+
+class AttachUploadSerializer(serializers.Serializer):
+    """ربط ملف مرفوع بحقل ملف في معمل أو تحدٍ"""
+    
+    TARGET_FIELDS = {
+        'lab': (Lab, ('thumbnail', 'lab_guide', 'starter_files', 'solution_file')),
+        'challenge': (Challenge, ('starter_code', 'test_cases', 'attachments')),
+    }
+    
+    target = serializers.ChoiceField(choices=list(TARGET_FIELDS))
+    object_id = serializers.IntegerField()
+    field = serializers.CharField()
+    
+    def validate(self, data):
+        model, fields = self.TARGET_FIELDS[data['target']]
+        if data['field'] not in fields:
+            raise serializers.ValidationError({'field': f'الحقول المتاحة: {", ".join(fields)}'})
+        instance = model.objects.filter(pk=data['object_id']).first()
+        if instance is None:
+            raise serializers.ValidationError({'object_id': 'العنصر غير موجود'})
+        data['instance'] = instance
+        return data
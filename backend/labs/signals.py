@@ -0,0 +1,81 @@
+# labs/signals.py
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import events, images
+from .cache import invalidate_labs
+from .models import Challenge, Lab, LabReview, LabStatistics
+
+
+@receiver(post_save, sender=Lab)
+@receiver(post_delete, sender=Lab)
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+def invalidate_lab_caches(sender, instance, **kwargs):
+    """إبطال البيانات المخزنة المشتقة من كتالوج المعامل (ومنها الاستجابات المخزنة)"""
+    invalidate_labs()
+
+
+@receiver(post_save, sender=Lab)
+def create_lab_statistics(sender, instance, created, **kwargs):
+    if created:
+        LabStatistics.objects.get_or_create(lab=instance)
+
+
+@receiver(post_save, sender=Lab)
+def schedule_thumbnail_variants(sender, instance, **kwargs):
+    """توليد نسخ الصورة المصغرة في الخلفية عند رفع صورة جديدة أو حذفها"""
+    if not images.is_current(instance.thumbnail.name or '', instance.thumbnail_variants):
+        lab_id = instance.pk
+        transaction.on_commit(lambda: images.request_variants(lab_id))
+
+
+# ========================
+# عدد التحديات المخزن في المعمل
+# ========================
+
+def _adjust_challenge_total(lab_id, amount):
+    Lab.objects.filter(pk=lab_id).update(
+        challenge_total=F('challenge_total') + amount, updated_at=timezone.now()
+    )
+
+
+@receiver(pre_save, sender=Challenge)
+def remember_challenge_lab(sender, instance, **kwargs):
+    """المعمل الحالي في قاعدة البيانات، لنقل العدّ عند تغيير معمل التحدي"""
+    instance._previous_lab_id = None
+    if instance.pk:
+        instance._previous_lab_id = Challenge.objects.filter(pk=instance.pk).values_list(
+            'lab_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Challenge)
+def increment_challenge_total(sender, instance, created, **kwargs):
+    previous_lab_id = getattr(instance, '_previous_lab_id', None)
+    if created:
+        _adjust_challenge_total(instance.lab_id, 1)
+    elif previous_lab_id is not None and previous_lab_id != instance.lab_id:
+        _adjust_challenge_total(previous_lab_id, -1)
+        _adjust_challenge_total(instance.lab_id, 1)
+
+
+@receiver(post_delete, sender=Challenge)
+def decrement_challenge_total(sender, instance, **kwargs):
+    _adjust_challenge_total(instance.lab_id, -1)
+
+
+# ========================
+# المراجعات: إصدار فرق التقييم فقط
+# ========================
+# الحفظ يُصدر حدثه داخل LabReview.save(). الحذف يبقى إشارة لأنه يشمل الحذف
+# المتتالي (حذف معمل أو مستخدم)، و post_delete تُرسل داخل معاملة الحذف نفسها.
+
+@receiver(post_delete, sender=LabReview)
+def emit_review_deleted(sender, instance, **kwargs):
+    if instance.is_approved:
+        events.emit(events.REVIEW_CHANGED, lab_id=instance.lab_id,
+                    rating_delta=-instance.rating, count_delta=-1)
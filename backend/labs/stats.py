@@ -0,0 +1,105 @@
+# labs/stats.py
+"""
+إحصائيات المنصة العامة (الصفحة الرئيسية)
+
+تُحسب جميع الأعداد في استعلام واحد، وتُخزن مؤقتاً مع بصمة (ETag) ووقت الحساب.
+بعد انتهاء مدة الصلاحية تُعاد القيمة القديمة فوراً ويُعاد الحساب في الخلفية
+(stale-while-revalidate)، مع قفل يمنع تكرار الحساب من عدة طلبات.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections, router
+
+from cyberlabs.db_router import replica_reads
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_KEY = 'platform-stats'
+REFRESH_LOCK_KEY = 'platform-stats:refreshing'
+
+
+def stats_ttl():
+    return getattr(settings, 'PLATFORM_STATS_TTL', 60)
+
+
+def stats_stale_ttl():
+    return getattr(settings, 'PLATFORM_STATS_STALE_TTL', 300)
+
+
+def compute_platform_statistics():
+    """جميع الأعداد في استعلام SELECT واحد يحتوي على استعلامات فرعية"""
+    from .models import Challenge, Lab, SubmissionAttempt, UserLabProgress
+
+    # إحصائيات عامة تتحمل تأخر النسخ: تُقرأ من نسخة مقروءة إن وجدت
+    with replica_reads():
+        connection = connections[router.db_for_read(Lab)]
+
+    def table(model):
+        return connection.ops.quote_name(model._meta.db_table)
+
+    def column(model, name):
+        return connection.ops.quote_name(model._meta.get_field(name).column)
+
+    sql = (
+        f'SELECT '
+        f'(SELECT COUNT(*) FROM {table(Lab)} WHERE {column(Lab, "is_active")} = %s), '
+        f'(SELECT COUNT(*) FROM {table(Challenge)}), '
+        f'(SELECT COUNT(*) FROM {table(SubmissionAttempt)}), '
+        f'(SELECT COUNT(*) FROM {table(UserLabProgress)} '
+        f'WHERE {column(UserLabProgress, "is_completed")} = %s)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [True, True])
+        total_labs, total_challenges, total_submissions, total_users_completed = cursor.fetchone()
+
+    return {
+        'total_labs': total_labs,
+        'total_challenges': total_challenges,
+        'total_submissions': total_submissions,
+        'total_users_completed': total_users_completed,
+    }
+
+
+def refresh_platform_statistics():
+    """إعادة الحساب وتخزين النتيجة مع بصمتها ووقت حسابها"""
+    data = compute_platform_statistics()
+    entry = {
+        'data': data,
+        'etag': hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest(),
+        'computed_at': time.time(),
+    }
+    cache.set(STATS_CACHE_KEY, entry, stats_ttl() + stats_stale_ttl())
+    return entry
+
+
+def _refresh_in_background():
+    close_old_connections()
+    try:
+        refresh_platform_statistics()
+    except Exception:
+        logger.exception('تعذر تحديث إحصائيات المنصة')
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        close_old_connections()
+
+
+def get_platform_statistics():
+    """
+    إرجاع {'data', 'etag', 'computed_at'}: من الذاكرة المؤقتة إن وُجدت،
+    مع تحديث في الخلفية إذا تجاوزت مدة الصلاحية.
+    """
+    entry = cache.get(STATS_CACHE_KEY)
+    if entry is None:
+        return refresh_platform_statistics()
+
+    if time.time() - entry['computed_at'] > stats_ttl():
+        # طلب واحد فقط يبدأ التحديث، والبقية تحصل على القيمة القديمة
+        if cache.add(REFRESH_LOCK_KEY, 1, stats_stale_ttl()):
+            threading.Thread(target=_refresh_in_background, daemon=True).start()
+    return entry
@@ -0,0 +1,59 @@
+# labs/tasks.py
+from celery import shared_task
+
+from .counters import flush_views
+from .events import process_pending, prune_processed
+from .grading import grade_attempt
+from .images import flush_invalidation, generate_and_unlock
+from .stats import refresh_platform_statistics
+from .uploads import expire_sessions
+
+
+@shared_task
+def flush_lab_views():
+    """كتابة المشاهدات المجمعة في قاعدة البيانات (تُجدول عبر Celery beat)"""
+    return flush_views()
+
+
+@shared_task(acks_late=True)
+def grade_attempt_task(attempt_id):
+    """تقييم محاولة تسليم معلقة على عامل Celery"""
+    result = grade_attempt(attempt_id)
+    return result.status if result else None
+
+
+@shared_task
+def refresh_platform_statistics_task():
+    """إعادة حساب إحصائيات المنصة العامة بشكل دوري"""
+    return refresh_platform_statistics()['data']
+
+
+@shared_task
+def process_domain_events():
+    """تطبيق الأحداث المعلقة في صندوق الصادر على البيانات المشتقة"""
+    return process_pending()
+
+
+@shared_task
+def prune_domain_events():
+    """حذف الأحداث المعالجة الأقدم من DOMAIN_EVENTS_RETENTION"""
+    return prune_processed()
+
+
+@shared_task
+def generate_thumbnail_variants_task(lab_id):
+    """توليد نسخ الصورة المصغرة للمعمل على عامل Celery"""
+    variants = generate_and_unlock(lab_id)
+    return sorted(variants) if variants else None
+
+
+@shared_task
+def invalidate_thumbnail_batch_task():
+    """إبطال ذاكرة الكتالوج مرة واحدة لدفعة النسخ المنتهية"""
+    flush_invalidation()
+
+
+@shared_task
+def expire_upload_sessions():
+    """إنهاء جلسات الرفع المتروكة وحذف ملفاتها المؤقتة"""
+    return expire_sessions()
@@ -0,0 +1,1349 @@
+# labs/tests.py
+"""
+اختبارات واجهة المعامل
+
+عدد الاستعلامات لكل نقطة قائمة/تفاصيل مثبت بـ assertNumQueries؛ أي
+تغيير يعيد مشكلة N+1 (أو يضيف استعلاماً) يُفشل الاختبار. الأعداد لا
+تعتمد على عدد الصفوف: البيانات تحتوي عدة معامل وتحديات لكل مستخدم.
+"""
+from datetime import timedelta
+from importlib import import_module
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+import zipfile
+import zlib
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection, router
+from django.db.models import F
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from cyberlabs.db_router import replica_reads
+
+from . import events, grading, images, importer, lab_statistics, leaderboard, search, uploads
+from .attempts import submit_attempt
+from .cache import LABS_NAMESPACE, _version_key
+from .checks import check_upload_lock_cache
+from .counters import flush_views
+from .models import (
+    Blob, Challenge, DomainEvent, Lab, LabReview, LabStatistics, LeaderboardEntry, Notification, Submission,
+    SubmissionAttempt, UploadSession, UserLabProgress,
+)
+from .response_cache import ResponseCacheMixin
+from .serializers import ChallengeListSerializer, LabListSerializer
+from .runner import RunnerLimits, run_code
+
+User = get_user_model()
+
+
+class LabsAPITestCase(APITestCase):
+    """بيانات مشتركة: 3 معامل × 3 تحديات مع محاولات وتقدم لمستخدم واحد"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student', password='password')
+        cls.staff = User.objects.create_user('admin', password='password', is_staff=True)
+        cls.labs = []
+        for index in range(3):
+            lab = Lab.objects.create(
+                title=f'معمل {index}', slug=f'lab-{index}', description='وصف',
+                category='web_security', points=30,
+            )
+            cls.labs.append(lab)
+            for order in range(3):
+                challenge = Challenge.objects.create(
+                    lab=lab, title=f'تحدي {order}', description='وصف', answer_type='flag',
+                    correct_answer='flag{ok}', points=10, order=order,
+                )
+                Submission.objects.create(
+                    user=cls.user, lab=lab, challenge=challenge, answer='flag{ok}',
+                    status='correct', is_correct=True, score=10,
+                )
+            UserLabProgress.objects.create(user=cls.user, lab=lab, is_started=True)
+        cls.lab = cls.labs[0]
+        cls.challenge = cls.lab.challenges.first()
+        cls.submission = Submission.objects.filter(user=cls.user).first()
+        cls.progress = UserLabProgress.objects.filter(user=cls.user).first()
+        LeaderboardEntry.objects.create(scope='global', user=cls.user, points=90)
+        LeaderboardEntry.objects.create(scope='global', user=cls.staff, points=10)
+
+    def setUp(self):
+        # الاستجابات المخزنة تُسقط الاستعلامات وتُخفي الأعداد الحقيقية
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        # مشاهدات المعامل المعلقة تُكتب قبل حذف قاعدة الاختبار
+        flush_views()
+
+
+# ========================
+# عدد الاستعلامات
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryCountTests(LabsAPITestCase):
+
+    def assertQueries(self, url, count):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response
+
+    def test_lab_list(self):
+        response = self.assertQueries('/api/labs/', 3)
+        self.assertEqual(response.data['count'], 3)
+
+    def test_lab_detail(self):
+        self.assertQueries(f'/api/labs/{self.lab.pk}/', 2)
+
+    def test_challenge_list(self):
+        self.assertQueries('/api/challenges/', 3)
+
+    @override_settings(FAST_SERIALIZATION=True)
+    def test_fast_path_lab_list(self):
+        self.assertQueries('/api/labs/', 3)
+
+    def test_challenge_detail(self):
+        self.assertQueries(f'/api/challenges/{self.challenge.pk}/', 2)
+
+    def test_submission_list(self):
+        self.assertQueries('/api/submissions/', 2)
+
+    def test_submission_detail(self):
+        self.assertQueries(f'/api/submissions/{self.submission.pk}/', 1)
+
+    def test_progress_list(self):
+        self.assertQueries('/api/progress/', 3)
+
+    def test_progress_detail(self):
+        self.assertQueries(f'/api/progress/{self.progress.pk}/', 2)
+
+    def test_dashboard(self):
+        self.assertQueries('/api/profile/dashboard/', 4)
+
+    def test_leaderboard(self):
+        response = self.assertQueries('/api/leaderboard/', 2)
+        self.assertEqual(response.data[0]['user_id'], self.user.pk)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PageSizeQueryCountTests(LabsAPITestCase):
+    """
+    نفس عدد الاستعلامات لصفحة صغيرة وصفحة أكبر: مشكلة N+1 تظهر فقط عندما
+    يزيد عدد الصفوف في الصفحة الواحدة.
+    """
+
+    def measure(self, url, rows):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return len(queries), rows(response.data)
+
+    @staticmethod
+    def page_rows(data):
+        return len(data['results'] if isinstance(data, dict) else data)
+
+    def assertSameQueries(self, count, small_url, large_url=None, grow=None, rows=None):
+        rows = rows or self.page_rows
+        small = self.measure(small_url, rows)
+        if grow is not None:
+            grow()
+        large = self.measure(large_url or small_url, rows)
+        self.assertGreater(large[1], small[1])
+        self.assertEqual((small[0], large[0]), (count, count))
+
+    def add_labs(self, count=4):
+        for index in range(count):
+            lab = Lab.objects.create(
+                title=f'معمل إضافي {index}', slug=f'extra-{index}', description='وصف',
+                category='network_security' if index % 2 else 'web_security', points=10,
+            )
+            for order in range(2):
+                Challenge.objects.create(
+                    lab=lab, title=f'تحدي {order}', description='وصف', answer_type='flag',
+                    correct_answer='flag{ok}', points=5, order=order,
+                )
+
+    def add_challenges(self, count=5):
+        for order in range(10, 10 + count):
+            challenge = Challenge.objects.create(
+                lab=self.lab, title=f'تحدي {order}', description='وصف', answer_type='flag',
+                correct_answer='flag{ok}', points=5, order=order,
+            )
+            Submission.objects.create(
+                user=self.user, lab=self.lab, challenge=challenge, answer='x',
+                status='incorrect', score=0,
+            )
+
+    def add_reviews(self, count=4):
+        for index in range(count):
+            reviewer = User.objects.create_user(f'reviewer-{index}', password='password')
+            LabReview.objects.create(
+                user=reviewer, lab=self.labs[index % 3], rating=4, difficulty_rating=3,
+                content_quality=4, usefulness=5,
+            )
+
+    def test_lab_search(self):
+        self.assertSameQueries(2, '/api/labs/search/?category=web_security', grow=self.add_labs)
+
+    def test_categories(self):
+        self.assertSameQueries(1, '/api/labs/categories/', grow=self.add_labs)
+
+    def test_facets(self):
+        self.assertSameQueries(
+            1, '/api/labs/facets/', grow=self.add_labs,
+            rows=lambda data: sum(item['count'] for item in data['category']),
+        )
+
+    def test_lab_challenges(self):
+        url = f'/api/labs/{self.lab.pk}/challenges/'
+        self.assertSameQueries(3, url, grow=self.add_challenges)
+
+    def test_lab_submissions(self):
+        url = f'/api/labs/{self.lab.pk}/submissions/'
+        self.assertSameQueries(2, url, grow=self.add_challenges)
+
+    def test_reviews(self):
+        LabReview.objects.create(
+            user=self.user, lab=self.lab, rating=5, difficulty_rating=3, content_quality=4, usefulness=5,
+        )
+        self.assertSameQueries(2, '/api/reviews/', grow=self.add_reviews)
+
+    def test_notifications(self):
+        for index in range(6):
+            Notification.objects.create(user=self.user, title=f'إشعار {index}', message='نص')
+        self.assertSameQueries(
+            1, '/api/notifications/?cursor=&page_size=2',
+            '/api/notifications/?cursor=&page_size=6',
+        )
+
+    def test_submissions(self):
+        self.assertSameQueries(
+            1, '/api/submissions/?cursor=&page_size=2',
+            '/api/submissions/?cursor=&page_size=9',
+        )
+
+
+# ========================
+# ترقيم الصفحات بالمفاتيح
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(LabsAPITestCase):
+
+    def walk(self, url):
+        """جميع الصفوف بمتابعة روابط next، مع عدد الصفحات"""
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:300])
+            self.assertEqual(set(response.data), {'next', 'results'})
+            ids.extend(row['id'] for row in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        return ids, pages
+
+    def test_submission_cursor_round_trip_with_ties(self):
+        # تسعة تسليمات على طابعين زمنيين فقط: الصفحات تنقسم داخل كل مجموعة متساوية
+        now = timezone.now()
+        submissions = list(Submission.objects.filter(user=self.user).order_by('pk'))
+        for index, submission in enumerate(submissions):
+            Submission.objects.filter(pk=submission.pk).update(
+                submitted_at=now if index % 3 else now - timedelta(hours=1)
+            )
+        expected = list(Submission.objects.filter(user=self.user).order_by(
+            '-submitted_at', '-id'
+        ).values_list('id', flat=True))
+
+        ids, pages = self.walk('/api/submissions/?cursor=&page_size=2')
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 5)
+
+    def test_notification_cursor_round_trip_with_ties(self):
+        created = timezone.now()
+        for index in range(5):
+            Notification.objects.create(user=self.user, title=f'إشعار {index}', message='نص')
+        Notification.objects.update(created_at=created)
+        expected = list(Notification.objects.order_by('-id').values_list('id', flat=True))
+
+        self.assertEqual(self.walk('/api/notifications/?cursor=&page_size=2')[0], expected)
+        self.assertEqual(self.walk('/api/notifications/?cursor=&page_size=5')[1], 1)
+
+    def test_page_numbers_without_cursor(self):
+        response = self.client.get('/api/submissions/')
+        self.assertEqual(response.data['count'], 9)
+
+    def test_invalid_cursor_returns_404(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+        for cursor in ('not-base64!', encode(5), encode(['not a date', 1]),
+                       encode(['2024-01-01T00:00:00', 'x']), encode({'a': 1})):
+            response = self.client.get('/api/submissions/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+# ========================
+# لوحة المتصدرين
+# ========================
+
+class LeaderboardTests(LabsAPITestCase):
+    """مخزن قاعدة البيانات: الترتيب مع التعادل، والجيران، والنطاقات، والمستخدم الغائب"""
+
+    def setUp(self):
+        super().setUp()
+        board = leaderboard.DatabaseLeaderboard()
+        patcher = mock.patch('labs.leaderboard.get_leaderboard', return_value=board)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.board = board
+        LeaderboardEntry.objects.all().delete()
+        # النقاط: 50، 50، 50، 30، 10 (التعادل يُحسم بالمعرّف الأصغر)
+        self.players = [User.objects.create_user(f'player-{index}') for index in range(5)]
+        for player, points in zip(self.players, (50, 50, 50, 30, 10)):
+            self.board.increment(leaderboard.GLOBAL_SCOPE, player.pk, points)
+
+    def test_rank_matches_top_order_with_ties(self):
+        top = self.board.top(leaderboard.GLOBAL_SCOPE, 10)
+        self.assertEqual([user_id for user_id, _points, _rank in top], [player.pk for player in self.players])
+        for user_id, _points, rank in top:
+            self.assertEqual(self.board.rank(leaderboard.GLOBAL_SCOPE, user_id), rank)
+
+    def test_missing_user(self):
+        self.assertIsNone(self.board.rank(leaderboard.GLOBAL_SCOPE, self.user.pk))
+        self.assertEqual(
+            leaderboard.around(leaderboard.GLOBAL_SCOPE, self.user.pk),
+            {'rank': None, 'points': 0, 'entries': []},
+        )
+
+    def test_around(self):
+        middle = self.players[2]
+        result = leaderboard.around(leaderboard.GLOBAL_SCOPE, middle.pk, neighbours=1)
+        self.assertEqual((result['rank'], result['points']), (3, 50))
+        self.assertEqual(
+            [(entry['rank'], entry['username']) for entry in result['entries']],
+            [(2, 'player-1'), (3, 'player-2'), (4, 'player-3')],
+        )
+        # أول اللوحة: لا جيران قبله
+        first = leaderboard.around(leaderboard.GLOBAL_SCOPE, self.players[0].pk, neighbours=2)
+        self.assertEqual([entry['rank'] for entry in first['entries']], [1, 2, 3, 4, 5])
+
+    def test_category_and_lab_scopes(self):
+        player = self.players[4]
+        other = self.labs[1]
+        other.category = 'cryptography'
+        leaderboard.record_points(player.pk, self.lab.pk, self.lab.category, 50)
+        leaderboard.record_points(self.players[0].pk, other.pk, other.category, 5)
+
+        self.assertEqual(self.board.rank(leaderboard.GLOBAL_SCOPE, player.pk), 1)
+        self.assertEqual(self.board.score(leaderboard.GLOBAL_SCOPE, player.pk), 60)
+        self.assertEqual(self.board.rank(leaderboard.category_scope('web_security'), player.pk), 1)
+        self.assertEqual(self.board.rank(leaderboard.lab_scope(self.lab.pk), player.pk), 1)
+        # لا نقاط له في المعمل الآخر ولا في تصنيفه
+        self.assertIsNone(self.board.rank(leaderboard.lab_scope(other.pk), player.pk))
+        self.assertIsNone(self.board.rank(leaderboard.category_scope('cryptography'), player.pk))
+        self.assertEqual(self.board.rank(leaderboard.lab_scope(other.pk), self.players[0].pk), 1)
+
+
+# ========================
+# مشغّل الكود
+# ========================
+
+class RunnerSandboxTests(SimpleTestCase):
+
+    @override_settings(CODE_RUNNER_SANDBOX='nsjail', CODE_RUNNER_NSJAIL='/nonexistent/nsjail')
+    def test_refuses_to_run_without_sandbox(self):
+        status, out, err, returncode, elapsed = run_code('print("escaped")')
+        self.assertEqual(status, 'error')
+        self.assertEqual(out, '')
+        self.assertIn('nsjail', err)
+
+    @override_settings(CODE_RUNNER_SANDBOX='none')
+    def test_runs_unsandboxed_when_explicitly_disabled(self):
+        status, out, err, returncode, elapsed = run_code('print(input()[::-1])', stdin='abc')
+        self.assertEqual((status, out.strip()), ('ok', 'cba'), err)
+
+    BUSY_LOOP = 'while True:\n    pass\n'
+
+    def assertBusyLoopTimesOut(self, limits):
+        status, out, err, returncode, elapsed = run_code(self.BUSY_LOOP, limits=limits)
+        self.assertEqual(status, 'timeout', (returncode, err))
+        self.assertLess(elapsed, limits.wall_seconds + 1)
+
+    @override_settings(CODE_RUNNER_SANDBOX='none')
+    def test_busy_loop_unsandboxed(self):
+        # حد المعالج (SIGXCPU) ثم حد الوقت الكلي (قتل من الخارج)
+        self.assertBusyLoopTimesOut(RunnerLimits(cpu_seconds=1, wall_seconds=3))
+        self.assertBusyLoopTimesOut(RunnerLimits(cpu_seconds=10, wall_seconds=1))
+
+    @override_settings(CODE_RUNNER_SANDBOX='nsjail')
+    def test_busy_loop_sandboxed_exit_codes(self):
+        # غلاف بنفس اصطلاح nsjail: يخرج بـ 128 + الإشارة التي أنهت العملية الداخلية
+        wrapper = ['sh', '-c', '"$@"; exit $?', 'nsjail']
+        with mock.patch('labs.runner._sandbox_command', return_value=wrapper), \
+                mock.patch('labs.runner.SANDBOX_DIR', '.'):
+            self.assertBusyLoopTimesOut(RunnerLimits(cpu_seconds=1, wall_seconds=3))
+            status, out, err, returncode, elapsed = run_code('raise SystemExit(3)')
+        self.assertEqual((status, returncode), ('error', 3))
+
+    @skipUnless(shutil.which('nsjail'), 'nsjail غير مثبت')
+    @override_settings(CODE_RUNNER_SANDBOX='nsjail')
+    def test_busy_loop_in_nsjail(self):
+        self.assertBusyLoopTimesOut(RunnerLimits(cpu_seconds=1, wall_seconds=3))
+        self.assertBusyLoopTimesOut(RunnerLimits(cpu_seconds=10, wall_seconds=1))
+
+
+# ========================
+# التقييم
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class GradingTests(LabsAPITestCase):
+
+    def test_submit_returns_pending_and_grades_after_commit(self):
+        challenge = Challenge.objects.create(
+            lab=self.lab, title='اختيار', description='وصف', answer_type='multiple_choice',
+            correct_answer='a, c', points=10, order=5,
+        )
+        # مستهلك الأحداث يُشغَّل يدوياً في الاختبارات
+        with mock.patch('labs.grading.dispatch_grading') as dispatch, \
+                mock.patch('labs.events.schedule_processing'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/challenges/{challenge.pk}/submit/', {'answer': 'C، A'})
+                # لا يُرسل إلى العامل قبل نجاح المعاملة
+                dispatch.assert_not_called()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['attempt']['status'], 'pending')
+        attempt_id = response.data['attempt']['id']
+        dispatch.assert_called_once_with(attempt_id)
+
+        self.assertEqual(grading.grade_attempt(attempt_id).status, 'correct')
+        submission = Submission.objects.get(user=self.user, challenge=challenge)
+        self.assertEqual((submission.status, submission.score), ('correct', 10))
+        # المحاولة المقيّمة لا تُقيّم مرة ثانية
+        self.assertIsNone(grading.grade_attempt(attempt_id))
+
+    def test_graders(self):
+        challenge = SimpleNamespace(points=5, correct_answer='a, b', expected_output='line\nend')
+        cases = [
+            ('flag', SimpleNamespace(answer=' a, b \n'), 'correct'),
+            ('text', SimpleNamespace(answer='b, a'), 'incorrect'),
+            ('multiple_choice', SimpleNamespace(answer='B،A'), 'correct'),
+            ('multiple_choice', SimpleNamespace(answer='a'), 'incorrect'),
+            ('code_output', SimpleNamespace(answer='line  \r\nend\n', code=''), 'correct'),
+            ('code_output', SimpleNamespace(answer='line', code=''), 'incorrect'),
+        ]
+        for answer_type, attempt, expected in cases:
+            result = grading.get_grader(answer_type)(attempt, challenge)
+            self.assertEqual(result.status, expected, (answer_type, attempt))
+            self.assertEqual(result.score, 5 if expected == 'correct' else 0)
+
+    def test_code_without_test_cases_waits_for_review(self):
+        challenge = Challenge.objects.create(
+            lab=self.lab, title='كود', description='وصف', answer_type='code', points=10, order=6,
+        )
+        attempt = submit_attempt(self.user, challenge, code='print(1)')
+
+        self.assertIsNone(grading.grade_attempt(attempt.pk))
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'pending')
+
+
+# ========================
+# سجل المحاولات
+# ========================
+
+class AttemptLogTests(LabsAPITestCase):
+
+    def test_is_improved_by_never_downgrades_a_correct_result(self):
+        solved = Submission(status='correct', score=10)
+        for status, _label in Submission.STATUS_CHOICES:
+            if status != 'correct':
+                self.assertFalse(solved.is_improved_by(status, 100), status)
+        self.assertFalse(solved.is_improved_by('correct', 10))
+
+        self.assertTrue(Submission(status='pending', score=0).is_improved_by('incorrect', 0))
+        partial = Submission(status='partial', score=5)
+        self.assertTrue(partial.is_improved_by('partial', 7))
+        self.assertTrue(partial.is_improved_by('correct', 5))
+        self.assertFalse(partial.is_improved_by('incorrect', 0))
+
+    def test_repeated_submits_keep_best_result_and_counters(self):
+        learner = User.objects.create_user('learner', password='password')
+        events.process_pending()
+        counters = Challenge.objects.values_list('attempts', 'solved_count').get(pk=self.challenge.pk)
+        attempts = [
+            submit_attempt(learner, self.challenge, answer=answer)
+            for answer in ('wrong', 'flag{ok}', 'again wrong', 'pending')
+        ]
+        # التقييم بترتيب مختلف عن الإرسال: الخاطئة بعد الصحيحة لا تلغيها
+        for attempt in (attempts[1], attempts[2], attempts[0]):
+            grading.grade_attempt(attempt.pk)
+
+        submission = Submission.objects.get(user=learner, challenge=self.challenge)
+        self.assertEqual(
+            (submission.status, submission.score, submission.answer), ('correct', 10, 'flag{ok}')
+        )
+        self.assertEqual(submission.attempt_count, 4)
+        self.assertEqual(submission.last_attempt_at, attempts[-1].submitted_at)
+        self.assertEqual(
+            list(submission.attempts.order_by('pk').values_list('status', flat=True)),
+            ['incorrect', 'correct', 'incorrect', 'pending'],
+        )
+        self.assertEqual(attempts[-1].submission.attempt_count, 4)
+
+        # عدادات التحدي: أربع محاولات وحل واحد فقط
+        events.process_pending()
+        self.assertEqual(
+            Challenge.objects.values_list('attempts', 'solved_count').get(pk=self.challenge.pk),
+            (counters[0] + 4, counters[1] + 1),
+        )
+
+
+# ========================
+# ترحيلات ملء البيانات
+# ========================
+
+def run_data_migration(name, function):
+    """تشغيل دالة RunPython من ترحيل على قاعدة الاختبار الحالية"""
+    migration = import_module(f'labs.migrations.{name}')
+    # الدوال تستخدم schema_editor.connection فقط؛ محرر SQLite لا يعمل داخل معاملة الاختبار
+    getattr(migration, function)(apps, SimpleNamespace(connection=connection))
+
+
+class BackfillMigrationTests(LabsAPITestCase):
+
+    def test_challenge_counters_backfill(self):
+        Challenge.objects.update(attempts=0, solved_count=0, success_rate=0)
+        Submission.objects.filter(challenge=self.challenge).update(status='incorrect')
+
+        run_data_migration('0002_backfill_challenge_counters', 'backfill_challenge_counters')
+
+        self.challenge.refresh_from_db()
+        self.assertEqual((self.challenge.attempts, self.challenge.solved_count), (1, 0))
+        solved = self.lab.challenges.exclude(pk=self.challenge.pk).first()
+        self.assertEqual((solved.attempts, solved.solved_count, solved.success_rate), (1, 1, 100.0))
+
+    def test_challenge_total_backfill(self):
+        Lab.objects.update(challenge_total=0)
+
+        run_data_migration('0003_backfill_challenge_total', 'backfill_challenge_total')
+
+        self.assertEqual(set(Lab.objects.values_list('challenge_total', flat=True)), {3})
+
+    def test_submission_attempts_backfill(self):
+        submitted_at = timezone.now() - timedelta(days=30)
+        Submission.objects.update(submitted_at=submitted_at)
+
+        run_data_migration('0004_backfill_submission_attempts', 'backfill_submission_attempts')
+
+        for submission in Submission.objects.prefetch_related('attempts'):
+            attempts = list(submission.attempts.all())
+            self.assertEqual(len(attempts), 1)
+            self.assertEqual((submission.attempt_count, submission.last_attempt_at), (1, submitted_at))
+            self.assertEqual(
+                (attempts[0].submitted_at, attempts[0].status, attempts[0].score),
+                (submitted_at, submission.status, submission.score),
+            )
+
+        # تشغيل الترحيل مرة ثانية لا يكرر المحاولات
+        run_data_migration('0004_backfill_submission_attempts', 'backfill_submission_attempts')
+        self.assertEqual(SubmissionAttempt.objects.count(), Submission.objects.count())
+
+
+# ========================
+# العدادات المشتقة
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ViewCounterTests(LabsAPITestCase):
+
+    def test_stale_full_save_keeps_counters(self):
+        stale = Lab.objects.get(pk=self.lab.pk)
+        for _ in range(3):
+            self.assertEqual(self.client.get(f'/api/labs/{self.lab.pk}/').status_code, 200)
+        flush_views()
+        Lab.objects.filter(pk=self.lab.pk).update(completions=F('completions') + 2)
+
+        stale.title = 'عنوان جديد'
+        stale.save()
+
+        self.lab.refresh_from_db()
+        self.assertEqual((self.lab.title, self.lab.views, self.lab.completions), ('عنوان جديد', 3, 2))
+
+
+class ChallengeTotalTests(LabsAPITestCase):
+
+    def test_moving_a_challenge_moves_the_count(self):
+        other = self.labs[1]
+        self.challenge.lab = other
+        self.challenge.order = 10
+        self.challenge.save()
+
+        self.lab.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.lab.challenge_total, other.challenge_total), (2, 4))
+
+
+class ProgressTests(LabsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.learner = User.objects.create_user('learner', password='password')
+
+    def learner_progress(self):
+        return UserLabProgress.objects.get(user=self.learner, lab=self.lab)
+
+    def progress_events(self):
+        return list(DomainEvent.objects.filter(
+            event_type__in=[events.PROGRESS_STARTED, events.PROGRESS_COMPLETED],
+            payload__user_id=self.learner.pk,
+        ).order_by('id').values_list('event_type', flat=True))
+
+    def test_record_solved_completes_at_last_challenge(self):
+        challenges = list(self.lab.challenges.order_by('order'))
+        for count, challenge in enumerate(challenges, 1):
+            UserLabProgress.record_solved(self.learner.pk, self.lab.pk, challenge.pk, score=10)
+            progress = self.learner_progress()
+            self.assertEqual(progress.completed_challenges_count, count)
+            self.assertAlmostEqual(progress.completion_percentage, count * 100 / len(challenges))
+            self.assertEqual(progress.is_completed, count == len(challenges))
+
+        self.assertTrue(progress.is_started)
+        self.assertIsNotNone(progress.completed_at)
+        self.assertEqual(progress.total_score, 30)
+        self.assertEqual(self.progress_events(), [events.PROGRESS_STARTED, events.PROGRESS_COMPLETED])
+
+        # حل نفس التحدي مرة أخرى لا يغير شيئاً
+        UserLabProgress.record_solved(self.learner.pk, self.lab.pk, challenges[0].pk, score=10)
+        progress = self.learner_progress()
+        self.assertEqual((progress.completed_challenges_count, progress.total_score), (3, 30))
+        self.assertEqual(len(self.progress_events()), 2)
+
+    def test_grading_updates_progress_only_for_first_correct_attempt(self):
+        for answer in ('wrong', 'flag{ok}', 'flag{ok}'):
+            grading.grade_attempt(submit_attempt(self.learner, self.challenge, answer=answer).pk)
+
+        progress = self.learner_progress()
+        self.assertEqual((progress.completed_challenges_count, progress.total_score), (1, 10))
+        self.assertEqual(list(progress.completed_challenges.all()), [self.challenge])
+        self.assertFalse(progress.is_completed)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class DashboardTests(LabsAPITestCase):
+
+    def test_submissions_without_attempts_come_last(self):
+        Submission.objects.update(last_attempt_at=None)
+        Submission.objects.filter(pk=self.submission.pk).update(last_attempt_at=timezone.now())
+
+        response = self.client.get('/api/profile/dashboard/')
+
+        recent = response.data['recent_submissions']
+        self.assertEqual(recent[0]['id'], self.submission.pk)
+        self.assertEqual(recent[-1]['last_attempt_at'], None)
+
+    def test_numbers(self):
+        UserLabProgress.objects.filter(pk=self.progress.pk).update(
+            is_completed=True, total_score=30, total_time_spent=120
+        )
+        Submission.objects.filter(pk=self.submission.pk).update(
+            status='pending', is_correct=False, score=0, attempt_count=2
+        )
+        Lab.objects.filter(pk=self.labs[2].pk).update(category='cryptography')
+
+        data = self.client.get('/api/profile/dashboard/').data
+
+        self.assertEqual(data['progress'], {
+            'started_labs': 3, 'completed_labs': 1, 'completion_rate': 33.33,
+            'total_points': 30, 'time_spent': 120,
+        })
+        self.assertEqual(data['submissions'], {
+            'total': 9, 'attempts': 2, 'pending': 1, 'correct': 8,
+            'accuracy_rate': 100.0, 'total_score': 80,
+        })
+        categories = {item['category']: item for item in data['categories']}
+        self.assertEqual(
+            [(item['started'], item['completed'], item['points'], item['completion_rate'])
+             for item in (categories['web_security'], categories['cryptography'])],
+            [(2, 1, 30, 50.0), (1, 0, 0, 0)],
+        )
+        self.assertEqual(categories['network_security']['started'], 0)
+        self.assertEqual(len(data['recent_labs']), 3)
+
+    def test_cache_invalidated_on_submit(self):
+        challenge = Challenge.objects.create(
+            lab=self.lab, title='جديد', description='وصف', answer_type='flag',
+            correct_answer='flag{ok}', points=10, order=5,
+        )
+        before = self.client.get('/api/profile/dashboard/').data['submissions']
+        # تغيير مباشر في قاعدة البيانات لا يظهر: القيمة من الذاكرة المؤقتة
+        Submission.objects.filter(pk=self.submission.pk).update(score=0)
+        self.assertEqual(self.client.get('/api/profile/dashboard/').data['submissions'], before)
+
+        with mock.patch('labs.grading.dispatch_grading'), mock.patch('labs.events.schedule_processing'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/challenges/{challenge.pk}/submit/', {'answer': 'x'})
+        self.assertEqual(response.status_code, 202)
+
+        after = self.client.get('/api/profile/dashboard/').data['submissions']
+        self.assertEqual(
+            (after['total'], after['attempts'], after['pending'], after['total_score']),
+            (before['total'] + 1, before['attempts'] + 1, before['pending'] + 1, before['total_score'] - 10),
+        )
+        self.assertEqual(
+            self.client.get('/api/profile/dashboard/').data['recent_submissions'][0]['challenge_id'],
+            challenge.pk,
+        )
+
+
+# ========================
+# البحث النصي
+# ========================
+
+class SearchIndexTests(LabsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # جدول FTS5 يُحذف مع التراجع عن معاملة الاختبار؛ الحالة المخزنة كذلك
+        self.addCleanup(search._fts_ready.clear)
+
+    def test_index_and_query_use_the_queryset_database(self):
+        search.ensure_index()
+        Lab.objects.create(title='تحليل البرمجيات الخبيثة', slug='malware', description='وصف')
+
+        found = search.search(Lab.objects.all(), 'البرمجيات الخبيثه')
+        self.assertEqual([lab.slug for lab in found], ['malware'])
+        self.assertIn(found.db, search._fts_ready)
+
+    @override_settings(SECURE_SSL_REDIRECT=False)
+    def test_search_and_facets_endpoints(self):
+        search.ensure_index()
+        Lab.objects.create(title='تحليل البرمجيات الخبيثة', slug='malware', description='وصف',
+                           category='malware_analysis')
+
+        response = self.client.get('/api/labs/', {'search': 'الخبيثه'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([lab['slug'] for lab in response.data['results']], ['malware'])
+
+        response = self.client.get('/api/labs/facets/', {'search': 'الخبيثه'})
+        self.assertEqual(response.status_code, 200)
+
+
+# ========================
+# الفلاتر والـ facets
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PremiumFilterTests(LabsAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Lab.objects.create(title='مميز', slug='premium', description='وصف',
+                           category='cryptography', is_premium=True)
+
+    def test_facets_count_premium_labs_for_staff(self):
+        self.client.force_authenticate(self.staff)
+        facets = self.client.get('/api/labs/facets/').data
+        self.assertEqual(facets['total'], 4)
+        premium = {item['value']: item['count'] for item in facets['is_premium']}
+        self.assertEqual(premium, {False: 3, True: 1})
+
+    def test_search_without_is_premium_keeps_premium_labs_for_staff(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/labs/search/')
+        self.assertEqual(response.data['count'], 4)
+
+        response = self.client.get('/api/labs/search/', {'is_premium': 'true'})
+        self.assertEqual([lab['slug'] for lab in response.data['results']], ['premium'])
+
+    def test_regular_users_never_see_premium_labs(self):
+        response = self.client.get('/api/labs/search/', {'is_premium': 'true'})
+        self.assertEqual(response.data['count'], 0)
+        facets = self.client.get('/api/labs/facets/').data
+        self.assertEqual(facets['total'], 3)
+
+
+# ========================
+# الإحصائيات
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatisticsTests(LabsAPITestCase):
+
+    def test_statistics_validated_by_content_etag_only(self):
+        response = self.client.get('/api/labs/statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get('/api/labs/statistics/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def snapshot(self):
+        stats = LabStatistics.objects.order_by('lab_id').values(
+            'lab_id', 'total_submissions', 'graded_submissions', 'correct_submissions', 'score_sum',
+            'total_starts', 'total_completions', 'completion_time_sum', 'rating_sum', 'rating_count',
+            'success_rate', 'average_score', 'completion_rate', 'dropout_rate',
+            'average_completion_time', 'average_rating',
+        )
+        labs = Lab.objects.order_by('pk').values('pk', 'completions', 'average_score', 'challenge_total')
+        return list(stats), list(labs)
+
+    def test_incremental_updates_match_rebuild(self):
+        events.process_pending()
+        lab_statistics.rebuild()
+        learner = User.objects.create_user('learner', password='password')
+        reviewer = User.objects.create_user('reviewer', password='password')
+
+        # يحل كل تحديات المعمل الأول (بدء ثم إكمال)، ومحاولات خاطئة في الثاني
+        for challenge in self.lab.challenges.all():
+            grading.grade_attempt(submit_attempt(learner, challenge, answer='flag{ok}').pk)
+        other = self.labs[1].challenges.first()
+        for answer in ('x', 'y'):
+            grading.grade_attempt(submit_attempt(learner, other, answer=answer).pk)
+        submit_attempt(reviewer, other, answer='flag{ok}')  # لم تُقيّم بعد
+
+        LabReview.objects.create(user=learner, lab=self.labs[1], rating=4, difficulty_rating=3,
+                                 content_quality=4, usefulness=5)
+        review = LabReview.objects.create(user=reviewer, lab=self.labs[1], rating=2,
+                                          difficulty_rating=3, content_quality=4, usefulness=5)
+        review.rating = 5
+        review.save()
+
+        events.process_pending()
+        incremental = self.snapshot()
+        stats = {row['lab_id']: row for row in incremental[0]}
+        self.assertEqual(
+            (stats[self.lab.pk]['correct_submissions'], stats[self.lab.pk]['total_completions']), (3, 1)
+        )
+        self.assertEqual(
+            (stats[other.lab_id]['total_submissions'], stats[other.lab_id]['graded_submissions']), (3, 2)
+        )
+        self.assertEqual(stats[other.lab_id]['average_rating'], 4.5)
+
+        lab_statistics.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+
+# ========================
+# صندوق الأحداث
+# ========================
+
+class ReviewEventTests(LabsAPITestCase):
+
+    def review_events(self):
+        return [
+            (event.payload['lab_id'], event.payload['rating_delta'], event.payload['count_delta'])
+            for event in DomainEvent.objects.filter(event_type=events.REVIEW_CHANGED).order_by('id')
+        ]
+
+    def test_review_save_emits_rating_delta(self):
+        review = LabReview.objects.create(
+            user=self.user, lab=self.lab, rating=4,
+            difficulty_rating=3, content_quality=4, usefulness=5,
+        )
+        review.rating = 2
+        review.save()
+        review.is_approved = False
+        review.save()
+
+        self.assertEqual(self.review_events(), [
+            (self.lab.pk, 4, 1),
+            (self.lab.pk, -4, -1), (self.lab.pk, 2, 1),
+            (self.lab.pk, -2, -1),
+        ])
+
+    def test_prune_removes_only_old_processed_events(self):
+        old = timezone.now() - timedelta(days=30)
+        processed = DomainEvent.objects.create(event_type='test', processed_at=old)
+        pending = DomainEvent.objects.create(event_type='test')
+        recent = DomainEvent.objects.create(event_type='test', processed_at=timezone.now())
+
+        self.assertEqual(events.prune_processed(retention=60 * 60 * 24), 1)
+        remaining = set(DomainEvent.objects.values_list('pk', flat=True))
+        self.assertNotIn(processed.pk, remaining)
+        self.assertTrue({pending.pk, recent.pk} <= remaining)
+
+
+# ========================
+# الطلبات الشرطية
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalTests(LabsAPITestCase):
+
+    def test_challenge_etag_changes_with_parent_lab(self):
+        url = f'/api/challenges/{self.challenge.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.lab.title = 'عنوان جديد'
+        self.lab.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['lab_title'], 'عنوان جديد')
+
+    def test_list_not_modified_since_after_delete(self):
+        for url in ('/api/labs/', f'/api/labs/{self.lab.pk}/challenges/'):
+            response = self.client.get(url)
+            self.assertNotIn('Last-Modified', response)
+            etag = response['ETag']
+
+            since = http_date(timezone.now().timestamp() + 60)
+            Challenge.objects.filter(lab=self.lab).order_by('updated_at').first().delete()
+            Lab.objects.filter(pk=self.labs[2].pk).delete()
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, 200, url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_retrieve_keeps_last_modified(self):
+        url = f'/api/challenges/{self.challenge.pk}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+# ========================
+# المسار السريع
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FastPathTests(LabsAPITestCase):
+
+    def test_fast_path_matches_serializer_output(self):
+        for url in ('/api/labs/', f'/api/labs/{self.lab.pk}/', '/api/challenges/'):
+            with override_settings(FAST_SERIALIZATION=False):
+                cache.clear()
+                expected = self.client.get(url).json()
+            with override_settings(FAST_SERIALIZATION=True):
+                cache.clear()
+                actual = self.client.get(url).json()
+            self.assertEqual(actual, expected, url)
+
+
+# ========================
+# الحقول المختارة
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False, FAST_SERIALIZATION=False)
+class SparseFieldsTests(LabsAPITestCase):
+
+    def get_with_columns(self, url, table):
+        """الاستجابة وأعمدة أول SELECT على الجدول (عدا COUNT)"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if f'FROM "{table}"' in query['sql'] and 'COUNT(' not in query['sql']
+        )
+        selected = sql[len('SELECT '):sql.index(' FROM ')]
+        return response, set(re.findall(rf'"{table}"\."(\w+)"', selected))
+
+    def rows(self, response):
+        return response.data['results'] if isinstance(response.data, dict) else response.data
+
+    def test_fields_limit_keys_and_columns(self):
+        response, columns = self.get_with_columns(
+            '/api/labs/?fields=id,title,category_display,completion_rate', 'labs_lab'
+        )
+        for row in self.rows(response):
+            self.assertEqual(set(row), {'id', 'title', 'category_display', 'completion_rate'})
+        self.assertEqual(columns, {'id', 'title', 'category', 'views', 'completions'})
+
+        response, columns = self.get_with_columns(
+            '/api/challenges/?fields=id,lab_title,level_display', 'labs_challenge'
+        )
+        for row in self.rows(response):
+            self.assertEqual(set(row), {'id', 'lab_title', 'level_display'})
+        self.assertEqual(columns, {'id', 'lab_id', 'level'})
+
+    def test_default_list_uses_compact_serializer(self):
+        response, columns = self.get_with_columns('/api/labs/', 'labs_lab')
+        row = self.rows(response)[0]
+        self.assertEqual(set(row), set(LabListSerializer.Meta.fields))
+        self.assertNotIn('description', columns)
+        self.assertNotIn('overview', columns)
+
+        challenge = self.rows(self.client.get('/api/challenges/'))[0]
+        self.assertEqual(set(challenge), set(ChallengeListSerializer.Meta.fields))
+        detail = self.client.get(f'/api/challenges/{self.challenge.pk}/').data
+        self.assertTrue({'correct_answer', 'correct_code', 'test_cases'}.isdisjoint(detail))
+
+    def test_expand_loads_full_rows(self):
+        response, columns = self.get_with_columns(
+            '/api/challenges/?fields=id,lab&expand=lab', 'labs_challenge'
+        )
+        row = self.rows(response)[0]
+        self.assertEqual(set(row), {'id', 'lab'})
+        self.assertEqual(set(row['lab']), set(LabListSerializer.Meta.fields))
+        self.assertIn('description', columns)
+
+
+# ========================
+# تخزين الاستجابات
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False, ALLOWED_HOSTS=['*'])
+class ResponseCacheTests(LabsAPITestCase):
+
+    def test_cached_per_host(self):
+        first = self.client.get('/api/labs/', HTTP_HOST='a.example')
+        again = self.client.get('/api/labs/', HTTP_HOST='a.example')
+        other = self.client.get('/api/labs/', HTTP_HOST='b.example')
+
+        self.assertEqual((first['X-Cache'], again['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(other['X-Cache'], 'MISS')
+
+    def test_evicted_version_does_not_revive_stale_entries(self):
+        self.assertEqual(self.client.get('/api/labs/')['X-Cache'], 'MISS')
+        self.lab.title = 'عنوان جديد'
+        self.lab.save()
+        # الذاكرة الممتلئة حذفت رقم الإصدار وبقيت الاستجابة القديمة
+        cache.delete(_version_key(LABS_NAMESPACE))
+
+        response = self.client.get('/api/labs/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('عنوان جديد', [lab['title'] for lab in response.data['results']])
+
+
+class ReplicaCacheFillTests(SimpleTestCase):
+    """ملء الذاكرة المؤقتة من الرئيسية حتى داخل إجراء يقرأ من النسخ"""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('cyberlabs.db_router.replica_aliases', return_value=['replica_0'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cache_miss_is_built_from_primary(self):
+        view = ResponseCacheMixin()
+        view.action, view.cached_actions = 'list', ('list',)
+        request = Request(APIRequestFactory().get('/api/labs/'))
+        request.user = AnonymousUser()
+        aliases = []
+
+        def build():
+            aliases.append(router.db_for_read(Lab))
+            return Response({'results': []})
+
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Lab), 'replica_0')
+            view.cached_response(request, build)
+            response = view.cached_response(request, build)
+
+        self.assertEqual(aliases, ['default'])
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+
+# ========================
+# التصدير
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExportTests(LabsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.staff)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+    def test_csv_export(self):
+        response = self.client.get('/api/exports/submissions/')
+
+        self.assertEqual(response.status_code, 200)
+        lines = self.read(response)
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'user_id'])
+        self.assertEqual(len(lines), 1 + Submission.objects.count())
+
+    def test_gzip_ndjson_export(self):
+        response = self.client.get(f'/api/exports/submissions/?output=ndjson&gzip=1&lab_id={self.lab.pk}')
+
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [json.loads(line) for line in zlib.decompress(b''.join(response.streaming_content), 31).splitlines()]
+        self.assertEqual({row['lab_id'] for row in rows}, {self.lab.pk})
+        self.assertEqual(len(rows), 3)
+
+    @override_settings(EXPORT_API_MAX_ROWS=5)
+    def test_row_cap(self):
+        response = self.client.get('/api/exports/submissions/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('export_data', response.data['detail'])
+
+        # المرشحات تعيد التصدير تحت الحد
+        response = self.client.get(f'/api/exports/submissions/?lab_id={self.lab.pk}')
+        self.assertEqual(len(self.read(response)), 1 + 3)
+
+    def test_students_cannot_export(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/exports/submissions/').status_code, 403)
+
+
+# ========================
+# استيراد المعامل
+# ========================
+
+def lab_package(**overrides):
+    """ملف zip فيه حزمة معمل واحدة مع دليل PDF"""
+    manifest = {
+        'slug': 'imported-lab', 'title': 'معمل مستورد', 'description': 'وصف',
+        'category': 'web_security', 'difficulty': 'beginner', 'guide': 'guide.pdf',
+        'challenges': [
+            {'order': 1, 'title': 'تحدي', 'description': 'وصف', 'answer_type': 'flag',
+             'correct_answer': 'flag{ok}'},
+        ],
+        **overrides,
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('imported-lab/lab.json', json.dumps(manifest))
+        archive.writestr('imported-lab/guide.pdf', b'%PDF-1.4 guide')
+    buffer.seek(0)
+    buffer.name = 'labs.zip'
+    return buffer
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ImportTests(LabsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def stored_files(self):
+        return [name for _root, _dirs, files in os.walk(self.media_root) for name in files]
+
+    def test_api_import_validates_in_process(self):
+        self.client.force_authenticate(self.staff)
+        with mock.patch('labs.importer.validate_packages', wraps=importer.validate_packages) as validate:
+            response = self.client.post('/api/labs/import/', {'package': lab_package()}, format='multipart')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(validate.call_args.kwargs['workers'], 1)
+        lab = Lab.objects.get(slug='imported-lab')
+        self.assertEqual((lab.challenge_total, lab.challenges.count()), (1, 1))
+        self.assertTrue(lab.lab_guide.name.startswith('labs/guides/imported-lab-guide-'))
+
+    def test_field_types_and_lengths(self):
+        report = importer.import_labs(lab_package(title='x' * 201, points='10', description=['وصف']))
+
+        errors = report.errors['imported-lab']
+        self.assertEqual(len(errors), 3, errors)
+        self.assertFalse(Lab.objects.filter(slug='imported-lab').exists())
+
+        report = importer.import_labs(lab_package(slug=7, challenges={'order': 1}))
+        self.assertEqual(len(report.errors['imported-lab']), 2)
+
+    def test_rollback_removes_written_files(self):
+        with mock.patch('labs.lab_statistics.rebuild', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                importer.import_labs(lab_package())
+
+        self.assertFalse(Lab.objects.filter(slug='imported-lab').exists())
+        self.assertEqual(self.stored_files(), [])
+
+        importer.import_labs(lab_package())
+        self.assertEqual(len(self.stored_files()), 1)
+
+
+# ========================
+# الصور المصغرة
+# ========================
+
+class ThumbnailSchedulingTests(LabsAPITestCase):
+
+    @override_settings(THUMBNAIL_BACKEND='celery')
+    def test_lock_is_held_until_the_job_finishes(self):
+        key = images.LOCK_KEY.format(self.lab.pk)
+        with mock.patch('labs.tasks.generate_thumbnail_variants_task.delay') as delay:
+            self.assertTrue(images.request_variants(self.lab.pk))
+            # المهمة ما زالت في الطابور: لا جدولة ثانية
+            self.assertFalse(images.request_variants(self.lab.pk))
+        delay.assert_called_once_with(self.lab.pk)
+
+        def generate(lab_id):
+            self.assertEqual(cache.get(key), 1)
+
+        with mock.patch('labs.images.generate_variants', side_effect=generate):
+            images.generate_and_unlock(self.lab.pk)
+        self.assertIsNone(cache.get(key))
+
+    @override_settings(THUMBNAIL_BACKEND='thread', THUMBNAIL_INVALIDATE_DELAY=5)
+    def test_invalidations_are_batched(self):
+        with mock.patch('labs.images.threading.Timer') as timer, \
+                mock.patch('labs.images.invalidate_labs') as invalidate:
+            scheduled = [images.schedule_invalidation() for _lab in self.labs]
+            self.assertEqual(scheduled, [True, False, False])
+            timer.assert_called_once_with(5, images._flush_in_thread)
+            invalidate.assert_not_called()
+
+            images.flush_invalidation()
+            invalidate.assert_called_once_with()
+            # دفعة جديدة بعد الإبطال
+            self.assertTrue(images.schedule_invalidation())
+
+    @override_settings(THUMBNAIL_INVALIDATE_DELAY=0)
+    def test_invalidation_without_delay(self):
+        with mock.patch('labs.images.invalidate_labs') as invalidate:
+            self.assertFalse(images.schedule_invalidation())
+        invalidate.assert_called_once_with()
+
+
+# ========================
+# الرفع على أجزاء
+# ========================
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UploadTests(LabsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(
+            MEDIA_ROOT=media.name, UPLOAD_TEMP_DIR=os.path.join(media.name, 'tmp')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create(self, size, filename='report.PDF'):
+        return self.client.post('/api/uploads/', {'filename': filename, 'size': size}, format='json')
+
+    def send(self, session_id, offset, data, checksum=None):
+        headers = {'HTTP_UPLOAD_OFFSET': str(offset)}
+        if checksum:
+            headers['HTTP_UPLOAD_CHECKSUM'] = f'sha256 {checksum}'
+        return self.client.generic(
+            'PATCH', f'/api/uploads/{session_id}/', data, content_type='application/octet-stream', **headers
+        )
+
+    def upload(self, content, filename='report.PDF'):
+        session_id = self.create(len(content), filename).data['id']
+        self.send(session_id, 0, content)
+        return self.client.post(f'/api/uploads/{session_id}/complete/')
+
+    def blob_files(self):
+        return [
+            name for _root, _dirs, files in os.walk(os.path.join(self.media_root, 'blobs')) for name in files
+        ]
+
+    def test_chunks_offsets_and_dedup(self):
+        content = b'0123456789'
+        sha256 = hashlib.sha256(content).hexdigest()
+        session_id = self.create(len(content)).data['id']
+
+        response = self.send(session_id, 0, content[:4])
+        self.assertEqual(response['Upload-Offset'], '4')
+        # إزاحة قديمة (إعادة إرسال) ترفض وتعيد الإزاحة الصحيحة
+        response = self.send(session_id, 0, content[:4])
+        self.assertEqual((response.status_code, response['Upload-Offset']), (409, '4'))
+        # بصمة خاطئة: الجزء يُتجاهل ويبقى الاستئناف من نفس الإزاحة
+        response = self.send(session_id, 4, content[4:], checksum='0' * 64)
+        self.assertEqual((response.status_code, response['Upload-Offset']), (400, '4'))
+        response = self.send(session_id, 4, content[4:], checksum=hashlib.sha256(content[4:]).hexdigest())
+        self.assertEqual(response['Upload-Offset'], '10')
+
+        response = self.client.post(f'/api/uploads/{session_id}/complete/')
+        self.assertEqual(response.data['sha256'], sha256)
+        blob = Blob.objects.get(sha256=sha256)
+        self.assertEqual(blob.file.name, f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf')
+
+        # نفس المحتوى مرة ثانية يشير إلى نفس الملف
+        self.assertEqual(self.upload(content, 'copy.pdf').data['sha256'], sha256)
+        self.assertEqual(Blob.objects.count(), 1)
+        self.assertEqual(self.blob_files(), [f'{sha256}.pdf'])
+
+    def test_concurrent_completion_removes_the_losing_file(self):
+        content = b'same content'
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.upload(content)
+        winner = Blob.objects.get()
+        path = os.path.join(self.media_root, 'tmp', 'race.part')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+
+        # الطلب الآخر لم يجد الـ Blob ولا الملف عند التحقق، ثم سبقه الأول إلى الإنشاء
+        # (استدعاءا exists الأولان في _store_blob يريان التخزين فارغاً)
+        storage = Blob._meta.get_field('file').storage
+        exists = storage.exists
+        checks = [False, False]
+
+        def racing_exists(name):
+            return checks.pop() if checks else exists(name)
+
+        with mock.patch.object(Blob.objects, 'filter', return_value=Blob.objects.none()), \
+                mock.patch.object(storage, 'exists', side_effect=racing_exists):
+            blob = uploads._store_blob(path, sha256, len(content), 'report.pdf')
+
+        self.assertEqual(blob.pk, winner.pk)
+        self.assertEqual(self.blob_files(), [os.path.basename(winner.file.name)])
+
+    def test_same_offset_race_without_cache_lock(self):
+        session = uploads.create_session(self.user, 'race.bin', 8)
+        # عاملان قرأا الجلسة عند received=0، والقفل لا يُرى بينهما (ذاكرة محلية)
+        other = UploadSession.objects.get(pk=session.pk)
+        with mock.patch.object(uploads, '_session_lock'), \
+                mock.patch.object(other, 'refresh_from_db'):
+            self.assertEqual(uploads.append_chunk(session, 0, 4, io.BytesIO(b'aaaa')), 4)
+            with self.assertRaises(uploads.UploadConflict):
+                uploads.append_chunk(other, 0, 4, io.BytesIO(b'bbbb'))
+
+        session.refresh_from_db()
+        self.assertEqual(session.received, 4)
+        with open(uploads.temp_path(session), 'rb') as handle:
+            self.assertEqual(handle.read(), b'aaaa')
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'tmp')), [f'{session.pk}.part'])
+
+    def test_local_lock_cache_warns(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                              'LOCATION': 'redis://localhost:6379/0'}}
+        with override_settings(DEBUG=False, CACHES=local):
+            self.assertEqual([message.id for message in check_upload_lock_cache(None)], ['labs.W001'])
+        with override_settings(DEBUG=False, CACHES=shared):
+            self.assertEqual(check_upload_lock_cache(None), [])
+
+    @override_settings(UPLOAD_MAX_ACTIVE_SESSIONS=2, UPLOAD_MAX_RESERVED_BYTES=100)
+    def test_quota(self):
+        self.assertEqual(self.create(200).status_code, 400)
+        first = self.create(60).data['id']
+        self.assertEqual(self.create(60).status_code, 429)
+        self.assertEqual(self.create(20).status_code, 201)
+        self.assertEqual(self.create(10).status_code, 429)
+
+        # إلغاء جلسة يحرر حصتها
+        self.assertEqual(self.client.delete(f'/api/uploads/{first}/').status_code, 204)
+        self.assertEqual(self.create(60).status_code, 201)
@@ -0,0 +1,334 @@
+# labs/uploads.py
+"""
+رفع الملفات الكبيرة على أجزاء مع الاستئناف والتخزين بحسب المحتوى
+
+1. إنشاء جلسة (UploadSession) بالاسم والحجم الكلي، ضمن حصة المستخدم: عدد
+   الجلسات الجارية (UPLOAD_MAX_ACTIVE_SESSIONS) ومجموع أحجامها المحجوزة على
+   القرص (UPLOAD_MAX_RESERVED_BYTES).
+2. إرسال الأجزاء بالترتيب: PATCH مع ترويسة Upload-Offset وجسم خام. الجزء
+   يُنسخ من الطلب إلى ملف مؤقت على القرص على دفعات صغيرة (لا يُحمّل الطلب
+   كاملاً في الذاكرة)، ويمكن التحقق من بصمته أثناء النسخ عبر ترويسة
+   Upload-Checksum: sha256 <hex>. لا يُلحق الجزء بملف الجلسة إلا بعد تحديث
+   received بشرط أن يساوي الإزاحة، فإذا أرسل طلبان نفس الإزاحة يُقبل أحدهما فقط.
+   إذا انقطع الاتصال يبقى الملف عند آخر إزاحة مؤكدة، ويستأنف العميل من الإزاحة
+   التي يعيدها GET.
+3. الإكمال: حساب SHA-256 للملف كاملاً ثم البحث عن Blob بنفس البصمة؛ إن وُجد
+   يُحذف الملف المؤقت، وإلا يُنقل إلى blobs/ab/cd/<sha256><الامتداد> (امتداد
+   اسم الملف يبقى ليُقدَّم الملف بنوع المحتوى الصحيح). فالملف الذي يرفعه 500
+   طالب يُخزن مرة واحدة، وإذا تسابق طلبان على نفس المحتوى يُحذف ملف الخاسر.
+
+لا يُستخدم إلا بعد التحقق من المحتوى: إعلان العميل للبصمة وحده لا يكفي للإشارة
+إلى Blob موجود، وإلا أمكن الوصول إلى ملفات الآخرين بمعرفة بصمتها.
+"""
+import glob
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Blob, UploadSession
+
+COPY_BUFFER = 64 * 1024
+LOCK_KEY = 'upload-session-lock:{}'
+LOCK_TTL = 60 * 10
+EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+
+
+class UploadError(ValueError):
+    """طلب رفع غير صالح"""
+
+
+class UploadConflict(UploadError):
+    """إزاحة غير متوقعة أو جلسة مشغولة بطلب آخر"""
+
+
+class UploadQuotaExceeded(UploadError):
+    """تجاوز حصة المستخدم من الجلسات الجارية؛ يمكن المحاولة بعد إكمال جلسة أو إلغائها"""
+
+
+def max_upload_size():
+    return getattr(settings, 'UPLOAD_MAX_SIZE', 4 * 1024 ** 3)
+
+
+def max_chunk_size():
+    return getattr(settings, 'UPLOAD_CHUNK_MAX_SIZE', 16 * 1024 ** 2)
+
+
+def session_ttl():
+    return getattr(settings, 'UPLOAD_SESSION_TTL', 60 * 60 * 24)
+
+
+def max_active_sessions():
+    return getattr(settings, 'UPLOAD_MAX_ACTIVE_SESSIONS', 5)
+
+
+def max_reserved_bytes():
+    return getattr(settings, 'UPLOAD_MAX_RESERVED_BYTES', 8 * 1024 ** 3)
+
+
+def temp_path(session):
+    directory = getattr(settings, 'UPLOAD_TEMP_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads', 'tmp'))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{session.pk}.part')
+
+
+def blob_name(sha256, filename=''):
+    """blobs/ab/cd/<sha256><الامتداد>؛ الامتداد من اسم الملف بعد التحقق منه"""
+    extension = os.path.splitext(filename)[1].lower()
+    if not EXTENSION_RE.match(extension):
+        extension = ''
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{extension}'
+
+
+def lock_cache():
+    """ذاكرة أقفال الجلسات؛ يجب أن تكون مشتركة بين العمليات (انظر labs/checks.py)"""
+    return caches[getattr(settings, 'UPLOAD_LOCK_CACHE', 'default')]
+
+
+class _session_lock:
+    """
+    رفض مبكر لطلب ثانٍ على نفس الجلسة قبل نسخ جسمه. الضمان الفعلي هو التحديث
+    المشروط لـ received و status، فالقفل غير الذري أو المحلي لا يفسد الملف.
+    """
+
+    def __init__(self, session):
+        self.key = LOCK_KEY.format(session.pk)
+        self.cache = lock_cache()
+
+    def __enter__(self):
+        if not self.cache.add(self.key, 1, LOCK_TTL):
+            raise UploadConflict('طلب آخر يكتب في هذه الجلسة حالياً')
+
+    def __exit__(self, *exc_info):
+        self.cache.delete(self.key)
+
+
+# ========================
+# الجلسات والأجزاء
+# ========================
+
+def active_sessions(user):
+    """جلسات المستخدم الجارية التي لم تتجاوز مدة الخمول (المتروكة تنتظر expire_sessions)"""
+    cutoff = timezone.now() - timedelta(seconds=session_ttl())
+    return UploadSession.objects.filter(user=user, status='active', updated_at__gte=cutoff)
+
+
+def create_session(user, filename, size):
+    if size <= 0:
+        raise UploadError('حجم الملف يجب أن يكون أكبر من صفر')
+    if size > max_upload_size():
+        raise UploadError(f'الحد الأقصى لحجم الملف {max_upload_size()} بايت')
+    if size > max_reserved_bytes():
+        raise UploadError(f'الحد الأقصى للمساحة المحجوزة {max_reserved_bytes()} بايت')
+
+    with transaction.atomic():
+        # قفل صف المستخدم يمنع طلبين متزامنين من تجاوز الحصة معاً
+        get_user_model().objects.select_for_update().filter(pk=user.pk).exists()
+        totals = active_sessions(user).aggregate(count=Count('pk'), reserved=Sum('size'))
+        if totals['count'] >= max_active_sessions():
+            raise UploadQuotaExceeded(
+                f'لديك {totals["count"]} جلسات رفع جارية؛ أكملها أو ألغها قبل بدء جلسة جديدة'
+            )
+        if (totals['reserved'] or 0) + size > max_reserved_bytes():
+            raise UploadQuotaExceeded('مجموع أحجام جلسات الرفع الجارية يتجاوز المساحة المسموحة')
+        session = UploadSession.objects.create(
+            user=user, filename=os.path.basename(filename)[:255], size=size
+        )
+    open(temp_path(session), 'wb').close()
+    return session
+
+
+def cancel_session(session):
+    """إلغاء جلسة جارية وحذف ملفها المؤقت (يحرر حصة المستخدم)"""
+    if session.status != 'active':
+        raise UploadConflict('الجلسة ليست جارية')
+    with _session_lock(session):
+        cancelled = UploadSession.objects.filter(pk=session.pk, status='active').update(
+            status='expired', updated_at=timezone.now()
+        )
+        if not cancelled:
+            raise UploadConflict('الجلسة ليست جارية')
+        session.status = 'expired'
+        try:
+            os.remove(temp_path(session))
+        except FileNotFoundError:
+            pass
+
+
+def _parse_checksum(header):
+    if not header:
+        return None
+    algorithm, _, value = header.partition(' ')
+    if algorithm.lower() != 'sha256' or len(value.strip()) != 64:
+        raise UploadError('Upload-Checksum يجب أن يكون بصيغة: sha256 <hex>')
+    return value.strip().lower()
+
+
+def _stage_chunk(session, length, stream, expected=None):
+    """
+    نسخ الجزء من الطلب إلى ملف مؤقت خاص بهذا الطلب مع التحقق من بصمته؛ لا يُلحق
+    بملف الجلسة إلا بعد حجز الإزاحة، فلا يكتب طلبان في نفس المنطقة.
+    """
+    digest = hashlib.sha256()
+    written = 0
+    handle = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(temp_path(session)), prefix=f'{session.pk}.', suffix='.chunk', delete=False
+    )
+    try:
+        with handle:
+            while written < length:
+                data = stream.read(min(COPY_BUFFER, length - written))
+                if not data:
+                    raise UploadError('انقطع الاتصال قبل اكتمال الجزء')
+                handle.write(data)
+                digest.update(data)
+                written += len(data)
+        if expected is not None and digest.hexdigest() != expected:
+            raise UploadError('بصمة الجزء لا تطابق Upload-Checksum')
+    except Exception:
+        os.remove(handle.name)
+        raise
+    return handle.name
+
+
+def _write_chunk(staged, path, offset, length):
+    with open(staged, 'rb') as source, open(path, 'r+b' if os.path.exists(path) else 'wb') as target:
+        target.seek(offset)
+        shutil.copyfileobj(source, target, COPY_BUFFER)
+        target.truncate(offset + length)
+
+
+def append_chunk(session, offset, length, stream, checksum=None):
+    """
+    إلحاق جزء بالملف المؤقت ابتداءً من offset (يجب أن تساوي المستلم حتى الآن).
+    إذا انقطع الاتصال أو لم تطابق البصمة يبقى الملف عند آخر إزاحة مؤكدة.
+    تُرجع الإزاحة الجديدة.
+    """
+    if session.status != 'active':
+        raise UploadConflict('الجلسة ليست جارية')
+    if length <= 0 or length > max_chunk_size():
+        raise UploadError(f'حجم الجزء يجب أن يكون بين 1 و {max_chunk_size()} بايت')
+    expected = _parse_checksum(checksum)
+
+    with _session_lock(session):
+        session.refresh_from_db(fields=['received', 'status'])
+        if session.status != 'active':
+            raise UploadConflict('الجلسة ليست جارية')
+        if offset != session.received:
+            raise UploadConflict(f'الإزاحة المتوقعة {session.received}')
+        if offset + length > session.size:
+            raise UploadError('الجزء يتجاوز الحجم المعلن للملف')
+
+        staged = _stage_chunk(session, length, stream, expected)
+        try:
+            with transaction.atomic():
+                # التحديث المشروط هو الضمان الفعلي: من يطابق received أولاً يفوز،
+                # والآخر (عامل آخر مع ذاكرة محلية مثلاً) يُرفض دون لمس الملف
+                claimed = UploadSession.objects.filter(
+                    pk=session.pk, status='active', received=offset
+                ).update(received=offset + length, updated_at=timezone.now())
+                if not claimed:
+                    raise UploadConflict('أضاف طلب آخر جزءاً عند نفس الإزاحة')
+                _write_chunk(staged, temp_path(session), offset, length)
+        finally:
+            os.remove(staged)
+        session.received = offset + length
+    return session.received
+
+
+# ========================
+# الإكمال والتخزين بحسب المحتوى
+# ========================
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for data in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _store_blob(path, sha256, size, filename=''):
+    """Blob بنفس البصمة (الموجود أو الجديد)؛ المحتوى يُكتب مرة واحدة فقط"""
+    blob = Blob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+
+    storage = Blob._meta.get_field('file').storage
+    name = blob_name(sha256, filename)
+    if storage.exists(name) and storage.size(name) != size:
+        # بقايا كتابة انقطعت قبل إنشاء الـ Blob
+        storage.delete(name)
+    written = not storage.exists(name)
+    if written:
+        with open(path, 'rb') as handle:
+            name = storage.save(name, File(handle))
+    try:
+        with transaction.atomic():
+            return Blob.objects.create(sha256=sha256, size=size, file=name)
+    except IntegrityError:
+        # أُكمل رفع نفس المحتوى في طلب متزامن؛ التخزين أعطى ملفنا اسماً بديلاً فيُحذف
+        blob = Blob.objects.get(sha256=sha256)
+        if written and name != blob.file.name:
+            storage.delete(name)
+        return blob
+
+
+def complete_session(session):
+    """التحقق من اكتمال الأجزاء وتحويل الملف المؤقت إلى Blob"""
+    if session.status == 'complete':
+        return session.blob
+    if session.status != 'active':
+        raise UploadConflict('الجلسة ليست جارية')
+
+    with _session_lock(session):
+        session.refresh_from_db(fields=['received', 'status'])
+        if session.received != session.size:
+            raise UploadConflict(f'لم يكتمل الرفع: {session.received} من {session.size} بايت')
+
+        path = temp_path(session)
+        blob = _store_blob(path, _file_sha256(path), session.size, session.filename)
+        completed = UploadSession.objects.filter(
+            pk=session.pk, status='active', received=session.size
+        ).update(status='complete', blob=blob, updated_at=timezone.now())
+        if not completed:
+            raise UploadConflict('تغيرت حالة الجلسة أثناء الإكمال')
+        session.status, session.blob = 'complete', blob
+        os.remove(path)
+    return blob
+
+
+def resolve_upload(user, upload_id):
+    """مسار Blob الخاص بجلسة مكتملة يملكها المستخدم، لتعيينه في حقل ملف"""
+    session = UploadSession.objects.select_related('blob').filter(
+        pk=upload_id, user=user, status='complete'
+    ).first()
+    if session is None or session.blob is None:
+        raise UploadError('جلسة الرفع غير موجودة أو لم تكتمل')
+    return session.blob.file.name
+
+
+def expire_sessions():
+    """إنهاء الجلسات الجارية المتروكة وحذف ملفاتها المؤقتة، وإرجاع عددها"""
+    cutoff = timezone.now() - timedelta(seconds=session_ttl())
+    stale = list(UploadSession.objects.filter(status='active', updated_at__lt=cutoff))
+    for session in stale:
+        path = temp_path(session)
+        # أجزاء طلبات توقفت عمليتها قبل حذفها
+        for leftover in [path, *glob.glob(os.path.join(os.path.dirname(path), f'{session.pk}.*.chunk'))]:
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+    UploadSession.objects.filter(pk__in=[session.pk for session in stale]).update(status='expired')
+    return len(stale)
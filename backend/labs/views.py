@@ -8,30 +8,97 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count, Avg, Q
 from django.shortcuts import render, get_object_or_404
 from django.views import View
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import quote_etag
 
-from labs.models import Lab, Challenge, Submission, UserLabProgress, LabReview
+from cyberlabs.db_router import ReplicaReadMixin, primary_only, replica_reads
+from labs.models import (
+    Lab, Challenge, Submission, SubmissionAttempt, UserLabProgress, LabReview, UploadSession
+)
+from .cache import (
+    invalidate_user, labs_cache_key, labs_cache_ttl,
+    user_cache_key, user_cache_ttl, user_tier
+)
+from .conditional import ConditionalMixin
+from .counters import record_view
+from .dashboard import get_dashboard, progress_totals, submission_totals
+from .facets import compute_facets
+from .fastpath import FastPathMixin
+from .importer import PackageError, import_labs
+from .attempts import submit_attempt
+from .pagination import NotificationPagination, SubmissionPagination
+from .response_cache import ResponseCacheMixin
+from . import uploads
+from . import events
+from . import export
+from . import leaderboard
+from .search import LabSearchFilter, search as search_labs
+from .stats import get_platform_statistics, stats_stale_ttl, stats_ttl
 from .serializers import (
-    LabSerializer, ChallengeSerializer, SubmissionSerializer,
-    UserLabProgressSerializer, LabReviewSerializer,
-    SubmitChallengeSerializer, LabSearchSerializer, UserProgressSerializer
+    LabSerializer, LabListSerializer, ChallengeSerializer, ChallengeListSerializer,
+    SubmissionSerializer, SubmissionAttemptSerializer, UserLabProgressSerializer, LabReviewSerializer,
+    SubmitChallengeSerializer, LabSearchSerializer, UserProgressSerializer,
+    UploadSessionSerializer, AttachUploadSerializer
 )
 
+
+# ========================
+# الحقول المختصرة في القوائم
+# ========================
+
+class SparseFieldsMixin:
+    """
+    يستخدم list_serializer_class المختصر في القوائم (ما لم يحدد العميل ?fields=)،
+    ويحمّل من قاعدة البيانات الأعمدة التي سترسل فقط عبر .only().
+    """
+    
+    list_serializer_class = None
+    list_actions = ('list',)
+    sparse_required_fields = ()
+    
+    def get_serializer_class(self):
+        if (self.list_serializer_class is not None and self.action in self.list_actions
+                and 'fields' not in self.request.query_params):
+            return self.list_serializer_class
+        return super().get_serializer_class()
+    
+    def sparse_queryset(self, queryset):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        columns = self.get_serializer_class().model_fields_for(self.request)
+        if columns is None:
+            return queryset
+        return queryset.only(*columns, *self.sparse_required_fields)
+
+
 # ========================
 # ViewSets للـ API
 # ========================
 
-class LabViewSet(viewsets.ModelViewSet):
+class LabViewSet(ReplicaReadMixin, ConditionalMixin, ResponseCacheMixin, FastPathMixin,
+                 SparseFieldsMixin, viewsets.ModelViewSet):
     """ViewSet للمعامل"""
     
-    queryset = Lab.objects.filter(is_active=True)
+    queryset = Lab.objects.active()
     serializer_class = LabSerializer
+    list_serializer_class = LabListSerializer
+    list_actions = ('list', 'search')
+    fast_serialization = True
+    cached_actions = ('list', 'retrieve', 'challenges')
+    conditional_actions = ('list', 'retrieve', 'challenges')
+    replica_actions = ('list', 'retrieve', 'challenges', 'search', 'categories', 'facets', 'statistics')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, LabSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'difficulty', 'is_premium']
-    search_fields = ['title', 'description', 'overview']
     ordering_fields = ['created_at', 'points', 'views', 'completions']
     
-    def get_queryset(self):
+    def get_base_queryset(self):
+        """المعامل الظاهرة للمستخدم الحالي بدون حقول محسوبة"""
         queryset = super().get_queryset()
         
         # فلترة للمستخدمين العاديين
@@ -42,20 +109,54 @@ class LabViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def get_queryset(self):
+        # عدد التحديات مخزن في Lab.challenge_total فلا حاجة إلى JOIN و GROUP BY
+        return self.sparse_queryset(self.get_base_queryset())
+    
+    def get_conditional_queryset(self):
+        if self.action == 'challenges':
+            return Challenge.objects.filter(lab__in=self.get_queryset().filter(pk=self.kwargs['pk']))
+        return super().get_conditional_queryset()
+    
+    def get_conditional_related_fields(self):
+        # قائمة تحديات المعمل تتضمن بيانات المعمل نفسه
+        if self.action == 'challenges':
+            return ('lab__updated_at',)
+        return super().get_conditional_related_fields()
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: self.cached_response(
+            request, lambda: super(LabViewSet, self).list(request, *args, **kwargs)
+        ))
+    
+    def _retrieve(self, request):
+        data = self.fast_retrieve(request)
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
+        return Response(data)
+    
     def retrieve(self, request, *args, **kwargs):
         """زيادة عدد المشاهدات عند عرض المعمل"""
-        instance = self.get_object()
-        instance.views += 1
-        instance.save()
-        return super().retrieve(request, *args, **kwargs)
+        response = self.conditional_response(
+            request, lambda: self.cached_response(request, lambda: self._retrieve(request))
+        )
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            # تُسجل المشاهدة حتى عند الإصابة في الذاكرة المؤقتة أو 304، وتُكتب دورياً
+            record_view(int(self.kwargs['pk']))
+        return response
+    
+    def _challenges(self):
+        lab = self.get_object()
+        challenges = lab.challenges.select_related('lab')
+        serializer = ChallengeSerializer(challenges, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def challenges(self, request, pk=None):
         """الحصول على تحديات المعمل"""
-        lab = self.get_object()
-        challenges = lab.challenges.all()
-        serializer = ChallengeSerializer(challenges, many=True)
-        return Response(serializer.data)
+        return self.conditional_response(
+            request, lambda: self.cached_response(request, self._challenges)
+        )
     
     @action(detail=True, methods=['get'])
     def submissions(self, request, pk=None):
@@ -67,8 +168,8 @@ class LabViewSet(viewsets.ModelViewSet):
         submissions = Submission.objects.filter(
             lab=lab,
             user=request.user
-        )
-        serializer = SubmissionSerializer(submissions, many=True)
+        ).select_related('user', 'lab', 'challenge')
+        serializer = SubmissionSerializer(submissions, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -79,15 +180,25 @@ class LabViewSet(viewsets.ModelViewSet):
         
         lab = self.get_object()
         
-        progress, created = UserLabProgress.objects.get_or_create(
-            user=request.user,
-            lab=lab,
-            defaults={'is_started': True}
-        )
+        with transaction.atomic():
+            progress, created = UserLabProgress.objects.get_or_create(
+                user=request.user,
+                lab=lab,
+                defaults={'is_started': True, 'started_at': timezone.now()}
+            )
+        
+            if not created and not progress.is_started:
+                # تحديث مشروط حتى لا يُحتسب البدء مرتين مع طلب متزامن
+                progress.is_started = True
+                progress.started_at = progress.started_at or timezone.now()
+                created = bool(UserLabProgress.objects.filter(pk=progress.pk, is_started=False).update(
+                    is_started=True, started_at=progress.started_at, updated_at=timezone.now()
+                ))
         
-        if not created and not progress.is_started:
-            progress.is_started = True
-            progress.save()
+            if created:
+                events.emit(events.PROGRESS_STARTED, lab_id=lab.pk, user_id=request.user.pk)
+        
+        invalidate_user(request.user.pk)
         
         serializer = UserLabProgressSerializer(progress)
         return Response(serializer.data)
@@ -98,15 +209,11 @@ class LabViewSet(viewsets.ModelViewSet):
         serializer = LabSearchSerializer(data=request.query_params)
         serializer.is_valid(raise_exception=True)
         
-        queryset = Lab.objects.filter(is_active=True)
+        # المعامل المميزة تظهر للطاقم فقط، كما في القائمة والـ facets
+        queryset = self.get_queryset()
         
         if serializer.validated_data.get('search'):
-            search = serializer.validated_data['search']
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(overview__icontains=search)
-            )
+            queryset = search_labs(queryset, serializer.validated_data['search'])
         
         if serializer.validated_data.get('category'):
             queryset = queryset.filter(
@@ -123,61 +230,112 @@ class LabViewSet(viewsets.ModelViewSet):
                 is_premium=serializer.validated_data['is_premium']
             )
         
-        if not request.user.is_authenticated or not request.user.is_premium:
-            queryset = queryset.filter(is_premium=False)
-        
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = LabSerializer(page, many=True, context={'request': request})
+            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = LabSerializer(queryset, many=True, context={'request': request})
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """الحصول على جميع التصنيفات"""
-        categories = Lab.objects.filter(is_active=True).values_list(
-            'category', flat=True
-        ).distinct()
-        
-        category_choices = dict(Lab.CATEGORY_CHOICES)
-        result = []
-        for category in categories:
-            if category in category_choices:
-                result.append({
-                    'value': category,
-                    'label': category_choices[category],
-                    'count': Lab.objects.filter(category=category, is_active=True).count()
-                })
-        
-        return Response(result)
+        facets = self._get_facets(request)
+        return Response([
+            {'value': item['value'], 'label': item['label'], 'count': item['count']}
+            for item in facets['category'] if item['count']
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """أعداد التصنيفات والصعوبة والمحتوى المميز حسب فلاتر البحث الحالية"""
+        return Response(self._get_facets(request))
+    
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[permissions.IsAdminUser], parser_classes=[MultiPartParser])
+    def import_packages(self, request):
+        """استيراد حزم المعامل من ملف zip (الحقل package)، مع dry_run=1 للتحقق فقط"""
+        upload = request.FILES.get('package')
+        if upload is None:
+            return Response({'detail': 'ملف الحزمة (package) مطلوب'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = request.data.get('dry_run') in ('1', 'true')
+        try:
+            # التحقق داخل عامل الويب نفسه: لا تُنشأ مجموعة عمليات من خادم الويب،
+            # والاستيراد الكبير يُنفذ بالأمر import_labs
+            report = import_labs(upload, dry_run=dry_run, workers=1)
+        except PackageError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        code = status.HTTP_400_BAD_REQUEST if report.errors else status.HTTP_200_OK
+        return Response(report.as_dict(), status=code)
+    
+    def _get_facets(self, request):
+        serializer = LabSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        selected = {
+            field: params[field]
+            for field in ('category', 'difficulty', 'is_premium')
+            if params.get(field) not in (None, '')
+        }
+        search = (params.get('search') or '').strip()
+        
+        key = labs_cache_key(
+            'facets', user_tier(request.user), search,
+            *(f'{field}={value}' for field, value in sorted(selected.items()))
+        )
+        facets = cache.get(key)
+        if facets is None:
+            # ما يُخزن تحت الإصدار الحالي يُحسب من الرئيسية (النسخة قد تكون متأخرة)
+            with primary_only():
+                queryset = self.get_base_queryset()
+                if search:
+                    queryset = search_labs(queryset, search)
+                facets = compute_facets(queryset, selected)
+            cache.set(key, facets, labs_cache_ttl())
+        return facets
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """إحصائيات عامة للمعامل"""
-        total_labs = Lab.objects.filter(is_active=True).count()
-        total_challenges = Challenge.objects.count()
-        total_submissions = Submission.objects.count()
-        total_users_completed = UserLabProgress.objects.filter(is_completed=True).count()
-        
-        return Response({
-            'total_labs': total_labs,
-            'total_challenges': total_challenges,
-            'total_submissions': total_submissions,
-            'total_users_completed': total_users_completed,
-        })
+        """
+        إحصائيات عامة للمعامل (مخزنة مؤقتاً مع دعم ETag). لا تُرسل Last-Modified:
+        وقت الحساب ليس وقت تغير البيانات، فيتغير دون تغير المحتوى ويعطّل
+        If-Modified-Since؛ والـ ETag مشتق من المحتوى نفسه.
+        """
+        entry = get_platform_statistics()
+        etag = quote_etag(entry['etag'])
+        
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(entry['data'])
+        
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            f'public, max-age={stats_ttl()}, stale-while-revalidate={stats_stale_ttl()}'
+        )
+        return response
 
 
-class ChallengeViewSet(viewsets.ReadOnlyModelViewSet):
+class ChallengeViewSet(ReplicaReadMixin, ConditionalMixin, FastPathMixin, SparseFieldsMixin,
+                       viewsets.ReadOnlyModelViewSet):
     """ViewSet للتحديات"""
     
-    queryset = Challenge.objects.all()
+    queryset = Challenge.objects.select_related('lab')
     serializer_class = ChallengeSerializer
+    list_serializer_class = ChallengeListSerializer
+    fast_serialization = True
+    # مطلوب مع select_related('lab')
+    sparse_required_fields = ('lab',)
+    # التحدي يتضمن عنوان المعمل، فتعديل المعمل يغير البصمة
+    conditional_related_fields = ('lab__updated_at',)
+    replica_actions = ('list', 'retrieve')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = self.sparse_queryset(super().get_queryset())
         
         lab_id = self.request.query_params.get('lab_id')
         if lab_id:
@@ -185,6 +343,16 @@ class ChallengeViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset
     
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ChallengeViewSet, self).list(request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ChallengeViewSet, self).retrieve(request, *args, **kwargs)
+        )
+    
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
         """تقديم حل للتحدي"""
@@ -192,46 +360,21 @@ class ChallengeViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'detail': 'يجب تسجيل الدخول'}, status=status.HTTP_401_UNAUTHORIZED)
         
         challenge = self.get_object()
-        serializer = SubmitChallengeSerializer(data=request.data)
+        serializer = SubmitChallengeSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
-            submission_data = {
-                'user': request.user,
-                'lab': challenge.lab,
-                'challenge': challenge,
-                'status': 'pending'
-            }
-            
-            if serializer.validated_data.get('answer'):
-                submission_data['answer'] = serializer.validated_data['answer']
-            
-            if serializer.validated_data.get('code'):
-                submission_data['code'] = serializer.validated_data['code']
-            
-            if serializer.validated_data.get('file'):
-                submission_data['file'] = serializer.validated_data['file']
-            
-            submission = Submission.objects.create(**submission_data)
-            
-            # نظام التقييم الآلي البسيط
-            is_correct = False
-            if challenge.answer_type == 'flag' or challenge.answer_type == 'text':
-                if submission.answer.strip() == challenge.correct_answer.strip():
-                    is_correct = True
-            
-            if is_correct:
-                submission.status = 'correct'
-                submission.is_correct = True
-                submission.score = challenge.points
-            else:
-                submission.status = 'incorrect'
-                submission.is_correct = False
-                submission.score = 0
-            
-            submission.save()
+            # كل تقديم محاولة جديدة؛ التقييم يتم خارج مسار الطلب
+            attempt = submit_attempt(
+                request.user, challenge,
+                answer=serializer.validated_data.get('answer', ''),
+                code=serializer.validated_data.get('code', ''),
+                file=serializer.validated_data.get('file'),
+            )
             
-            submission_serializer = SubmissionSerializer(submission)
-            return Response(submission_serializer.data, status=status.HTTP_201_CREATED)
+            return Response({
+                'attempt': SubmissionAttemptSerializer(attempt).data,
+                'submission': SubmissionSerializer(attempt.submission).data,
+            }, status=status.HTTP_202_ACCEPTED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -244,10 +387,13 @@ class SubmissionViewSet(viewsets.ModelViewSet):
     serializer_class = SubmissionSerializer
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = SubmissionPagination
     
     def get_queryset(self):
         """الحصول على تسليمات المستخدم فقط"""
-        queryset = Submission.objects.filter(user=self.request.user)
+        queryset = Submission.objects.filter(
+            user=self.request.user
+        ).select_related('user', 'lab', 'challenge')
         
         lab_id = self.request.query_params.get('lab_id')
         if lab_id:
@@ -260,29 +406,39 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        """إنشاء تسليم جديد"""
-        serializer.save(user=self.request.user)
+        """إضافة محاولة جديدة (يُنشأ صف التسليم عند أول محاولة)"""
+        data = serializer.validated_data
+        attempt = submit_attempt(
+            self.request.user, data['challenge'],
+            answer=data.get('answer', ''), code=data.get('code', ''), file=data.get('file'),
+        )
+        serializer.instance = attempt.submission
+    
+    @action(detail=True, methods=['get'])
+    def attempts(self, request, pk=None):
+        """سجل محاولات التسليم، الأحدث أولاً"""
+        submission = self.get_object()
+        attempts = SubmissionAttempt.objects.filter(submission=submission).defer(
+            'code', 'test_results', 'output'
+        )
+        page = self.paginate_queryset(attempts)
+        if page is not None:
+            return self.get_paginated_response(SubmissionAttemptSerializer(page, many=True).data)
+        return Response(SubmissionAttemptSerializer(attempts, many=True).data)
     
     @action(detail=False, methods=['get'])
     def user_statistics(self, request):
         """إحصائيات المستخدم"""
-        user = request.user
-        
-        total_submissions = Submission.objects.filter(user=user).count()
-        correct_submissions = Submission.objects.filter(user=user, is_correct=True).count()
-        total_score = Submission.objects.filter(user=user).aggregate(total=Sum('score'))['total'] or 0
-        
-        progress_queryset = UserLabProgress.objects.filter(user=user)
-        total_labs_started = progress_queryset.filter(is_started=True).count()
-        total_labs_completed = progress_queryset.filter(is_completed=True).count()
+        submissions = submission_totals(request.user.pk)
+        progress = progress_totals(request.user.pk)
         
         return Response({
-            'total_submissions': total_submissions,
-            'correct_submissions': correct_submissions,
-            'accuracy_rate': (correct_submissions / total_submissions * 100) if total_submissions > 0 else 0,
-            'total_score': total_score,
-            'total_labs_started': total_labs_started,
-            'total_labs_completed': total_labs_completed,
+            'total_submissions': submissions['total'],
+            'correct_submissions': submissions['correct'],
+            'accuracy_rate': submissions['accuracy_rate'],
+            'total_score': submissions['score'],
+            'total_labs_started': progress['started'],
+            'total_labs_completed': progress['completed'],
         })
 
 
@@ -295,16 +451,17 @@ class UserLabProgressViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """الحصول على تقدم المستخدم فقط"""
-        return UserLabProgress.objects.filter(user=self.request.user)
+        return UserLabProgress.objects.filter(
+            user=self.request.user
+        ).select_related('user', 'lab').prefetch_related('completed_challenges')
     
     @action(detail=False, methods=['get'])
     def overview(self, request):
         """نظرة عامة على تقدم المستخدم"""
-        progress = UserLabProgress.objects.filter(user=request.user)
-        
-        total_labs = progress.count()
-        completed_labs = progress.filter(is_completed=True).count()
-        total_score = progress.aggregate(total=Sum('total_score'))['total'] or 0
+        totals = progress_totals(request.user.pk)
+        total_labs = totals['total']
+        completed_labs = totals['completed']
+        total_score = totals['points']
         
         serializer = UserProgressSerializer({
             'total_labs': total_labs,
@@ -326,7 +483,7 @@ class LabReviewViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """الحصول على التقييمات العامة أو الخاصة بالمستخدم"""
-        queryset = LabReview.objects.all()
+        queryset = LabReview.objects.select_related('user', 'lab')
         
         if not self.request.user.is_staff:
             queryset = queryset.filter(is_approved=True)
@@ -347,7 +504,7 @@ class LabReviewViewSet(viewsets.ModelViewSet):
         if not request.user.is_authenticated:
             return Response({'detail': 'يجب تسجيل الدخول'}, status=status.HTTP_401_UNAUTHORIZED)
         
-        reviews = LabReview.objects.filter(user=request.user)
+        reviews = LabReview.objects.filter(user=request.user).select_related('user', 'lab')
         serializer = self.get_serializer(reviews, many=True)
         return Response(serializer.data)
 
@@ -395,6 +552,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     """ViewSet للإشعارات"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
@@ -411,12 +569,243 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return UserProfile.objects.filter(user=self.request.user)
+        return UserProfile.objects.filter(user=self.request.user).select_related('user')
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_user(self.request.user.pk)
 
     @action(detail=False, methods=['get'])
     def me(self, request):
-        """الحصول على ملفي الشخصي"""
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        profile.update_stats()
-        serializer = self.get_serializer(profile)
-        return Response(serializer.data)
+        """الحصول على ملفي الشخصي (الإحصائيات تُحدّث عند التقييم وليس هنا)"""
+        key = user_cache_key(request.user.pk, 'profile', 'me')
+        data = cache.get(key)
+        if data is None:
+            profile = UserProfile.objects.select_related('user').filter(user=request.user).first()
+            if profile is None:
+                profile, _ = UserProfile.objects.get_or_create(user=request.user)
+            data = self.get_serializer(profile).data
+            cache.set(key, data, user_cache_ttl())
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """كل بيانات لوحة التحكم في طلب واحد (مخزنة لكل مستخدم)"""
+        return Response(get_dashboard(request.user.pk))
+
+
+# ========================
+# ViewSet للوحة المتصدرين
+# ========================
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    """ViewSet للوحة المتصدرين (عامة، حسب التصنيف، وحسب المعمل)"""
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    MAX_LIMIT = 100
+    
+    def _limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        return max(1, min(limit, self.MAX_LIMIT))
+    
+    def _scope(self, request):
+        """النطاق المطلوب من معاملات الاستعلام"""
+        category = request.query_params.get('category')
+        lab_id = request.query_params.get('lab_id')
+        if category:
+            return leaderboard.category_scope(category)
+        if lab_id:
+            return leaderboard.lab_scope(lab_id)
+        return leaderboard.GLOBAL_SCOPE
+    
+    def list(self, request):
+        """أعلى المستخدمين على مستوى المنصة"""
+        return Response(leaderboard.top(self._scope(request), self._limit(request)))
+    
+    @action(detail=False, methods=['get'], url_path=r'category/(?P<category>[^/.]+)')
+    def category(self, request, category=None):
+        """أعلى المستخدمين في تصنيف معين"""
+        if category not in dict(Lab.CATEGORY_CHOICES):
+            return Response({'detail': 'تصنيف غير معروف'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(leaderboard.top(leaderboard.category_scope(category), self._limit(request)))
+    
+    @action(detail=False, methods=['get'], url_path=r'lab/(?P<lab_id>\d+)')
+    def lab(self, request, lab_id=None):
+        """أعلى المستخدمين في معمل معين"""
+        return Response(leaderboard.top(leaderboard.lab_scope(lab_id), self._limit(request)))
+    
+    @action(detail=False, methods=['get'])
+    def me(self, request):
+        """ترتيبي مع المستخدمين المحيطين بي"""
+        if not request.user.is_authenticated:
+            return Response({'detail': 'يجب تسجيل الدخول'}, status=status.HTTP_401_UNAUTHORIZED)
+        
+        try:
+            neighbours = int(request.query_params.get('neighbours', 5))
+        except ValueError:
+            neighbours = 5
+        neighbours = max(0, min(neighbours, 25))
+        return Response(leaderboard.around(self._scope(request), request.user.pk, neighbours))
+
+
+# ========================
+# ViewSet لتصدير البيانات (للمشرفين)
+# ========================
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    تصدير متدفق للتسليمات والمحاولات والتقدم: /api/exports/<النوع>/
+    المعاملات: output=csv|ndjson، gzip=1، lab_id، since، until (تاريخ ISO)
+
+    الاستجابة تشغل عامل ويب حتى نهايتها، فالتصدير محدود بـ EXPORT_API_MAX_ROWS
+    صفاً؛ ما يتجاوزه يُضيَّق بالمرشحات أو يُصدَّر بالأمر export_data.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    lookup_value_regex = '|'.join(export.EXPORTS)
+    
+    def list(self, request):
+        """أنواع التصدير المتاحة وأعمدتها"""
+        return Response({kind: list(spec.columns) for kind, spec in export.EXPORTS.items()})
+    
+    def retrieve(self, request, pk=None):
+        params = request.query_params
+        output = params.get('output', 'csv')
+        compress = params.get('gzip') in ('1', 'true')
+        try:
+            filters = {
+                'lab_id': int(params['lab_id']) if params.get('lab_id') else None,
+                'since': export.parse_moment(params.get('since')),
+                'until': export.parse_moment(params.get('until'), end_of_day=True),
+            }
+            # يُحدد الاتصال الآن لأن المولّد يُقرأ بعد انتهاء الـ view
+            with replica_reads():
+                using = router.db_for_read(export.EXPORTS[pk].model)
+            max_rows = settings.EXPORT_API_MAX_ROWS
+            if export.exceeds(pk, max_rows, using=using, **filters):
+                return Response({
+                    'detail': f'التصدير يتجاوز {max_rows} صف؛ ضيّق النطاق بـ lab_id أو since/until، '
+                              'أو استخدم الأمر export_data للتصديرات الكبيرة'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            chunks = export.stream_export(
+                pk, output=output, compress=compress, using=using, limit=max_rows, **filters
+            )
+        except ValueError as exc:  # يشمل ExportError
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        content_type = 'application/gzip' if compress else export.FORMATS[output][0]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export.export_filename(pk, output, compress)}"'
+        )
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+
+# ========================
+# ViewSet لرفع الملفات على أجزاء
+# ========================
+
+class UploadSessionViewSet(viewsets.GenericViewSet):
+    """
+    رفع الملفات الكبيرة على أجزاء يمكن استئنافها:
+    - POST /api/uploads/ {filename, size}: إنشاء جلسة.
+    - PATCH /api/uploads/<id>/ بجسم خام وترويسة Upload-Offset: إلحاق جزء.
+    - GET /api/uploads/<id>/: الإزاحة الحالية للاستئناف.
+    - POST /api/uploads/<id>/complete/: إنهاء الرفع وتخزين الملف بحسب محتواه.
+    - DELETE /api/uploads/<id>/: إلغاء جلسة جارية وتحرير حصتها.
+    الجلسة المكتملة تُستخدم عبر upload_id في التسليم أو attach (للمشرفين).
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user).select_related('blob')
+    
+    def _response(self, session, code=status.HTTP_200_OK):
+        response = Response(self.get_serializer(session).data, status=code)
+        response['Upload-Offset'] = str(session.received)
+        return response
+    
+    def _error(self, exc, session=None):
+        if isinstance(exc, uploads.UploadQuotaExceeded):
+            code = status.HTTP_429_TOO_MANY_REQUESTS
+        elif isinstance(exc, uploads.UploadConflict):
+            code = status.HTTP_409_CONFLICT
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        response = Response({'detail': str(exc)}, status=code)
+        if session is not None:
+            session.refresh_from_db(fields=['received'])
+            response['Upload-Offset'] = str(session.received)
+        return response
+    
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            session = uploads.create_session(
+                request.user, serializer.validated_data['filename'], serializer.validated_data['size']
+            )
+        except uploads.UploadError as exc:
+            return self._error(exc)
+        return self._response(session, status.HTTP_201_CREATED)
+    
+    def retrieve(self, request, pk=None):
+        return self._response(self.get_object())
+    
+    def partial_update(self, request, pk=None):
+        """إلحاق جزء؛ الجسم يُقرأ من الطلب مباشرة ولا يمر عبر الـ parsers"""
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({'detail': 'Upload-Offset و Content-Length مطلوبان'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uploads.append_chunk(
+                session, offset, length, request.stream,
+                checksum=request.headers.get('Upload-Checksum'),
+            )
+        except uploads.UploadError as exc:
+            return self._error(exc, session)
+        return self._response(session)
+    
+    def destroy(self, request, pk=None):
+        session = self.get_object()
+        try:
+            uploads.cancel_session(session)
+        except uploads.UploadError as exc:
+            return self._error(exc)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        session = self.get_object()
+        try:
+            uploads.complete_session(session)
+        except uploads.UploadError as exc:
+            return self._error(exc, session)
+        return self._response(session)
+    
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def attach(self, request, pk=None):
+        """تعيين الملف المرفوع لحقل ملف في معمل أو تحدٍ {target, object_id, field}"""
+        session = self.get_object()
+        serializer = AttachUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            name = uploads.resolve_upload(request.user, session.pk)
+        except uploads.UploadError as exc:
+            return self._error(exc)
+        
+        instance, field = serializer.validated_data['instance'], serializer.validated_data['field']
+        setattr(instance, field, name)
+        # save() لتعمل الإشارات (إبطال الذاكرة المؤقتة، نسخ الصورة المصغرة)
+        instance.save(update_fields=[field, 'updated_at'])
+        return Response({'target': serializer.validated_data['target'], 'object_id': instance.pk,
+                         'field': field, 'file': name})